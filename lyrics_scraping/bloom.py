@@ -0,0 +1,195 @@
+"""Module that defines a Bloom filter, e.g. of the song URLs already saved in
+the music database.
+
+A Bloom filter is a compact set that can only tell if a string is *maybe* in
+it or *definitely not* in it: there is no false negative but there are false
+positives, whose rate is chosen when the filter is built. It only takes about
+1.2 bytes per string for a false-positive rate of 1%, whatever the length of
+the strings, i.e. about 12 MB for ten million URLs (a :obj:`set` of the same
+URLs takes more than 1 GB).
+
+The filter is a bit array of `m` bits and each string sets `k` of them. The
+`k` positions are derived from a single 128-bit hash of the string (double
+hashing).
+
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+from logging import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_ERROR_RATE = 0.01
+# Magic number, version, number of bits, number of hashes, capacity, error
+# rate, number of added strings and a user-defined tag (e.g. the number of rows
+# in the db)
+_HEADER = struct.Struct("<4sBQBQdQQ")
+_MAGIC = b"BLMF"
+_VERSION = 1
+
+
+class BloomFilter:
+    """Bloom filter of strings.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of strings that can be added before the false-positive rate
+        exceeds `error_rate`.
+    error_rate : float, optional
+        Wanted false-positive rate between 0 and 1 (the default value is
+        0.01).
+
+    Attributes
+    ----------
+    tag : int
+        User-defined value saved along with the filter, e.g. the number of
+        URLs in the db when the filter was saved (the default value is 0).
+
+    Examples
+    --------
+    >>> urls = BloomFilter(capacity=1000)
+    >>> urls.add("https://www.azlyrics.com/lyrics/depechemode/newlife.html")
+    >>> "https://www.azlyrics.com/lyrics/depechemode/newlife.html" in urls
+    True
+
+    """
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        if not 0 < error_rate < 1:
+            raise ValueError("The error rate must be between 0 and 1: "
+                             "{}".format(error_rate))
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        # Optimal number of bits and of hashes for the capacity
+        self.nb_bits = max(int(math.ceil(
+            -self.capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.nb_hashes = max(int(round(
+            self.nb_bits / self.capacity * math.log(2))), 1)
+        self.tag = 0
+        self._bits = bytearray((self.nb_bits + 7) // 8)
+        self._count = 0
+
+    def __contains__(self, string):
+        bits = self._bits
+        for i in self._positions(string):
+            if not bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self._count
+
+    def add(self, string):
+        """Add a string to the filter.
+
+        Parameters
+        ----------
+        string : str
+            The string to add, e.g. a song URL.
+
+        """
+        bits = self._bits
+        for i in self._positions(string):
+            bits[i >> 3] |= 1 << (i & 7)
+        self._count += 1
+
+    def update(self, strings):
+        """Add many strings to the filter.
+
+        Parameters
+        ----------
+        strings : iterable of str
+            The strings to add. They are consumed lazily.
+
+        """
+        for string in strings:
+            self.add(string)
+
+    @property
+    def nb_bytes(self):
+        """Size of the bit array in bytes."""
+        return len(self._bits)
+
+    def save(self, filepath):
+        """Save the filter in a file.
+
+        The file is first written next to `filepath` and then renamed so that
+        a crash never leaves a truncated filter behind.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the file.
+
+        """
+        tmp_filepath = filepath + ".tmp"
+        with open(tmp_filepath, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.nb_bits,
+                                 self.nb_hashes, self.capacity,
+                                 self.error_rate, self._count, self.tag))
+            f.write(self._bits)
+        os.replace(tmp_filepath, filepath)
+        logger.debug("Bloom filter of {} string{} saved: {}".format(
+            self._count, "s" if self._count > 1 else "", filepath))
+
+    @classmethod
+    def load(cls, filepath):
+        """Load a filter from a file saved with :meth:`save`.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the file.
+
+        Returns
+        -------
+        bloom_filter : BloomFilter
+            The loaded filter.
+
+        Raises
+        ------
+        OSError
+            Raised if the file can't be read.
+        ValueError
+            Raised if the file is not a valid filter.
+
+        """
+        with open(filepath, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("Truncated Bloom filter: {}".format(filepath))
+            magic, version, nb_bits, nb_hashes, capacity, error_rate, count, \
+                tag = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("Not a Bloom filter (version {}): {}".format(
+                    _VERSION, filepath))
+            bits = bytearray(f.read())
+        if len(bits) != (nb_bits + 7) // 8:
+            raise ValueError("Truncated Bloom filter: {}".format(filepath))
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.capacity = capacity
+        bloom_filter.error_rate = error_rate
+        bloom_filter.nb_bits = nb_bits
+        bloom_filter.nb_hashes = nb_hashes
+        bloom_filter.tag = tag
+        bloom_filter._bits = bits
+        bloom_filter._count = count
+        return bloom_filter
+
+    def _positions(self, string):
+        """Return the positions of the bits of a string."""
+        # NOTE: md5 is only used as a fast 128-bit hash (blake2b requires
+        # Python 3.6)
+        digest = hashlib.md5(string.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        # The step can't be 0, otherwise all the positions would be the same
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        nb_bits = self.nb_bits
+        return [(h1 + i * h2) % nb_bits for i in range(self.nb_hashes)]
@@ -0,0 +1,448 @@
+"""Module that compresses the lyrics stored in the music database.
+
+The lyrics make up most of the music database. With compression enabled (see
+:ref:`compress_lyrics <LyricsScraperParametersLabel>`), they are stored in
+`songs.lyrics` as zlib-compressed BLOBs instead of text. The compression uses
+a shared dictionary trained on a sample of the lyrics (see
+:func:`train_zdict`): the common words and lines of the songs are then
+compressed even if they appear only once in a song.
+
+The dictionaries are saved in the table `lyrics_zdict` of the database and
+each BLOB starts with a small header giving the dictionary it was compressed
+with. Thus, the text and the BLOBs compressed with different dictionaries can
+be mixed in a database, e.g. while it is being converted.
+
+The decompression is transparent: the SQL function ``lyrics_text()``
+registered on the connections (see :func:`register_lyrics_text`) returns the
+text of a lyrics value, whether it is compressed or not. It is used by the
+queries reading the lyrics and by the full-text index of the songs: the
+triggers indexing the compressed lyrics are temporary ones created along with
+the function, thus the songs with compressed lyrics must be modified from a
+connection where it is registered.
+
+Example
+-------
+Compress the lyrics of an existing music database::
+
+    from lyrics_scraping.compression import compress_db_lyrics
+
+    stats = compress_db_lyrics("~/data/music.sqlite")
+
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import zlib
+from collections import Counter
+from logging import NullHandler
+
+from lyrics_scraping.utils import (
+    create_lyrics_fts_temp_triggers, get_db_schema_version, has_lyrics_fts,
+    plural, rebuild_lyrics_fts)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_LEVEL = 9
+DEFAULT_SAMPLE_SIZE = 2000
+# NOTE: zlib only looks back 32 KB, a larger dictionary is useless
+MAX_ZDICT_SIZE = 32768
+_FORMAT_VERSION = 1
+# Header of a compressed lyrics: the format version and the id of the
+# dictionary (0 if no dictionary was used)
+_HEADER = struct.Struct("<BH")
+# Raw deflate streams: the header of the BLOBs replaces the zlib header
+_WBITS = -15
+_ZDICT_TABLE_SQL = "CREATE TABLE IF NOT EXISTS lyrics_zdict (" \
+                   "zdict_id integer primary key, zdict blob not null)"
+# The table and rowid holding the lyrics for each db schema version
+_SONGS_TABLES = {1: ('songs', 'rowid'), 2: ('song', 'song_id')}
+
+
+class LyricsCodec:
+    """Compress and decompress the lyrics with zlib and shared dictionaries.
+
+    Parameters
+    ----------
+    zdicts : dict [int, bytes], optional
+        The dictionaries that can be used for decompressing, by id (the
+        default value is :obj:`None` which implies that only the lyrics
+        compressed without a dictionary can be decompressed).
+    zdict_id : int, optional
+        Id of the dictionary used for compressing (the default value is 0
+        which implies that no dictionary is used).
+    level : int, optional
+        The zlib compression level, from 1 (fastest) to 9 (smallest) (the
+        default value is 9).
+
+    """
+
+    def __init__(self, zdicts=None, zdict_id=0, level=DEFAULT_LEVEL):
+        self.zdicts = dict(zdicts or {})
+        if zdict_id and zdict_id not in self.zdicts:
+            raise ValueError("Unknown dictionary: {}".format(zdict_id))
+        self.zdict_id = zdict_id
+        self.level = level
+
+    @classmethod
+    def from_db(cls, db_conn, level=DEFAULT_LEVEL):
+        """Create a codec with the dictionaries saved in a database.
+
+        The last saved dictionary is used for compressing.
+
+        Parameters
+        ----------
+        db_conn : sqlite3.Connection
+            The connection to the music database.
+        level : int, optional
+            The zlib compression level (the default value is 9).
+
+        Returns
+        -------
+        codec : LyricsCodec
+            The codec of the lyrics of the database.
+
+        """
+        zdicts = {}
+        if has_zdicts(db_conn):
+            zdicts = dict(db_conn.execute(
+                "SELECT zdict_id, zdict FROM lyrics_zdict"))
+        return cls(zdicts, max(zdicts, default=0), level)
+
+    def compress(self, lyrics):
+        """Compress a lyrics text.
+
+        Parameters
+        ----------
+        lyrics : str
+            The lyrics text. :obj:`None` is returned as is.
+
+        Returns
+        -------
+        value : bytes
+            The compressed lyrics, starting with their header.
+
+        """
+        if lyrics is None:
+            return None
+        zdict = self.zdicts.get(self.zdict_id)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS,
+                                      **({'zdict': zdict} if zdict else {}))
+        return _HEADER.pack(_FORMAT_VERSION, self.zdict_id) \
+            + compressor.compress(lyrics.encode('utf-8')) + compressor.flush()
+
+    def decompress(self, value):
+        """Return the text of a lyrics value.
+
+        Parameters
+        ----------
+        value : bytes or str
+            The lyrics as stored in the database. The text and :obj:`None`
+            are returned as is.
+
+        Returns
+        -------
+        lyrics : str
+            The lyrics text.
+
+        Raises
+        ------
+        ValueError
+            Raised if the BLOB is not compressed lyrics or if its dictionary is
+            unknown.
+
+        """
+        if not isinstance(value, bytes):
+            return value
+        if len(value) < _HEADER.size:
+            raise ValueError("Truncated compressed lyrics")
+        version, zdict_id = _HEADER.unpack_from(value)
+        if version != _FORMAT_VERSION:
+            raise ValueError("Unknown format of compressed lyrics: "
+                             "{}".format(version))
+        if zdict_id:
+            if zdict_id not in self.zdicts:
+                raise ValueError("Unknown dictionary: {}".format(zdict_id))
+            decompressor = zlib.decompressobj(_WBITS,
+                                              zdict=self.zdicts[zdict_id])
+        else:
+            decompressor = zlib.decompressobj(_WBITS)
+        try:
+            data = decompressor.decompress(value[_HEADER.size:]) \
+                + decompressor.flush()
+        except zlib.error as e:
+            raise ValueError("Corrupted compressed lyrics: {}".format(e))
+        return data.decode('utf-8')
+
+    def register(self, db_conn):
+        """Register the SQL function ``lyrics_text()`` on a connection.
+
+        Parameters
+        ----------
+        db_conn : sqlite3.Connection
+            The connection to the music database.
+
+        """
+        db_conn.create_function("lyrics_text", 1, self.decompress)
+
+
+def register_lyrics_text(db_conn):
+    """Register the SQL function ``lyrics_text()`` with the dictionaries of
+    the database.
+
+    It must be registered on every connection that reads the lyrics or
+    modifies the songs with compressed lyrics of a database having a full-text
+    index. The temporary triggers indexing the compressed lyrics (see
+    :func:`~lyrics_scraping.utils.create_lyrics_fts_temp_triggers`) are
+    created on the connection along with the function.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    codec : LyricsCodec
+        The registered codec.
+
+    """
+    codec = LyricsCodec.from_db(db_conn)
+    codec.register(db_conn)
+    create_lyrics_fts_temp_triggers(db_conn)
+    return codec
+
+
+def train_zdict(samples, size=MAX_ZDICT_SIZE):
+    """Train a zlib dictionary on a sample of lyrics.
+
+    The dictionary is made of the lines and words found in several songs,
+    the ones saving the most bytes being put at its end since zlib encodes
+    the closest matches with fewer bits.
+
+    Parameters
+    ----------
+    samples : iterable of str
+        The lyrics texts.
+    size : int, optional
+        Maximum size of the dictionary in bytes (the default value is 32768,
+        the largest that zlib can use).
+
+    Returns
+    -------
+    zdict : bytes
+        The dictionary, empty if nothing is common to the songs.
+
+    """
+    counts = Counter()
+    for lyrics in samples:
+        lines = set(line.strip() for line in lyrics.splitlines())
+        words = set(word for line in lines for word in line.split())
+        # NOTE: the strings are counted once per song, i.e. a chorus doesn't
+        # count more than a line found in two songs
+        counts.update(s for s in lines | words if len(s) > 3)
+    # The bytes saved by each string if it is in the dictionary
+    scores = [((count - 1) * len(string), string)
+              for string, count in counts.items() if count > 1]
+    strings = []
+    total = 0
+    for _, string in sorted(scores, reverse=True):
+        nb_bytes = len(string.encode('utf-8')) + 1
+        if total + nb_bytes > size:
+            continue
+        strings.append(string)
+        total += nb_bytes
+    return "\n".join(reversed(strings)).encode('utf-8')
+
+
+def copy_zdicts(db_conn, schema_name):
+    """Copy the dictionaries of an attached database.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database receiving the dictionaries.
+    schema_name : str
+        The name of the attached database whose table `lyrics_zdict` is
+        copied.
+
+    Returns
+    -------
+    nb_zdicts : int
+        Number of copied dictionaries.
+
+    """
+    db_conn.execute(_ZDICT_TABLE_SQL)
+    return db_conn.execute(
+        "INSERT OR IGNORE INTO lyrics_zdict (zdict_id, zdict) SELECT zdict_id,"
+        " zdict FROM {}.lyrics_zdict".format(schema_name)).rowcount
+
+
+def has_zdicts(db_conn):
+    """Return whether a database has the table of the dictionaries.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    bool
+        True if the table `lyrics_zdict` exists, False otherwise.
+
+    """
+    return db_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND "
+        "name='lyrics_zdict'").fetchone() is not None
+
+
+def save_zdict(db_conn, zdict):
+    """Save a dictionary in the table `lyrics_zdict` of a database.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+    zdict : bytes
+        The dictionary.
+
+    Returns
+    -------
+    zdict_id : int
+        The id of the saved dictionary.
+
+    """
+    db_conn.execute(_ZDICT_TABLE_SQL)
+    cur = db_conn.execute("INSERT INTO lyrics_zdict (zdict) VALUES (?)",
+                          (zdict,))
+    return cur.lastrowid
+
+
+def compress_db_lyrics(db_filepath, compress=True,
+                       sample_size=DEFAULT_SAMPLE_SIZE,
+                       zdict_size=MAX_ZDICT_SIZE, level=DEFAULT_LEVEL,
+                       batch_size=1000, vacuum=True):
+    """Compress (or decompress) the lyrics of an existing music database.
+
+    A new dictionary is trained on a random sample of the lyrics and all the
+    lyrics are compressed again with it, including the ones that were
+    already compressed. The songs are updated by batches, one transaction
+    per batch, and the full-text index of the songs is kept in sync.
+
+    Parameters
+    ----------
+    db_filepath : str
+        Path to the music database.
+    compress : bool, optional
+        Whether the lyrics are compressed, otherwise they are stored back as
+        text (the default value is True).
+    sample_size : int, optional
+        Number of lyrics on which the dictionary is trained (the default
+        value is 2000). 0 implies that no dictionary is used.
+    zdict_size : int, optional
+        Maximum size of the dictionary in bytes (the default value is 32768).
+    level : int, optional
+        The zlib compression level (the default value is 9).
+    batch_size : int, optional
+        Number of songs updated per transaction (the default value is 1000).
+    vacuum : bool, optional
+        Whether the database is vacuumed afterwards for giving the freed
+        pages back to the file system (the default value is True).
+
+    Returns
+    -------
+    stats : dict [str, int]
+        The number of converted songs ('songs') and the size in bytes of the
+        lyrics before ('lyrics_bytes_before') and after
+        ('lyrics_bytes_after') the conversion.
+
+    Raises
+    ------
+    FileNotFoundError
+        Raised if the music database doesn't exist.
+    sqlite3.Error
+        Raised if a query failed. The batch being converted is then rolled
+        back.
+    ValueError
+        Raised if some lyrics couldn't be decompressed.
+
+    """
+    db_filepath = os.path.expanduser(db_filepath)
+    if not os.path.isfile(db_filepath):
+        raise FileNotFoundError("No music database found: {}".format(
+            db_filepath))
+    db_conn = sqlite3.connect(db_filepath, isolation_level=None)
+    try:
+        codec = register_lyrics_text(db_conn)
+        table, rowid = _SONGS_TABLES[get_db_schema_version(db_conn)]
+        codec.level = level
+        codec.zdict_id = 0
+        if compress and sample_size:
+            logger.debug("Training the dictionary on {} lyrics ...".format(
+                sample_size))
+            samples = [row[0] for row in db_conn.execute(
+                "SELECT lyrics_text(lyrics) FROM {} WHERE lyrics IS NOT NULL"
+                " ORDER BY RANDOM() LIMIT ?".format(table), (sample_size,))]
+            zdict = train_zdict(samples, zdict_size)
+            if zdict:
+                codec.zdict_id = save_zdict(db_conn, zdict)
+                codec.zdicts[codec.zdict_id] = zdict
+                logger.debug("Dictionary {} saved ({} bytes)".format(
+                    codec.zdict_id, len(zdict)))
+        convert = codec.compress if compress else str
+        stats = {'songs': 0, 'lyrics_bytes_before': 0,
+                 'lyrics_bytes_after': 0}
+        select_sql = "SELECT {0}, lyrics FROM {1} WHERE {0} > ? AND lyrics" \
+                     " IS NOT NULL ORDER BY {0} LIMIT ?".format(rowid, table)
+        update_sql = "UPDATE {} SET lyrics=? WHERE {}=?".format(table, rowid)
+        last_rowid = -1
+        while True:
+            rows = db_conn.execute(select_sql,
+                                   (last_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            updates = []
+            for song_rowid, value in rows:
+                new_value = convert(codec.decompress(value))
+                stats['lyrics_bytes_before'] += _get_size(value)
+                stats['lyrics_bytes_after'] += _get_size(new_value)
+                updates.append((new_value, song_rowid))
+            db_conn.execute("BEGIN")
+            try:
+                db_conn.executemany(update_sql, updates)
+                db_conn.execute("COMMIT")
+            except sqlite3.Error:
+                db_conn.execute("ROLLBACK")
+                raise
+            stats['songs'] += len(rows)
+            last_rowid = rows[-1][0]
+        logger.debug("{} song{} converted".format(stats['songs'],
+                                                  plural(stats['songs'])))
+        if codec.zdicts:
+            # The previous dictionaries are not used anymore
+            db_conn.execute("DELETE FROM lyrics_zdict WHERE zdict_id<>?",
+                            (codec.zdict_id,))
+        if vacuum:
+            db_conn.execute("VACUUM")
+            # NOTE: VACUUM can renumber the rowids of the songs of a
+            # version 1 db to which the full-text index refers
+            if has_lyrics_fts(db_conn):
+                rebuild_lyrics_fts(db_conn)
+    finally:
+        db_conn.close()
+    logger.info("<color>Lyrics {}compressed:</color> {} bytes -> {} "
+                "bytes".format("" if compress else "de",
+                               stats['lyrics_bytes_before'],
+                               stats['lyrics_bytes_after']))
+    return stats
+
+
+def _get_size(value):
+    """Return the size in bytes of a lyrics value as stored in the database."""
+    if isinstance(value, bytes):
+        return len(value)
+    return len(value.encode('utf-8'))
@@ -0,0 +1,51 @@
+-- Full-text index of the songs (requires SQLite compiled with FTS5)
+-- NOTE: the text is not copied, the index refers to the rows of songs through
+-- their rowid (external content table)
+-- NOTE: the lyrics can be compressed, the index reads them with the SQL
+-- function lyrics_text() which must be registered on the connection (see
+-- lyrics_scraping.compression)
+create view if not exists songs_text as
+    select rowid, song_title, artist_name, album_title,
+           lyrics_text(lyrics) as lyrics
+    from songs;
+
+create virtual table if not exists lyrics_fts using fts5(
+    song_title,
+    artist_name,
+    album_title,
+    lyrics,
+    content='songs_text',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 1'
+);
+
+-- Keep the index in sync with the songs
+-- NOTE: the plain-text lyrics are indexed as is, thus the songs can be
+-- modified from any connection (e.g. the sqlite3 shell). The compressed
+-- lyrics are indexed by the temporary triggers of lyrics_fts_temp.sql which
+-- are only created on the connections where lyrics_text() is registered
+create trigger if not exists songs_fts_insert after insert on songs
+when typeof(new.lyrics) <> 'blob' begin
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    values (new.rowid, new.song_title, new.artist_name, new.album_title,
+            new.lyrics);
+end;
+
+create trigger if not exists songs_fts_delete after delete on songs
+when typeof(old.lyrics) <> 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    values ('delete', old.rowid, old.song_title, old.artist_name,
+            old.album_title, old.lyrics);
+end;
+
+create trigger if not exists songs_fts_update after update on songs
+when typeof(old.lyrics) <> 'blob' and typeof(new.lyrics) <> 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    values ('delete', old.rowid, old.song_title, old.artist_name,
+            old.album_title, old.lyrics);
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    values (new.rowid, new.song_title, new.artist_name, new.album_title,
+            new.lyrics);
+end;
@@ -0,0 +1,34 @@
+-- Temporary triggers indexing the compressed lyrics of the songs (see
+-- lyrics_fts.sql)
+-- NOTE: they call the SQL function lyrics_text(), thus they are created on
+-- each connection where it is registered (see lyrics_scraping.compression)
+-- and the songs with compressed lyrics must be modified from such a
+-- connection for the index to stay in sync
+create temp trigger if not exists songs_fts_insert_blob
+after insert on main.songs
+when typeof(new.lyrics) = 'blob' begin
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    values (new.rowid, new.song_title, new.artist_name, new.album_title,
+            lyrics_text(new.lyrics));
+end;
+
+create temp trigger if not exists songs_fts_delete_blob
+after delete on main.songs
+when typeof(old.lyrics) = 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    values ('delete', old.rowid, old.song_title, old.artist_name,
+            old.album_title, lyrics_text(old.lyrics));
+end;
+
+create temp trigger if not exists songs_fts_update_blob
+after update on main.songs
+when typeof(old.lyrics) = 'blob' or typeof(new.lyrics) = 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    values ('delete', old.rowid, old.song_title, old.artist_name,
+            old.album_title, lyrics_text(old.lyrics));
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    values (new.rowid, new.song_title, new.artist_name, new.album_title,
+            lyrics_text(new.lyrics));
+end;
@@ -0,0 +1,38 @@
+-- Temporary triggers indexing the compressed lyrics of the songs of a version
+-- 2 music database (see lyrics_fts_v2.sql)
+-- NOTE: they call the SQL function lyrics_text(), thus they are created on
+-- each connection where it is registered (see lyrics_scraping.compression)
+-- and the songs with compressed lyrics must be modified from such a
+-- connection for the index to stay in sync
+create temp trigger if not exists song_fts_insert_blob
+after insert on main.song
+when typeof(new.lyrics) = 'blob' begin
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    select new.song_id, new.song_title, artist.artist_name, album.album_title,
+           lyrics_text(new.lyrics)
+    from album join artist using(artist_id) where album_id = new.album_id;
+end;
+
+create temp trigger if not exists song_fts_delete_blob
+after delete on main.song
+when typeof(old.lyrics) = 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    select 'delete', old.song_id, old.song_title, artist.artist_name,
+           album.album_title, lyrics_text(old.lyrics)
+    from album join artist using(artist_id) where album_id = old.album_id;
+end;
+
+create temp trigger if not exists song_fts_update_blob
+after update on main.song
+when typeof(old.lyrics) = 'blob' or typeof(new.lyrics) = 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    select 'delete', old.song_id, old.song_title, artist.artist_name,
+           album.album_title, lyrics_text(old.lyrics)
+    from album join artist using(artist_id) where album_id = old.album_id;
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    select new.song_id, new.song_title, artist.artist_name, album.album_title,
+           lyrics_text(new.lyrics)
+    from album join artist using(artist_id) where album_id = new.album_id;
+end;
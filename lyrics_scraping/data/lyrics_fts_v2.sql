@@ -0,0 +1,56 @@
+-- Full-text index of the songs of a version 2 music database (requires SQLite
+-- compiled with FTS5)
+-- NOTE: the text is not copied, the index refers to the rows of the view
+-- songs through their rowid, i.e. the song_id (external content table)
+-- NOTE: the lyrics can be compressed, the index reads them with the SQL
+-- function lyrics_text() which must be registered on the connection (see
+-- lyrics_scraping.compression)
+create view if not exists songs_text as
+    select rowid, song_title, artist_name, album_title,
+           lyrics_text(lyrics) as lyrics
+    from songs;
+
+create virtual table if not exists lyrics_fts using fts5(
+    song_title,
+    artist_name,
+    album_title,
+    lyrics,
+    content='songs_text',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 1'
+);
+
+-- Keep the index in sync with the songs
+-- NOTE: the plain-text lyrics are indexed as is, thus the songs can be
+-- modified from any connection (e.g. the sqlite3 shell). The compressed
+-- lyrics are indexed by the temporary triggers of lyrics_fts_temp_v2.sql
+-- which are only created on the connections where lyrics_text() is registered
+create trigger if not exists song_fts_insert after insert on song
+when typeof(new.lyrics) <> 'blob' begin
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    select new.song_id, new.song_title, artist.artist_name, album.album_title,
+           new.lyrics
+    from album join artist using(artist_id) where album_id = new.album_id;
+end;
+
+create trigger if not exists song_fts_delete after delete on song
+when typeof(old.lyrics) <> 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    select 'delete', old.song_id, old.song_title, artist.artist_name,
+           album.album_title, old.lyrics
+    from album join artist using(artist_id) where album_id = old.album_id;
+end;
+
+create trigger if not exists song_fts_update after update on song
+when typeof(old.lyrics) <> 'blob' and typeof(new.lyrics) <> 'blob' begin
+    insert into lyrics_fts(lyrics_fts, rowid, song_title, artist_name,
+                           album_title, lyrics)
+    select 'delete', old.song_id, old.song_title, artist.artist_name,
+           album.album_title, old.lyrics
+    from album join artist using(artist_id) where album_id = old.album_id;
+    insert into lyrics_fts(rowid, song_title, artist_name, album_title, lyrics)
+    select new.song_id, new.song_title, artist.artist_name, album.album_title,
+           new.lyrics
+    from album join artist using(artist_id) where album_id = new.album_id;
+end;
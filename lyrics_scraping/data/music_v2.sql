@@ -0,0 +1,156 @@
+-- Version 2 of the music database: the artists, albums and songs are
+-- identified by integers instead of their names and titles, which are thus
+-- stored only once
+pragma user_version = 2;
+
+-- Artists
+create table artist (
+    artist_id integer primary key, -- alias of the rowid
+    artist_name text not null unique -- artist name (e.g. solo, group)
+);
+
+create table artist_url (
+    artist_url text primary key not null, -- artist's URL (e.g. from azlyrics.com)
+    artist_id integer not null,
+    error_on_last_time boolean,
+    nb_requests integer not null,
+    foreign key(artist_id) references artist(artist_id)
+) without rowid;
+
+-- Albums
+create table album (
+    album_id integer primary key,
+    artist_id integer not null, -- artist can also be a group
+    album_title text not null,
+    year text, -- year the album was released
+    foreign key(artist_id) references artist(artist_id),
+    unique(artist_id, album_title)
+);
+
+create table album_url (
+    album_url text primary key not null, -- album's URL (e.g. from azlyrics.com)
+    album_id integer not null,
+    foreign key(album_id) references album(album_id)
+) without rowid;
+
+-- Songs
+create table song (
+    song_id integer primary key,
+    album_id integer not null,
+    song_title text not null,
+    lyrics text,
+    year text, -- year the song was published
+    foreign key(album_id) references album(album_id),
+    unique(album_id, song_title)
+);
+
+-- For linking the URLs to their songs and searching the songs by title
+create index song_title_idx on song(song_title);
+
+create table song_url (
+    song_url text primary key not null, -- song's URL (e.g. from azlyrics.com)
+    song_id integer not null,
+    foreign key(song_id) references song(song_id)
+) without rowid;
+
+-- For reading the URL of a song
+create index song_url_song_id_idx on song_url(song_id);
+
+-- Views with the tables and columns of the version 1 (see music.sql) so that
+-- both versions are read and filled with the same SQL queries
+-- NOTE: the rowid of songs is the song_id, i.e. the insertion order
+create view artists as
+    select artist_name from artist;
+
+create view artists_urls as
+    select artist_url.artist_url, artist.artist_name,
+           artist_url.error_on_last_time, artist_url.nb_requests
+    from artist_url join artist using(artist_id);
+
+create view albums as
+    select album.album_title, artist.artist_name, album.year
+    from album join artist using(artist_id);
+
+-- NOTE: the URLs views also have the artist (and album) of their album or
+-- song, which the version 1 doesn't have
+create view albums_urls as
+    select album_url.album_url, album.album_title, artist.artist_name
+    from album_url join album using(album_id) join artist using(artist_id);
+
+create view songs as
+    select song.song_id as rowid, song.song_title, artist.artist_name,
+           album.album_title, song.lyrics, song.year
+    from song join album using(album_id) join artist using(artist_id);
+
+create view songs_urls as
+    select song_url.song_url, song.song_title, artist.artist_name,
+           album.album_title
+    from song_url join song using(song_id) join album using(album_id)
+    join artist using(artist_id);
+
+-- NOTE: the conflict clause of the INSERT on the view (e.g. OR IGNORE)
+-- applies to the INSERTs within the triggers
+create trigger artists_insert instead of insert on artists begin
+    insert into artist(artist_name) values (new.artist_name);
+end;
+
+create trigger artists_urls_insert instead of insert on artists_urls begin
+    insert or ignore into artist(artist_name) values (new.artist_name);
+    insert into artist_url(artist_url, artist_id, error_on_last_time,
+                           nb_requests)
+    values (new.artist_url,
+            (select artist_id from artist
+             where artist_name = new.artist_name),
+            new.error_on_last_time, new.nb_requests);
+end;
+
+create trigger albums_insert instead of insert on albums begin
+    insert or ignore into artist(artist_name) values (new.artist_name);
+    insert into album(artist_id, album_title, year)
+    values ((select artist_id from artist
+             where artist_name = new.artist_name),
+            new.album_title, new.year);
+end;
+
+-- NOTE: if only the title of the album or song is given like in the version
+-- 1, the last album or song inserted with this title is picked
+create trigger albums_urls_insert instead of insert on albums_urls begin
+    insert into album_url(album_url, album_id)
+    values (new.album_url,
+            case when new.artist_name is null then
+                (select max(album_id) from album
+                 where album_title = new.album_title)
+            else
+                (select album_id from album join artist using(artist_id)
+                 where album_title = new.album_title and
+                       artist_name = new.artist_name)
+            end);
+end;
+
+create trigger songs_insert instead of insert on songs begin
+    insert or ignore into artist(artist_name) values (new.artist_name);
+    insert or ignore into album(artist_id, album_title, year)
+    values ((select artist_id from artist
+             where artist_name = new.artist_name),
+            new.album_title, new.year);
+    insert into song(album_id, song_title, lyrics, year)
+    values ((select album_id from album join artist using(artist_id)
+             where artist_name = new.artist_name and
+                   album_title = new.album_title),
+            new.song_title, new.lyrics, new.year);
+end;
+
+create trigger songs_urls_insert instead of insert on songs_urls begin
+    insert into song_url(song_url, song_id)
+    values (new.song_url,
+            case when new.artist_name is null then
+                (select max(song_id) from song
+                 where song_title = new.song_title)
+            else
+                (select song_id from song join album using(album_id)
+                 join artist using(artist_id)
+                 where song_title = new.song_title and
+                       artist_name = new.artist_name and
+                       album_title = new.album_title)
+            end);
+end;
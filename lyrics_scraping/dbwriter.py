@@ -0,0 +1,195 @@
+"""Module that defines the writer of the music database.
+
+The writer is a thread that owns its own connection to the database and
+inserts the batches of rows that are queued by the scrapers, one transaction
+per batch. Thus, the threads that fetch and parse the webpages never wait on
+SQLite locks, they only wait if the writer falls behind by a whole queue of
+batches.
+
+Each queued batch comes with a :class:`concurrent.futures.Future` that is done
+once the batch is committed (or failed), i.e. when its rows are durable.
+
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from logging import NullHandler
+
+import pyutils.exceptions
+from lyrics_scraping.utils import apply_db_pragmas, plural
+from pyutils.dbutils import sql_sanity_checks
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_QUEUE_SIZE = 8
+
+
+def write_inserts(db_conn, inserts):
+    """Insert rows in a database within a single transaction.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the database.
+    inserts : dict [str, list of tuple]
+        The rows to insert for each INSERT query, inserted with one
+        ``executemany`` per query in the order of the dictionary.
+
+    Returns
+    -------
+    nb_changes : int
+        Number of rows inserted or updated, i.e. without the rows left
+        untouched by their query (e.g. ``ON CONFLICT DO NOTHING``).
+
+    Raises
+    ------
+    SQLSanityCheckError
+        Raised if a sanity check on a query failed.
+    sqlite3.Error
+        Raised if the transaction failed. It is then rolled back.
+
+    """
+    nb_changes = 0
+    try:
+        if not db_conn.in_transaction:
+            db_conn.execute("BEGIN")
+        for sql, rows in inserts.items():
+            # NOTE: the sanity checks are done once per query, not for every
+            # row
+            sql_sanity_checks(sql, rows[0])
+            nb_changes += db_conn.executemany(sql, rows).rowcount
+        db_conn.commit()
+    except (pyutils.exceptions.SQLSanityCheckError, sqlite3.Error):
+        db_conn.rollback()
+        raise
+    return nb_changes
+
+
+class DBWriter:
+    """Thread that inserts the queued batches of rows in a database.
+
+    The thread is started with the first batch and stopped by :meth:`close`.
+
+    Parameters
+    ----------
+    db_filepath : str
+        Path to the SQLite database file.
+    pragmas : str or dict, optional
+        The pragmas applied to the writer's connection, see
+        :func:`~lyrics_scraping.utils.apply_db_pragmas` (the default value is
+        :obj:`None` which implies that no pragma is applied).
+    max_queue_size : int, optional
+        Maximum number of batches waiting to be inserted. Past it,
+        :meth:`submit` blocks until the writer catches up (the default value
+        is 8).
+    setup : callable, optional
+        Called with the writer's connection once it is opened, e.g. for
+        registering SQL functions (the default value is :obj:`None`).
+
+    Attributes
+    ----------
+    max_queue_depth : int
+        Largest number of batches that were waiting to be inserted.
+
+    """
+
+    def __init__(self, db_filepath, pragmas=None,
+                 max_queue_size=DEFAULT_QUEUE_SIZE, setup=None):
+        self.db_filepath = db_filepath
+        self.pragmas = pragmas
+        self.max_queue_size = max_queue_size
+        self.setup = setup
+        self.max_queue_depth = 0
+        self._queue = queue.Queue(max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """Number of batches waiting to be inserted."""
+        return self._queue.qsize()
+
+    def submit(self, inserts):
+        """Queue a batch of rows to be inserted.
+
+        Parameters
+        ----------
+        inserts : dict [str, list of tuple]
+            The rows to insert for each INSERT query (see
+            :func:`write_inserts`). It can be empty, e.g. for waiting on the
+            batches queued before.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Done once the batch is committed. Its result is the number of rows
+            inserted or updated (see :func:`write_inserts`) and its exception
+            is the one that made the transaction fail. The callbacks added to
+            it are called by the writer's thread.
+
+        """
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="DBWriter", daemon=True)
+                self._thread.start()
+            self._queue.put((inserts, future))
+            self.max_queue_depth = max(self.max_queue_depth,
+                                       self._queue.qsize())
+        return future
+
+    def close(self):
+        """Insert the queued batches and stop the writer's thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        """Insert the queued batches until :meth:`close` is called."""
+        db_conn = None
+        error = None
+        try:
+            db_conn = sqlite3.connect(self.db_filepath)
+            if self.pragmas:
+                apply_db_pragmas(db_conn, self.pragmas)
+            if self.setup:
+                self.setup(db_conn)
+        except (sqlite3.Error, ValueError) as e:
+            # All the batches will fail with this error
+            logger.error("<color>The db writer couldn't connect to the db:"
+                         "</color> {}".format(e))
+            error = e
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                inserts, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                    continue
+                try:
+                    nb_changes = write_inserts(db_conn, inserts)
+                except (pyutils.exceptions.SQLSanityCheckError,
+                        sqlite3.Error) as e:
+                    nb_rows = sum(len(rows) for rows in inserts.values())
+                    logger.error("<color>Couldn't insert {} row{} in the db:"
+                                 "</color> {}".format(nb_rows, plural(nb_rows),
+                                                      e))
+                    future.set_exception(e)
+                else:
+                    future.set_result(nb_changes)
+        finally:
+            if db_conn is not None:
+                db_conn.close()
@@ -23,6 +23,11 @@ class InvalidURLDomainError(Exception):
     """Raised if the URL's domain is invalid."""
 
 
+class InvalidProfileError(Exception):
+    """Raised if an extraction profile is badly defined, e.g. unknown option or
+    bad regex."""
+
+
 class MultipleAlbumError(Exception):
     """Raised if the album extraction scheme broke: more than one album was
     found on the lyrics webpage."""
@@ -47,6 +52,10 @@ class OverwriteSongError(Exception):
     because it is disabled by the user."""
 
 
+class UnknownParserError(Exception):
+    """Raised if the parser backend is not found in the registry of parsers."""
+
+
 class WrongAlbumYearError(Exception):
     """Raised if the album's year extraction scheme broke: the album's year is
     not a number with four digits."""
@@ -0,0 +1,313 @@
+"""Module that defines the columnar export of the scraped data to `Apache
+Arrow`_ record batches and `Parquet`_ files.
+
+The data is either the scraped data of a lyrics scraper (see
+:meth:`~scrapers.lyrics_scraper.LyricsScraper.get_scraped_data`) or the
+content of a music database (see `music.sql schema`_). In both cases, the
+rows are streamed in record batches of a fixed size, thus the memory used
+doesn't depend on the size of the tables.
+
+The columns with many repeated values (the artist's name, the album title and
+the year) are dictionary-encoded and the lyrics are stored as a large string
+column. The compressed lyrics (see :mod:`~lyrics_scraping.compression`) are
+exported as text.
+
+`pyarrow`_ is an optional dependency::
+
+    $ pip install LyricsScraping[export]
+
+.. _Apache Arrow: https://arrow.apache.org/
+.. _music.sql schema: https://bit.ly/2kIMYvn
+.. _Parquet: https://parquet.apache.org/
+.. _pyarrow: https://arrow.apache.org/docs/python/
+
+"""
+
+import logging
+import os
+import sqlite3
+from logging import NullHandler
+
+from lyrics_scraping.compression import register_lyrics_text
+from lyrics_scraping.utils import get_db_schema_version
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # pyarrow is an optional dependency
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_BATCH_SIZE = 10000
+# The exported columns of each table, in the order of the scraped data
+COLUMNS = {
+    'albums': ('album_title', 'artist_name', 'year'),
+    'artists': ('artist_name',),
+    'songs': ('song_title', 'artist_name', 'album_title', 'lyrics_url',
+              'lyrics', 'year'),
+}
+_DICTIONARY_COLUMNS = {'album_title', 'artist_name', 'year'}
+# The SELECT queries giving the columns of each table from the music db
+_DB_QUERIES = {
+    'albums': "SELECT album_title, artist_name, year FROM albums",
+    'artists': "SELECT artist_name FROM artists",
+}
+# The SELECT query of the songs for each db schema version
+# NOTE: the URLs of the version 1 are only linked to the songs through their
+# titles, thus the URL of a song is left NULL if other songs have the same
+# title. The rowid of the songs view of the version 2 is the song_id
+_SONGS_DB_QUERIES = {
+    1: "SELECT songs.song_title, songs.artist_name, songs.album_title,"
+       " CASE WHEN titles.nb_songs=1 THEN urls.song_url END,"
+       " lyrics_text(songs.lyrics), songs.year FROM songs"
+       " JOIN (SELECT song_title, COUNT(*) AS nb_songs FROM songs"
+       " GROUP BY song_title) AS titles"
+       " ON titles.song_title=songs.song_title"
+       " LEFT JOIN (SELECT song_title, MIN(song_url) AS song_url"
+       " FROM songs_urls GROUP BY song_title) AS urls"
+       " ON urls.song_title=songs.song_title",
+    2: "SELECT songs.song_title, songs.artist_name, songs.album_title,"
+       " (SELECT MIN(song_url) FROM song_url"
+       " WHERE song_url.song_id=songs.rowid),"
+       " lyrics_text(songs.lyrics), songs.year FROM songs",
+}
+
+
+def _check_pyarrow():
+    """Raise an :exc:`ImportError` if pyarrow is not installed."""
+    if pyarrow is None:
+        raise ImportError("pyarrow is required for exporting the scraped data:"
+                          " pip install LyricsScraping[export]")
+
+
+def get_schema(table):
+    """Return the Arrow schema of a table.
+
+    Parameters
+    ----------
+    table : str
+        The table: 'albums', 'artists' or 'songs'.
+
+    Returns
+    -------
+    schema : pyarrow.Schema
+        The schema where 'artist_name', 'album_title' and 'year' are
+        dictionary-encoded strings and 'lyrics' is a large string.
+
+    Raises
+    ------
+    ImportError
+        Raised if pyarrow is not installed.
+
+    """
+    _check_pyarrow()
+    fields = []
+    for column in COLUMNS[table]:
+        if column in _DICTIONARY_COLUMNS:
+            column_type = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        elif column == 'lyrics':
+            column_type = pyarrow.large_string()
+        else:
+            column_type = pyarrow.string()
+        fields.append(pyarrow.field(column, column_type))
+    return pyarrow.schema(fields)
+
+
+def iter_record_batches(rows, table, batch_size=DEFAULT_BATCH_SIZE):
+    """Convert rows into Arrow record batches.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        The rows of the table whose values are in the order of
+        :data:`COLUMNS`. They are consumed lazily.
+    table : str
+        The table: 'albums', 'artists' or 'songs'.
+    batch_size : int, optional
+        Maximum number of rows per record batch (the default value is 10000).
+
+    Yields
+    ------
+    batch : pyarrow.RecordBatch
+        The next record batch.
+
+    """
+    schema = get_schema(table)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield _build_record_batch(batch, schema)
+            batch = []
+    if batch:
+        yield _build_record_batch(batch, schema)
+
+
+def iter_db_record_batches(db_filepath, table, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream a table of a music database into Arrow record batches.
+
+    The database is opened in read-only mode and the rows are fetched one
+    batch at a time.
+
+    Parameters
+    ----------
+    db_filepath : str
+        Path to the SQLite music database.
+    table : str
+        The table: 'albums', 'artists' or 'songs'.
+    batch_size : int, optional
+        Maximum number of rows per record batch (the default value is 10000).
+
+    Yields
+    ------
+    batch : pyarrow.RecordBatch
+        The next record batch.
+
+    """
+    db_uri = "file:{}?mode=ro".format(os.path.expanduser(db_filepath))
+    db_conn = sqlite3.connect(db_uri, uri=True)
+    try:
+        register_lyrics_text(db_conn)
+        if table == "songs":
+            sql = _SONGS_DB_QUERIES[get_db_schema_version(db_conn)]
+        else:
+            sql = _DB_QUERIES[table]
+        cur = db_conn.execute(sql)
+
+        def iter_rows():
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+
+        yield from iter_record_batches(iter_rows(), table, batch_size)
+    finally:
+        db_conn.close()
+
+
+def iter_scraped_data_record_batches(scraped_data, table,
+                                     batch_size=DEFAULT_BATCH_SIZE):
+    """Stream a table of the scraped data into Arrow record batches.
+
+    Parameters
+    ----------
+    scraped_data : dict
+        The scraped data, see
+        :meth:`~scrapers.lyrics_scraper.LyricsScraper.get_scraped_data`.
+    table : str
+        The table: 'albums', 'artists' or 'songs'.
+    batch_size : int, optional
+        Maximum number of rows per record batch (the default value is 10000).
+
+    Yields
+    ------
+    batch : pyarrow.RecordBatch
+        The next record batch.
+
+    """
+    assert tuple(scraped_data[table]['headers']) == COLUMNS[table], \
+        "The headers of '{}' don't match the exported columns".format(table)
+    # NOTE: the records spilled to the disk are read back one at a time
+    return iter_record_batches(iter(scraped_data[table]['data']), table,
+                               batch_size)
+
+
+def write_parquet(batches, filepath, table):
+    """Write record batches into a Parquet file, one batch at a time.
+
+    Parameters
+    ----------
+    batches : iterable of pyarrow.RecordBatch
+        The record batches of the table.
+    filepath : str
+        Path to the Parquet file.
+    table : str
+        The table: 'albums', 'artists' or 'songs'.
+
+    Returns
+    -------
+    nb_rows : int
+        Number of rows written.
+
+    """
+    nb_rows = 0
+    with pyarrow.parquet.ParquetWriter(filepath, get_schema(table)) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            nb_rows += batch.num_rows
+    return nb_rows
+
+
+def export_parquet(dirpath, scraped_data=None, db_filepath=None, tables=None,
+                   batch_size=DEFAULT_BATCH_SIZE):
+    """Export the scraped data or a music database into Parquet files.
+
+    One Parquet file is written for each table, e.g. *songs.parquet*.
+
+    Parameters
+    ----------
+    dirpath : str
+        Path to the directory where the Parquet files are written. It is
+        created if needed.
+    scraped_data : dict, optional
+        The scraped data, see
+        :meth:`~scrapers.lyrics_scraper.LyricsScraper.get_scraped_data`.
+    db_filepath : str, optional
+        Path to the SQLite music database, only used if no `scraped_data` is
+        given.
+    tables : list of str, optional
+        The tables to export (the default value is :obj:`None` which implies
+        that all the tables are exported).
+    batch_size : int, optional
+        Maximum number of rows per record batch (the default value is 10000).
+
+    Returns
+    -------
+    filepaths : dict [str, str]
+        The path of the Parquet file of each table.
+
+    Raises
+    ------
+    ImportError
+        Raised if pyarrow is not installed.
+    ValueError
+        Raised if neither `scraped_data` nor `db_filepath` is given.
+
+    """
+    _check_pyarrow()
+    if scraped_data is None and not db_filepath:
+        raise ValueError("Either the scraped data or the path to the music db "
+                         "must be given")
+    dirpath = os.path.expanduser(dirpath)
+    os.makedirs(dirpath, exist_ok=True)
+    filepaths = {}
+    for table in tables or sorted(COLUMNS):
+        if scraped_data is not None:
+            batches = iter_scraped_data_record_batches(scraped_data, table,
+                                                       batch_size)
+        else:
+            batches = iter_db_record_batches(db_filepath, table, batch_size)
+        filepath = os.path.join(dirpath, "{}.parquet".format(table))
+        nb_rows = write_parquet(batches, filepath, table)
+        logger.info("{} rows of '{}' exported to {}".format(nb_rows, table,
+                                                             filepath))
+        filepaths[table] = filepath
+    return filepaths
+
+
+def _build_record_batch(rows, schema):
+    """Build a record batch from rows, column by column."""
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if pyarrow.types.is_dictionary(field.type):
+            array = pyarrow.array(values, pyarrow.string()).dictionary_encode()
+        else:
+            array = pyarrow.array(values, field.type)
+        arrays.append(array)
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
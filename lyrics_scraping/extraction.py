@@ -0,0 +1,266 @@
+"""Module that defines the engine executing the declarative extraction
+profiles.
+
+An extraction profile describes, as data, where to find the useful info on a
+given type of webpage (e.g. the lyrics webpage from `www.azlyrics.com`_): CSS
+selectors, attributes and regexes. The profiles are compiled only once (the
+regexes are compiled and the options are validated) and are then executed
+with any parser backend from :mod:`~lyrics_scraping.parsers`.
+
+Thus, when the layout of a lyrics website changes, only its profiles need to
+be fixed, e.g. the `azlyrics_profiles.yaml`_ data file.
+
+.. _azlyrics_profiles.yaml:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/azlyrics_profiles.yaml
+.. _www.azlyrics.com: https://www.azlyrics.com/
+
+"""
+
+import logging
+import re
+from logging import NullHandler
+
+import lyrics_scraping.exceptions
+from pyutils.genutils import load_yaml
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class Field:
+    """A compiled field of an extraction profile.
+
+    See `azlyrics_profiles.yaml`_ for a description of the options.
+
+    Parameters
+    ----------
+    name : str
+        Name of the field (used in error messages).
+    spec : dict
+        The options of the field as defined in the profile.
+
+    Raises
+    ------
+    InvalidProfileError
+        Raised if the field has an unknown option or a bad regex.
+
+    """
+
+    __slots__ = ('name', 'selector', 'following', 'many', 'attr', 'tail',
+                 'strip', 'regex', 'findall', 'fields')
+    _OPTIONS = {'select', 'following', 'many', 'attr', 'tail', 'strip',
+                'regex', 'findall', 'fields'}
+
+    def __init__(self, name, spec):
+        spec = spec or {}
+        unknown_options = set(spec) - self._OPTIONS
+        if unknown_options:
+            raise lyrics_scraping.exceptions.InvalidProfileError(
+                "Unknown option{} for the field '{}': {}".format(
+                    "s" if len(unknown_options) > 1 else "", name,
+                    ", ".join(sorted(unknown_options))))
+        self.name = name
+        self.selector = spec.get('select')
+        self.following = spec.get('following')
+        if self.selector and self.following:
+            raise lyrics_scraping.exceptions.InvalidProfileError(
+                "The field '{}' can't have both 'select' and 'following'"
+                "".format(name))
+        self.many = bool(spec.get('many', False))
+        self.attr = spec.get('attr')
+        self.tail = bool(spec.get('tail', False))
+        strip = spec.get('strip', False)
+        # True: strip whitespaces, i.e. str.strip(None)
+        self.strip = None if strip is True else strip
+        try:
+            self.regex = re.compile(spec['regex']) if spec.get('regex') else None
+        except re.error as e:
+            raise lyrics_scraping.exceptions.InvalidProfileError(
+                "Bad regex for the field '{}': {}".format(name, e))
+        self.findall = bool(spec.get('findall', False))
+        self.fields = None
+        if spec.get('fields'):
+            self.fields = {k: Field(k, v) for k, v in spec['fields'].items()}
+
+    def extract(self, backend, node):
+        """Extract the field from a node.
+
+        Parameters
+        ----------
+        backend : lyrics_scraping.parsers.ParserBackend
+            The backend that built the node.
+        node
+            The node from which the field is extracted.
+
+        Returns
+        -------
+        value : str, list, dict or None
+            A list of values if the field is 'many', the value from the first
+            matched node otherwise (:obj:`None` if no node is matched).
+
+        """
+        if self.following:
+            nodes = self._following_nodes(backend, node)
+        elif self.selector:
+            if self.many:
+                nodes = backend.select(node, self.selector)
+            else:
+                nodes = [backend.select_one(node, self.selector)]
+        else:
+            nodes = [node]
+        values = [self._value(backend, n) for n in nodes if n is not None]
+        if self.many:
+            return values
+        return values[0] if values else None
+
+    def _following_nodes(self, backend, node):
+        """Return the element siblings following a node, up to the sibling
+        with the class `until_class`, that have the attribute `with_attr`."""
+        until_class = self.following.get('until_class')
+        with_attr = self.following.get('with_attr')
+        nodes = []
+        for sibling in backend.next_siblings(node):
+            if until_class and until_class in backend.get_classes(sibling):
+                break
+            if with_attr and not backend.get_attr(sibling, with_attr):
+                continue
+            nodes.append(sibling)
+            if not self.many:
+                break
+        return nodes
+
+    def _value(self, backend, node):
+        """Get the value of the field from a matched node."""
+        if self.fields:
+            return {name: field.extract(backend, node)
+                    for name, field in self.fields.items()}
+        if self.attr:
+            text = backend.get_attr(node, self.attr)
+        elif self.tail:
+            text = backend.tail(node)
+        else:
+            text = backend.get_text(node)
+        if text is None:
+            return None
+        if self.strip is not False:
+            text = text.strip(self.strip)
+        if self.regex:
+            if self.findall:
+                return self.regex.findall(text)
+            match = self.regex.search(text)
+            if match is None:
+                return None
+            return match.group(1) if self.regex.groups else match.group(0)
+        return text
+
+
+class ExtractionProfile:
+    """A compiled extraction profile for a type of webpage.
+
+    Parameters
+    ----------
+    name : str
+        Name of the profile, e.g. 'lyrics'.
+    spec : dict
+        The fields of the profile as defined in the profiles file. The special
+        key 'parse_only' restricts the document tree built by
+        :meth:`extract_from_html` (see
+        :meth:`lyrics_scraping.parsers.ParserBackend.parse`).
+
+    Raises
+    ------
+    InvalidProfileError
+        Raised if 'parse_only' is not a simple selector or if a field is badly
+        defined.
+
+    """
+
+    _PARSE_ONLY_REGEX = re.compile(r"^[a-zA-Z][\w-]*(?:\.[\w-]+)?$")
+
+    def __init__(self, name, spec):
+        spec = dict(spec)
+        self.name = name
+        self.parse_only = spec.pop('parse_only', None)
+        if self.parse_only and \
+                not self._PARSE_ONLY_REGEX.match(self.parse_only):
+            raise lyrics_scraping.exceptions.InvalidProfileError(
+                "'parse_only' of the profile '{}' must be 'tag' or 'tag.class':"
+                " {}".format(name, self.parse_only))
+        self.fields = {k: Field(k, v) for k, v in spec.items()}
+
+    def extract(self, backend, doc):
+        """Extract all the fields of the profile from a document tree.
+
+        Parameters
+        ----------
+        backend : lyrics_scraping.parsers.ParserBackend
+            The backend that built the document tree.
+        doc
+            The document tree of the webpage.
+
+        Returns
+        -------
+        data : dict
+            The extracted value of each field of the profile. The values are
+            plain Python objects (:obj:`str`, :obj:`list`, :obj:`dict`), i.e.
+            no reference to the document tree is kept.
+
+        """
+        return {name: field.extract(backend, doc)
+                for name, field in self.fields.items()}
+
+    def extract_from_html(self, backend, html, restricted=True):
+        """Build the document tree of a webpage, extract all the fields of the
+        profile from it and release the tree right away.
+
+        Parameters
+        ----------
+        backend : lyrics_scraping.parsers.ParserBackend
+            The backend used for building the document tree.
+        html : str
+            The webpage's HTML.
+        restricted : bool, optional
+            Whether to build only the part of the tree given by the profile's
+            'parse_only' (the default value is True). Set it to False for
+            building the whole tree.
+
+        Returns
+        -------
+        data : dict
+            The extracted value of each field of the profile.
+
+        See Also
+        --------
+        extract : Extracts the fields from an already built document tree.
+
+        """
+        only = self.parse_only if restricted else None
+        doc = backend.parse(html, only=only)
+        try:
+            return self.extract(backend, doc)
+        finally:
+            backend.release(doc)
+
+
+def load_profiles(filepath):
+    """Load and compile the extraction profiles from a YAML file.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the YAML file defining the profiles.
+
+    Returns
+    -------
+    profiles : dict [str, ExtractionProfile]
+        The compiled profiles, keyed by name.
+
+    Raises
+    ------
+    InvalidProfileError
+        Raised if a profile is badly defined.
+
+    """
+    logger.debug("Compiling the extraction profiles from {}".format(filepath))
+    return {name: ExtractionProfile(name, spec)
+            for name, spec in load_yaml(filepath).items()}
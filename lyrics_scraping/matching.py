@@ -0,0 +1,185 @@
+"""Module that defines the fuzzy matching of search queries against titles and
+names, e.g. the song titles from the search results or the artists' names
+from the music database.
+
+The strings are first normalized (Unicode case-folding, accents and
+punctuation removed) and then broken into trigrams: each word is padded with
+two spaces in front and one at the end, e.g. 'life' gives '  l', ' li', 'lif',
+'ife' and 'fe '. The similarity between two strings is the Jaccard index of
+their sets of trigrams which doesn't depend on the order of the words, e.g.
+'New Life - Depeche Mode' and 'Depeche Mode - New Life' are a perfect match.
+
+A :class:`FuzzyIndex` keeps an inverted index (trigram -> strings having it)
+so that all the indexed strings are scored in a single pass over the posting
+lists of the query's trigrams, i.e. the strings without any trigram in common
+with the query are never looked at.
+
+"""
+
+import logging
+import re
+import unicodedata
+from collections import Counter
+from itertools import chain
+from logging import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_MIN_SCORE = 0.3
+_APOSTROPHE_REGEX = re.compile(r"['\u2019]")
+_NON_WORD_REGEX = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    """Normalize a string before matching it.
+
+    The string is case-folded, its accents and apostrophes are removed, '&' is
+    replaced with 'and' and all other punctuation is replaced with a single
+    space.
+
+    Parameters
+    ----------
+    text : str
+        The string to normalize, e.g. "Speak & Spell".
+
+    Returns
+    -------
+    normalized_text : str
+        The normalized string, e.g. "speak and spell".
+
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _APOSTROPHE_REGEX.sub("", text.replace("&", " and "))
+    return _NON_WORD_REGEX.sub(" ", text).strip()
+
+
+def trigrams(text):
+    """Return the set of trigrams of a string once normalized.
+
+    Parameters
+    ----------
+    text : str
+        The string to break into trigrams.
+
+    Returns
+    -------
+    trigrams : frozenset of str
+        The trigrams of every word of the normalized string.
+
+    """
+    grams = set()
+    for word in normalize(text).split():
+        word = "  {} ".format(word)
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return frozenset(grams)
+
+
+class FuzzyIndex:
+    """Trigram index for fuzzy matching queries against a list of strings.
+
+    Parameters
+    ----------
+    strings : iterable of str, optional
+        The strings to index. Their positions in the index are the order in
+        which they are given.
+
+    Examples
+    --------
+    >>> index = FuzzyIndex(["New Life by Depeche Mode", "New Life by Other"])
+    >>> index.best_match("new life, by DEPECHE MODE")
+    (0, 1.0)
+
+    """
+
+    def __init__(self, strings=()):
+        self._postings = {}
+        self._sizes = []
+        for string in strings:
+            self.add(string)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def add(self, string):
+        """Add a string to the index.
+
+        Parameters
+        ----------
+        string : str
+            The string to index.
+
+        Returns
+        -------
+        index : int
+            The position of the string in the index.
+
+        """
+        index = len(self._sizes)
+        grams = trigrams(string)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(index)
+        self._sizes.append(len(grams))
+        return index
+
+    def search(self, query, limit=None, min_score=DEFAULT_MIN_SCORE):
+        """Score all the indexed strings against a query.
+
+        Parameters
+        ----------
+        query : str
+            The string to match, e.g. "New Life by Depeche Mode".
+        limit : int, optional
+            Maximum number of matches to return (the default value is
+            :obj:`None` which implies that all the matches are returned).
+        min_score : float, optional
+            Minimum similarity between 0 and 1 for a string to be a match (the
+            default value is 0.3).
+
+        Returns
+        -------
+        matches : list of tuple
+            The ``(index, score)`` of each match, sorted from the best to the
+            worst match. Ties are sorted by position in the index.
+
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        # Number of trigrams shared with the query for each indexed string
+        # NOTE: Counter.update() counts the concatenated posting lists in C
+        overlaps = Counter()
+        overlaps.update(chain.from_iterable(
+            self._postings.get(gram, ()) for gram in query_grams))
+        nb_query_grams = len(query_grams)
+        matches = []
+        for index, overlap in overlaps.items():
+            # Jaccard index: |A & B| / |A | B|
+            score = overlap / (nb_query_grams + self._sizes[index] - overlap)
+            if score >= min_score:
+                matches.append((index, score))
+        matches.sort(key=lambda m: (-m[1], m[0]))
+        return matches[:limit]
+
+    def best_match(self, query, min_score=DEFAULT_MIN_SCORE):
+        """Return the indexed string that best matches a query.
+
+        Parameters
+        ----------
+        query : str
+            The string to match.
+        min_score : float, optional
+            Minimum similarity between 0 and 1 for a string to be a match (the
+            default value is 0.3).
+
+        Returns
+        -------
+        best_match : tuple
+            The ``(index, score)`` of the best match or ``(None, 0.0)`` if no
+            string is similar enough to the query.
+
+        """
+        matches = self.search(query, limit=1, min_score=min_score)
+        return matches[0] if matches else (None, 0.0)
@@ -0,0 +1,189 @@
+"""Module that migrates a music database to the version 2 of its schema.
+
+The version 1 (see the `music.sql schema`_) identifies the artists, albums and
+songs by their names and titles, which are thus repeated in every row and
+index that refers to them. The version 2 (see the `music_v2.sql schema`_)
+identifies them by integers and keeps the tables of the version 1 as views,
+so that the scrapers read and fill both versions the same way.
+
+The rows are copied table by table with ``INSERT ... SELECT`` queries run by
+SQLite from the attached version 1 database: they are streamed and never
+loaded in Python.
+
+Example
+-------
+Migrate a music database::
+
+    from lyrics_scraping.migration import migrate_db
+
+    counts = migrate_db("~/data/music.sqlite", "~/data/music_v2.sqlite")
+
+.. _music.sql schema: https://bit.ly/2kIMYvn
+.. _music_v2.sql schema:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/music_v2.sql
+
+"""
+
+import logging
+import os
+import sqlite3
+from logging import NullHandler
+
+from lyrics_scraping.compression import (
+    copy_zdicts, has_zdicts, register_lyrics_text)
+from lyrics_scraping.utils import (
+    apply_db_pragmas, create_lyrics_fts, get_data_filepath,
+    get_db_schema_version, has_lyrics_fts, plural)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+# The queries copying the rows of the version 1 db (attached as v1) for each
+# table of the version 2, in order
+# NOTE: the artists and albums only found in the songs are also copied
+_MIGRATION_QUERIES = [
+    ('artist', [
+        "INSERT OR IGNORE INTO artist (artist_name)"
+        " SELECT artist_name FROM v1.artists"
+        " UNION SELECT artist_name FROM v1.albums"
+        " UNION SELECT artist_name FROM v1.songs",
+    ]),
+    ('album', [
+        "INSERT OR IGNORE INTO album (artist_id, album_title, year)"
+        " SELECT artist.artist_id, v1_albums.album_title, v1_albums.year"
+        " FROM v1.albums AS v1_albums JOIN artist"
+        " ON artist.artist_name=v1_albums.artist_name",
+        "INSERT OR IGNORE INTO album (artist_id, album_title, year)"
+        " SELECT artist.artist_id, v1_songs.album_title, v1_songs.year"
+        " FROM v1.songs AS v1_songs JOIN artist"
+        " ON artist.artist_name=v1_songs.artist_name",
+    ]),
+    # NOTE: the songs keep their order, i.e. the order of their albums
+    ('song', [
+        "INSERT OR IGNORE INTO song (album_id, song_title, lyrics, year)"
+        " SELECT album.album_id, v1_songs.song_title, v1_songs.lyrics,"
+        " v1_songs.year FROM v1.songs AS v1_songs"
+        " JOIN artist ON artist.artist_name=v1_songs.artist_name"
+        " JOIN album ON album.artist_id=artist.artist_id"
+        " AND album.album_title=v1_songs.album_title"
+        " ORDER BY v1_songs.rowid",
+    ]),
+    # NOTE: the URLs of the version 1 only know the title of their song or
+    # album, the last one with this title is picked (like the views do)
+    ('song_url', [
+        "INSERT OR IGNORE INTO song_url (song_url, song_id)"
+        " SELECT song_url, song_id FROM (SELECT v1_urls.song_url,"
+        " (SELECT MAX(song_id) FROM song"
+        " WHERE song.song_title=v1_urls.song_title) AS song_id"
+        " FROM v1.songs_urls AS v1_urls) WHERE song_id IS NOT NULL",
+    ]),
+    ('artist_url', [
+        "INSERT OR IGNORE INTO artist_url (artist_url, artist_id,"
+        " error_on_last_time, nb_requests)"
+        " SELECT v1_urls.artist_url, artist.artist_id,"
+        " v1_urls.error_on_last_time, v1_urls.nb_requests"
+        " FROM v1.artists_urls AS v1_urls JOIN artist"
+        " ON artist.artist_name=v1_urls.artist_name",
+    ]),
+    ('album_url', [
+        "INSERT OR IGNORE INTO album_url (album_url, album_id)"
+        " SELECT album_url, album_id FROM (SELECT v1_urls.album_url,"
+        " (SELECT MAX(album_id) FROM album"
+        " WHERE album.album_title=v1_urls.album_title) AS album_id"
+        " FROM v1.albums_urls AS v1_urls) WHERE album_id IS NOT NULL",
+    ]),
+]
+
+
+def migrate_db(src_db_filepath, dst_db_filepath, pragmas='bulk-load'):
+    """Migrate a music database from the version 1 to the version 2 of its
+    schema.
+
+    The version 1 database is left untouched and the version 2 is written in
+    a new file. If the version 1 has a full-text index of its songs, it is
+    also built for the version 2. The compressed lyrics are copied as is,
+    along with their dictionaries.
+
+    Parameters
+    ----------
+    src_db_filepath : str
+        Path to the version 1 database.
+    dst_db_filepath : str
+        Path to the version 2 database. The file must not exist.
+    pragmas : str or dict, optional
+        The pragmas applied to the version 2 database while it is filled, see
+        :func:`~lyrics_scraping.utils.apply_db_pragmas` (the default value is
+        'bulk-load' since the file is discarded if the migration fails).
+
+    Returns
+    -------
+    counts : dict [str, int]
+        Number of rows copied in each table of the version 2 database.
+
+    Raises
+    ------
+    FileExistsError
+        Raised if the version 2 database already exists.
+    FileNotFoundError
+        Raised if the version 1 database doesn't exist.
+    ValueError
+        Raised if the database to migrate is not a version 1 database.
+    sqlite3.Error
+        Raised if a query failed. The version 2 database is then removed.
+
+    """
+    src_db_filepath = os.path.expanduser(src_db_filepath)
+    dst_db_filepath = os.path.expanduser(dst_db_filepath)
+    if not os.path.isfile(src_db_filepath):
+        raise FileNotFoundError("No music database found: {}".format(
+            src_db_filepath))
+    if os.path.exists(dst_db_filepath):
+        raise FileExistsError("The migrated database already exists: "
+                              "{}".format(dst_db_filepath))
+    src_conn = sqlite3.connect(src_db_filepath)
+    try:
+        version = get_db_schema_version(src_conn)
+        with_fts = has_lyrics_fts(src_conn)
+        with_zdicts = has_zdicts(src_conn)
+    finally:
+        src_conn.close()
+    if version != 1:
+        raise ValueError("The music database is not a version 1 database "
+                         "(version {}): {}".format(version, src_db_filepath))
+    logger.info("<color>Migrating the music db to the version 2:</color> "
+                "{}".format(dst_db_filepath))
+    counts = {}
+    db_conn = sqlite3.connect(dst_db_filepath, isolation_level=None)
+    try:
+        with open(get_data_filepath('schema_v2'), 'rt') as f:
+            db_conn.executescript(f.read())
+        if pragmas:
+            apply_db_pragmas(db_conn, pragmas)
+        db_conn.execute("ATTACH DATABASE ? AS v1", (src_db_filepath,))
+        for table, queries in _MIGRATION_QUERIES:
+            db_conn.execute("BEGIN")
+            counts[table] = sum(db_conn.execute(sql).rowcount
+                                for sql in queries)
+            db_conn.execute("COMMIT")
+            logger.debug("{} row{} copied in {}".format(
+                counts[table], plural(counts[table]), table))
+        if with_zdicts:
+            counts['lyrics_zdict'] = copy_zdicts(db_conn, "v1")
+        db_conn.execute("DETACH DATABASE v1")
+        if with_fts:
+            logger.debug("Building the full-text index of the songs ...")
+            register_lyrics_text(db_conn)
+            create_lyrics_fts(db_conn)
+    except (OSError, sqlite3.Error, ValueError):
+        db_conn.close()
+        os.remove(dst_db_filepath)
+        raise
+    else:
+        db_conn.close()
+    logger.info("<color>Music db migrated:</color> {} ({} bytes) -> {} ({} "
+                "bytes)".format(src_db_filepath,
+                                os.path.getsize(src_db_filepath),
+                                dst_db_filepath,
+                                os.path.getsize(dst_db_filepath)))
+    return counts
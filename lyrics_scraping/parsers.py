@@ -0,0 +1,346 @@
+"""Module that defines the parser backends used for building the document
+trees of the scraped webpages.
+
+A parser backend wraps a specific HTML parsing library behind a common
+interface so that the scrapers (e.g.
+:class:`~scrapers.azlyrics_scraper.AZLyricsScraper`) never call the library
+directly. The backends are kept in a registry and the one to be used is
+selected by its name, e.g. with the option ``parser`` in the main config file.
+
+The following backends are registered:
+
+- **bs4-lxml**: `BeautifulSoup`_ with the `lxml`_ parser (the default)
+- **bs4-html.parser**: `BeautifulSoup`_ with Python's built-in ``html.parser``
+- **lxml**: raw `lxml`_ with CSS selectors (only if `cssselect`_ is installed)
+- **selectolax**: `selectolax`_'s lexbor engine (only if it is installed)
+
+.. _BeautifulSoup: https://www.crummy.com/software/BeautifulSoup/
+.. _cssselect: https://pypi.org/project/cssselect/
+.. _lxml: https://lxml.de/
+.. _selectolax: https://github.com/rushter/selectolax
+
+"""
+
+import logging
+import re
+from functools import lru_cache
+from logging import NullHandler
+
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer, Tag
+
+import lyrics_scraping.exceptions
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    # cssselect is an optional dependency of lxml
+    CSSSelector = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+DEFAULT_PARSER = "bs4-lxml"
+_PARSERS = {}
+
+
+class ParserBackend:
+    """Base class for the parser backends.
+
+    The derived classes build a document tree from a webpage's HTML and give
+    access to its nodes through CSS selectors. Nodes are the library's own
+    objects and must only be handled through the methods of the backend that
+    built them.
+
+    """
+
+    name = None
+
+    def parse(self, html, only=None):
+        """Build the document tree of a webpage.
+
+        Parameters
+        ----------
+        html : str
+            The webpage's HTML.
+        only : str, optional
+            Restrict the document tree to the nodes matching this simple
+            selector ('tag' or 'tag.class') along with their descendants, e.g.
+            'td.visitedlyr' (the default value is :obj:`None` which implies
+            that the whole tree is built). The matching nodes can still be
+            selected from the root of the restricted tree. Backends that can't
+            build a restricted tree faster than the whole tree ignore it.
+
+        Returns
+        -------
+        doc
+            The root of the document tree.
+
+        """
+        raise NotImplementedError("The parse() method needs to be implemented "
+                                  "by the derived classes of ParserBackend.")
+
+    def select(self, node, selector):
+        """Return all the nodes below `node` that match a CSS selector."""
+        raise NotImplementedError
+
+    def select_one(self, node, selector):
+        """Return the first node below `node` that matches a CSS selector or
+        :obj:`None` if there is no match."""
+        matches = self.select(node, selector)
+        return matches[0] if matches else None
+
+    def get_text(self, node):
+        """Return the text of a node and all its descendants as a
+        :obj:`str`."""
+        raise NotImplementedError
+
+    def get_attr(self, node, name, default=None):
+        """Return the value of a node's attribute as a :obj:`str`."""
+        raise NotImplementedError
+
+    def get_classes(self, node):
+        """Return the list of CSS classes of a node."""
+        return (self.get_attr(node, 'class') or "").split()
+
+    def next_siblings(self, node):
+        """Iterate over the element siblings that follow a node, i.e. text
+        and comment nodes are skipped."""
+        raise NotImplementedError
+
+    def tail(self, node):
+        """Return the text found right after a node and before its next
+        element sibling."""
+        raise NotImplementedError
+
+    def release(self, doc):
+        """Free the memory used by a document tree.
+
+        The tree must not be used after being released. By default, nothing
+        is done since the tree is freed as soon as it is no longer referenced.
+
+        Parameters
+        ----------
+        doc
+            The root of the document tree.
+
+        """
+
+
+class BeautifulSoupBackend(ParserBackend):
+    """Parser backend based on `BeautifulSoup`_.
+
+    Parameters
+    ----------
+    features : str
+        The underlying parser used by BeautifulSoup, e.g. 'lxml' or
+        'html.parser'.
+
+    """
+
+    def __init__(self, features):
+        self.features = features
+        self.name = "bs4-{}".format(features)
+
+    def parse(self, html, only=None):
+        if only:
+            return BeautifulSoup(html, self.features,
+                                 parse_only=_soup_strainer(only))
+        return BeautifulSoup(html, self.features)
+
+    def select(self, node, selector):
+        return node.select(selector)
+
+    def select_one(self, node, selector):
+        return node.select_one(selector)
+
+    def get_text(self, node):
+        return node.get_text()
+
+    def get_attr(self, node, name, default=None):
+        value = node.get(name, default)
+        # NOTE: BeautifulSoup returns multi-valued attributes (e.g. class) as
+        # lists
+        if isinstance(value, list):
+            value = " ".join(value)
+        return value
+
+    def next_siblings(self, node):
+        return (sib for sib in node.next_siblings if isinstance(sib, Tag))
+
+    def tail(self, node):
+        text = ""
+        sibling = node.next_sibling
+        while isinstance(sibling, NavigableString):
+            text += str(sibling)
+            sibling = sibling.next_sibling
+        return text
+
+    def release(self, doc):
+        # NOTE: a BeautifulSoup tree is full of reference cycles (parent <->
+        # children) and thus would otherwise wait for the garbage collector
+        # NOTE: decompose() on the BeautifulSoup object itself leaves its
+        # children untouched, hence the top-level nodes are decomposed
+        for node in list(doc.contents):
+            node.decompose()
+        doc.decompose()
+
+
+class LxmlBackend(ParserBackend):
+    """Parser backend based on raw `lxml`_ element trees."""
+
+    name = "lxml"
+
+    def parse(self, html, only=None):
+        # NOTE: `only` is ignored since building the whole tree in C is faster
+        # than restricting it with iterparse()
+        # NOTE: lxml refuses str with an encoding declaration, hence we give it
+        # bytes along with the encoding to use
+        if isinstance(html, str):
+            html = html.encode('utf-8')
+        return lxml.html.document_fromstring(html, parser=_lxml_html_parser())
+
+    def select(self, node, selector):
+        return _css_selector(selector)(node)
+
+    def get_text(self, node):
+        # NOTE: text_content() returns a smart string that keeps a reference
+        # to its element, thus it is converted to a plain str
+        return str(node.text_content())
+
+    def get_attr(self, node, name, default=None):
+        return node.get(name, default)
+
+    def next_siblings(self, node):
+        return (sib for sib in node.itersiblings() if isinstance(sib.tag, str))
+
+    def tail(self, node):
+        return node.tail or ""
+
+    def release(self, doc):
+        doc.clear()
+
+
+class SelectolaxBackend(ParserBackend):
+    """Parser backend based on the lexbor engine from `selectolax`_."""
+
+    name = "selectolax"
+
+    def parse(self, html, only=None):
+        # NOTE: `only` is ignored since lexbor has no restricted parse mode
+        return LexborHTMLParser(html)
+
+    def select(self, node, selector):
+        return node.css(selector)
+
+    def select_one(self, node, selector):
+        return node.css_first(selector)
+
+    def get_text(self, node):
+        return node.text(deep=True)
+
+    def get_attr(self, node, name, default=None):
+        value = node.attributes.get(name, default)
+        return default if value is None else value
+
+    def next_siblings(self, node):
+        sibling = node.next
+        while sibling is not None:
+            if not sibling.tag.startswith('-'):
+                # Element node, i.e. not '-text' nor '-comment'
+                yield sibling
+            sibling = sibling.next
+
+    def tail(self, node):
+        text = ""
+        sibling = node.next
+        while sibling is not None and sibling.tag == '-text':
+            text += sibling.text(deep=False)
+            sibling = sibling.next
+        return text
+
+
+@lru_cache(maxsize=None)
+def _soup_strainer(only):
+    """Build the SoupStrainer of a simple selector ('tag' or 'tag.class')
+    only once."""
+    tag, _, class_ = only.partition(".")
+    if not class_:
+        return SoupStrainer(tag)
+    # NOTE: the class attribute is not yet split into a list of classes when
+    # the strainer is applied, hence the regex on the whole attribute
+    return SoupStrainer(tag, class_=re.compile(
+        r"(?:^|\s){}(?:\s|$)".format(re.escape(class_))))
+
+
+@lru_cache(maxsize=None)
+def _css_selector(selector):
+    """Compile a CSS selector for lxml only once."""
+    return CSSSelector(selector)
+
+
+@lru_cache(maxsize=None)
+def _lxml_html_parser():
+    """Return the shared lxml HTML parser."""
+    return lxml.html.HTMLParser(encoding='utf-8')
+
+
+def register_parser(backend):
+    """Add a parser backend to the registry.
+
+    Parameters
+    ----------
+    backend : ParserBackend
+        The backend to register under its name. A backend already registered
+        with the same name is replaced.
+
+    """
+    logger.debug("Registering the parser backend '{}'".format(backend.name))
+    _PARSERS[backend.name] = backend
+
+
+def get_parser(name=DEFAULT_PARSER):
+    """Return a registered parser backend from its name.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the parser backend (the default value is 'bs4-lxml').
+
+    Returns
+    -------
+    backend : ParserBackend
+        The parser backend registered under `name`.
+
+    Raises
+    ------
+    UnknownParserError
+        Raised if no parser backend is registered under `name`, e.g. its
+        library is not installed.
+
+    """
+    try:
+        return _PARSERS[name]
+    except KeyError:
+        raise lyrics_scraping.exceptions.UnknownParserError(
+            "The parser '{}' is not available. Choose from {}".format(
+                name, ", ".join(available_parsers())))
+
+
+def available_parsers():
+    """Return the names of all the registered parser backends."""
+    return list(_PARSERS.keys())
+
+
+register_parser(BeautifulSoupBackend('lxml'))
+register_parser(BeautifulSoupBackend('html.parser'))
+if CSSSelector:
+    register_parser(LxmlBackend())
+if LexborHTMLParser:
+    register_parser(SelectolaxBackend())
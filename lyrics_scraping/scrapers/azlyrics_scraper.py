@@ -20,26 +20,34 @@ See the structure of the music database as defined in the `music.sql schema`_.
 """
 
 import logging
+import random
 import re
 import signal
 import time
+import unicodedata
 from collections import namedtuple
-from difflib import get_close_matches
+from collections.abc import Sequence
 from logging import NullHandler
 from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
-
 import lyrics_scraping.exceptions
+import pyutils.exceptions
+from lyrics_scraping.extraction import load_profiles
+from lyrics_scraping.matching import FuzzyIndex, normalize
+from lyrics_scraping.parsers import get_parser
 from lyrics_scraping.scrapers.lyrics_scraper import Album, Lyrics, LyricsScraper
-from lyrics_scraping.utils import plural
-
-import ipdb
+from lyrics_scraping.utils import get_data_filepath, plural
 
 logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
+# Extraction profiles for the search, artist and lyrics webpages. They are
+# compiled only once, see azlyrics_profiles.yaml
+PROFILES = load_profiles(get_data_filepath('profiles'))
+_NON_SLUG_REGEX = re.compile(r"[^a-z0-9]+")
+
+
 class AZLyricsScraper(LyricsScraper):
     """Derived class from :class:`~scrapers.lyrics_scraper.LyricsScraper` for
     scraping artist and lyrics webpages from `www.azlyrics.com`_
@@ -75,6 +83,12 @@ class AZLyricsScraper(LyricsScraper):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.search_url = "https://search.azlyrics.com/search.php"
+        # The lyrics URLs are built from the slugs of the artist's name and the
+        # song title, e.g. /lyrics/depechemode/newlife.html
+        self.lyrics_url = "https://www.azlyrics.com/lyrics/{}/{}.html"
+        # The artist URLs are placed within the directory of the first letter
+        # of the artist's slug (or /19/ for a digit), e.g. /d/depechemode.html
+        self.artist_url = "https://www.azlyrics.com/{}/{}.html"
         # TODO: explain that p is for page, w is for I suppose weight
         # (albums, artists, songs), q is for query, ...
         self._search_url_params = {'q': "", 'w': "", 'p': 1}
@@ -102,7 +116,7 @@ class AZLyricsScraper(LyricsScraper):
         """
         # TODO: explain
         return self._get_lyrics("album", album_title, artist_name, max_songs,
-                                choose_random)
+                                choose_random=choose_random)
 
     # TODO: change name to get_artist_songs() or search_artist()
     def get_lyrics_from_artist(self, artist_name, max_songs=None,
@@ -140,151 +154,128 @@ class AZLyricsScraper(LyricsScraper):
         except ValueError:
             raise
 
-    # TODO: change name to get_song() or search_song()
-    def get_song_lyrics(self, song_title, artist_name=None):
-        """TODO
+    def iter_lyrics_from_album(self, album_title, artist_name=None,
+                               max_songs=None, choose_random=False):
+        """Iterate over the lyrics of an album's songs as soon as they are
+        scraped.
+
+        Unlike :meth:`get_lyrics_from_album`, each song is yielded right after
+        its lyrics webpage is scraped and saved, i.e. the lyrics of all the
+        songs are never held at once.
 
         Parameters
         ----------
-        song_title
-        artist_name
+        album_title : str
+            The album title.
+        artist_name : str, optional
+            The artist's name.
+        max_songs : int, optional
+            Maximum number of songs (the default value is :obj:`None` which
+            implies that all the songs are scraped).
+        choose_random : bool, optional
+            Whether the `max_songs` songs are chosen randomly (the default
+            value is False).
 
         Returns
         -------
+        all_lyrics : iterator of Lyrics
+            The lyrics of each song of the album.
 
         """
-        # TODO: explain
-        return self._get_lyrics("song", song_title, artist_name)
+        return self._iter_lyrics("album", album_title, artist_name, max_songs,
+                                 choose_random=choose_random)
 
-    def handler(self, signum, frame):
-        """TODO
+    def iter_lyrics_from_artist(self, artist_name, max_songs=None,
+                                year_after=None, year_before=None,
+                                include_unknown_year=False,
+                                choose_random=False):
+        """Iterate over the lyrics of an artist's songs as soon as they are
+        scraped.
+
+        Unlike :meth:`get_lyrics_from_artist`, each song is yielded right
+        after its lyrics webpage is scraped and saved, i.e. the lyrics of all
+        the songs are never held at once.
 
         Parameters
         ----------
-        signum
-        frame
+        artist_name : str
+            The artist's name.
+        max_songs : int, optional
+            Maximum number of songs (the default value is :obj:`None` which
+            implies that all the songs are scraped).
+        year_after : int, optional
+            Only the songs from the albums released from this year are
+            scraped.
+        year_before : int, optional
+            Only the songs from the albums released up to this year are
+            scraped.
+        include_unknown_year : bool, optional
+            Whether the songs without album year are scraped (the default
+            value is False).
+        choose_random : bool, optional
+            Whether the `max_songs` songs are chosen randomly (the default
+            value is False).
 
         Returns
         -------
+        all_lyrics : iterator of Lyrics
+            The lyrics of each song of the artist.
+
+        Raises
+        ------
+        ValueError
+            Raised if `year_after` or `year_before` is invalid. It is raised
+            right away, i.e. before the iteration.
 
         """
-        # TODO: explain
-        print('Signal handler called with signal', signum)
-        raise TimeoutError("{} seconds had passed and no search result "
-                           "selected.".format(self.delay_interactive))
+        years = self._check_years(year_after, year_before)
+        return self._iter_lyrics("artist", None, artist_name, max_songs,
+                                 year_after=years.year_after,
+                                 year_before=years.year_before,
+                                 include_unknown_year=include_unknown_year,
+                                 choose_random=choose_random)
 
-    def _add_songs_from_same_album(self, div, artist_url, albums):
+    # TODO: change name to get_song() or search_song()
+    def get_song_lyrics(self, song_title, artist_name=None):
         """TODO
 
         Parameters
         ----------
-        div
-        artist_url
-        albums
+        song_title
+        artist_name
 
-        Raises
-        ------
-        TODO
+        Returns
+        -------
 
         """
         # TODO: explain
-        # The <div> tag refers to an album
-        # Get the album title
-        album_title = self._get_album_title_from_div_tag(div)
-        # Get the album year
-        year_result = re.findall(r'\((\d+)\)', div.text)
-        # Sanity check the extracted album year
-        try:
-            self._check_album_year(year_result)
-        except (lyrics_scraping.exceptions.NonUniqueAlbumYearError,
-                lyrics_scraping.exceptions.WrongAlbumYearError) as e:
-            # TODO: add error in albums dict
-            if self.ignore_errors:
-                logger.error(e)
-                logger.warning("Skipping the album '{}'".format(
-                    album_title))
-            else:
-                raise e
-        else:
-            # Valid album year
-            album_year = int(year_result[0])
-            logger.debug("The album <color>'{}'</color> ({}) will "
-                         "be <color>added</color>".format(
-                          album_title, album_year))
-            # Get all songs from the given album
-            # Only get those songs (siblings) that are related to the given album
-            siblings = div.find_next_siblings()
-            # TODO: [siblings_refactor]
-            for index, sibling in enumerate(siblings, start=1):
-                # A song must be associated with an <a href="..."> tag
-                # Example:
-                # <a href="../lyrics/depechemode/goingbackwards.html"
-                # target="_blank"> Going Backwards</a>
-                if sibling.get('href'):
-                    self._update_albums_dict(albums, sibling, album_title,
-                                             album_year, artist_url)
-                elif sibling.get('class') and \
-                        'album' in sibling.get('class'):
-                    # We arrived at the beginning of another album. Thus, we must
-                    # exit from the 'for loop' since we finished adding all songs
-                    # from the given album
-                    # Example:
-                    # <div class="album" id="7852">album: <b>"A Broken Frame"
-                    # </b> (1982)</div>
-                    break
-                else:
-                    # Neither a song nor an album, e.g. <br/>
-                    # Thus, we skip the current sibling
-                    continue
-            if albums.get(album_title):
-                logger.debug("<color>{} songs added</color> from <color>'{}'"
-                             "</color>".format(
-                              len(albums[album_title]['songs']), album_title))
-
-    def _add_songs_without_albums(self, div, include_unknown_year, artist_url,
-                                  albums):
+        return self._get_lyrics("song", song_title, artist_name)
+
+    @property
+    def direct_url_hit_rate(self):
+        """Fraction of the built lyrics URLs that were found, i.e. of the
+        songs whose search request was saved (:obj:`None` if no URL was built
+        yet)."""
+        hits = self.metrics['direct_url_hits']
+        tries = hits + self.metrics['direct_url_misses']
+        return hits / tries if tries else None
+
+    def handler(self, signum, frame):
         """TODO
 
         Parameters
         ----------
-        div
-        include_unknown_year
-        artist_url
-        albums
+        signum
+        frame
+
+        Returns
+        -------
 
         """
-        # The <div> tag refers to the section "other songs" which refers
-        # to songs without album and year
-        if include_unknown_year:
-            logger.debug("<color>Processing the section 'other songs'...</color>")
-            # Get all songs without album and year
-            # Only get those songs (siblings) that are related
-            # to the "other songs" section
-            siblings = div.find_next_siblings()
-            album_title = ""
-            album_year = ""
-            logger.debug("<color>{} items found for 'other songs'"
-                         "</color>".format(len(siblings)))
-            for index, sibling in enumerate(siblings, start=1):
-                # logger.debug("<color>Processing sibling #{}"
-                #              "</color>".format(index))
-                if sibling.get('href'):
-                    self._update_albums_dict(albums, sibling, album_title,
-                                             album_year, artist_url)
-                """
-                else:
-                    logger.debug("<color>Skipping sibling #{} since "
-                                 "it's not a song</color>".format(
-                                  index_other))
-                """
-            if albums.get(album_title):
-                logger.debug("<color>{} songs added</color> from <color>"
-                             "'other songs'</color>".format(
-                              len(albums['']['songs'])))
-        else:
-            logger.debug("<color>No songs from the section 'other songs' will "
-                         "be added</color>: they aren't part of albums nor do "
-                         "they have a year")
+        # TODO: explain
+        print('Signal handler called with signal', signum)
+        raise TimeoutError("{} seconds had passed and no search result "
+                           "selected.".format(self.delay_interactive))
 
     def _ask_user_for_search_result(self, which, search_results_str,
                                     search_results_list):
@@ -321,26 +312,6 @@ class AZLyricsScraper(LyricsScraper):
             logger.warning("<color>No search result selected</color>")
         return retval
 
-    @staticmethod
-    def _check_album_year(year_result):
-        """TODO
-
-        Parameters
-        ----------
-        year_result : list
-            TODO
-
-        """
-        # TODO: explain
-        if len(year_result) != 1:
-            raise lyrics_scraping.exceptions.NonUniqueAlbumYearError(
-                "The album year extraction doesn't result in a UNIQUE number")
-        elif not (len(year_result[0]) == 4 and
-                  year_result[0].isdecimal()):
-            raise lyrics_scraping.exceptions.WrongAlbumYearError(
-                "The Album year extraction scheme broke: the year '{}' is not a "
-                "number with four digits".format(year_result[0]))
-
     def _check_years(self, year_after, year_before):
         """TODO
 
@@ -394,68 +365,43 @@ class AZLyricsScraper(LyricsScraper):
         return years
 
     @staticmethod
-    def _get_album_title_from_div_tag(div):
-        """TODO
-
-        Parameters
-        ----------
-        div
-
-        Returns
-        -------
-        TODO
+    def _slugify(text, artist=False):
+        """Convert a song title or an artist's name into its slug in the
+        lyrics URLs.
 
-        """
-        # Get the album's title from a <div> tag
-        # Example:
-        # <div class="album" id="7863">album: <b>"Speak &amp; Spell"
-        # </b> (1981)</div>
-        return div.contents[1].text.strip('"')
-
-    def _get_albums_from_artist_webpage(self, soup, artist_url, include_unknown_year):
-        """TODO
+        The slug is lowercase and only has the letters (without accents) and
+        the digits, e.g. "Just Can't Get Enough" gives 'justcantgetenough'.
+        The leading 'The' of an artist's name is dropped, e.g. "The Cure"
+        gives 'cure'.
 
         Parameters
         ----------
-        soup
-        artist_url
-        include_unknown_year
+        text : str
+            The song title or the artist's name.
+        artist : bool, optional
+            Whether `text` is an artist's name (the default value is False).
 
         Returns
         -------
-        TODO
+        slug : str
+            The slug, empty if `text` doesn't have any letter or digit.
 
         """
-        # Get all the <div> tags associated with albums
-        # NOTE: even the section "other songs" is included even though it is for
-        # songs without albums
-        # Examples:
-        # 1. <div class="album" id="7863">album: <b>"Speak &amp; Spell"</b>
-        #    (1981)</div>
-        # 2. <div class="album">other songs:</div>
-        div_album_tags = soup.find_all("div", class_="album")
-        # Process each <div> tag in order to extract useful info, e.g. album
-        # title, its related songs, ...
-        albums = {}
-        logger.debug("<color>{} albums found</color>".format(
-            len(div_album_tags)))
-        for index_div, div in enumerate(div_album_tags, start=1):
-            logger.debug("<color>Processing item #{}</color>".format(
-                index_div))
-            if div.text.count("other songs"):
-                self._add_songs_without_albums(div, include_unknown_year,
-                                               artist_url, albums)
-            else:
-                self._add_songs_from_same_album(div, artist_url, albums)
-        return albums
+        text = unicodedata.normalize("NFKD", text.casefold())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        if artist:
+            text = re.sub(r"^\s*the\s+", "", text)
+        return _NON_SLUG_REGEX.sub("", text)
 
     @staticmethod
-    def _get_search_results(which, tags):
+    def _get_search_results(which, results):
         """TODO
 
         Parameters
         ----------
-        tags
+        which
+        results : list of dict
+            The search results as extracted with the 'search' profile.
 
         Returns
         -------
@@ -466,17 +412,15 @@ class AZLyricsScraper(LyricsScraper):
         search_results_str = "\n"
         # NOTE: we start numbering at 1 instead of 0
         search_results_list = []
-        for i, t in enumerate(tags, start=1):
+        for i, result in enumerate(results, start=1):
             if which in ["album", "artist"]:
                 # When album, text has the name of the artist followed by the
                 # name of the album, e.g. Depeche Mode - Speak & Spell
-                text = t.select_one("b").text
+                text = result['texts'][0]
                 search_results_list.append(text)
                 search_results_str += "[{}] {}\n".format(i, text)
             else:  # song
-                title, artist = t.select("b")
-                title = title.text
-                artist = artist.text
+                title, artist = result['texts'][:2]
                 search_results_list.append(title + " by " + artist)
                 search_results_str += "[{}] {} by {}\n".format(i, title, artist)
         search_results = namedtuple("search_results",
@@ -485,25 +429,6 @@ class AZLyricsScraper(LyricsScraper):
         search_results.search_results_list = search_results_list
         return search_results
 
-    @staticmethod
-    def _get_songs_urls_from_artist_webpage(soup):
-        """TODO
-
-        Parameters
-        ----------
-        soup
-
-        Returns
-        -------
-
-        """
-        # Get the list of songs URLs for the given artist
-        # The URLs will be found as values to <a>'s href attributes
-        # e.g. <a href="../lyrics/artist_name/song_title.html" ... >
-        anchors = soup.find_all(href=re.compile("^../lyrics"))
-        # Get only the songs URLs from the <a> tags
-        return [a.attrs['href'] for a in anchors]
-
     def _multiple_search_result_case(self, msg, nb_results):
         """TODO
 
@@ -551,43 +476,49 @@ class AZLyricsScraper(LyricsScraper):
         return num
 
     def _select_best_match(self, word, possibilities):
-        """TODO
+        """Select the search result that best matches the search query.
+
+        The search results are scored with a trigram index (see
+        :mod:`~lyrics_scraping.matching`), thus the matching ignores the case,
+        the accents, the punctuation and the order of the words.
 
         Parameters
         ----------
-        word
-        possibilities
+        word : str
+            The search query, e.g. "New Life by Depeche Mode".
+        possibilities : list of str
+            The search results as displayed to the user, e.g.
+            ["New Life by Depeche Mode", "New Life by Other Band"].
 
         Returns
         -------
+        best_match : tuple
+            The ``(index, score)`` of the best search result or
+            ``(None, 0.0)`` if no search result matches the query.
 
         """
-        # TODO: explain
-        # TODO: update following comment since we might also be using for albums
-        # and artists
-        # We choose the best song title and artist name from the
-        # search results that match the user's given song title and
-        # artist name
-        matches = get_close_matches(word, possibilities)
+        # We choose the search result (e.g. song title and artist name) that
+        # best matches the user's given title and artist name
+        matches = FuzzyIndex(possibilities).search(word)
         if matches:
             logger.debug(
                 "<color>Found {} match{} for '{}':</color> {}".format(
                     len(matches),
                     plural(matches, "es"),
                     word,
-                    ", ".join(matches)))
-            result_index = possibilities.index(matches[0])
-            logger.debug("<color>Matching your search query '{}' with"
-                         " '{}'</color>".format(word, matches[0]))
+                    ", ".join("{} ({:.2f})".format(possibilities[i], score)
+                              for i, score in matches)))
+            result_index, score = matches[0]
             logger.debug("<color>Search result #{} selected:</color>"
-                         " {}".format(result_index + 1,
-                                      possibilities[result_index]))
-            return result_index
+                         " {} (score: {:.2f})".format(
+                             result_index + 1, possibilities[result_index],
+                             score))
+            return result_index, score
         else:
             logger.warning("<color>No match found for '{}'"
                            "</color>".format(word))
             logger.warning(self.no_results_warning)
-            return None
+            return None, 0.0
 
     def _single_search_result_case(self, msg):
         """TODO
@@ -629,80 +560,318 @@ class AZLyricsScraper(LyricsScraper):
         num = 1 if answer == 'y' else None
         return num
 
-    def _send_search_request(self, which, search_query):
-        """TODO
+    def _get_lyrics_from_direct_url(self, song_title, artist_name):
+        """Get a song's lyrics from its URL built from the song title and the
+        artist's name, i.e. without any search request.
+
+        The webpage is retrieved with the web cache, i.e. from the cache if it
+        is found there and from the lyrics website otherwise. The hits and
+        misses are counted in :attr:`metrics` (see
+        :attr:`direct_url_hit_rate`).
 
         Parameters
         ----------
-        which
-        search_query
+        song_title : str
+            The song title, e.g. "New Life".
+        artist_name : str
+            The artist's name, e.g. "Depeche Mode".
+
+        The song is only found if the scraped song title and artist's name
+        match the queried ones (see :meth:`_match_direct_url_song`) since
+        different titles or names can give the same URL, e.g. "Hell O" and
+        "Hello".
 
         Returns
         -------
+        found : bool
+            Whether the song was found at the built URL. If not, e.g. the URL
+            is not found, the request failed or the URL is the one of another
+            song, the song must be searched.
+        lyrics : Lyrics or None
+            The lyrics of the song, see :meth:`_scrape_lyrics_page`.
 
         """
-        # TODO: explain
-        assert which in ['album', 'artist', 'song']
-        self._search_url_params['q'] = search_query
-        self._search_url_params['w'] = which + "s"
-        logger.debug("<color>Sending {} search request ..."
-                     "</color>".format(which))
-        html = self.webcache.get_webpage(self.search_url,
-                                         self._search_url_params)
-        soup = BeautifulSoup(html, 'lxml')
-        tags = soup.select("td.visitedlyr")
-        return tags
-
-    def _update_albums_dict(self, albums, anchor_tag, album_title, album_year,
-                            artist_url):
-        """TODO
+        artist_slug = self._slugify(artist_name, artist=True)
+        song_slug = self._slugify(song_title)
+        if not artist_slug or not song_slug:
+            return False, None
+        lyrics_url = self.lyrics_url.format(artist_slug, song_slug)
+        logger.debug("<color>Trying the lyrics URL built from the song title "
+                     "and the artist's name: {}</color>".format(lyrics_url))
+        try:
+            lyrics = self._scrape_lyrics_page(lyrics_url)
+        except pyutils.exceptions.HTTP404Error as e:
+            self._count_metric('direct_url_misses')
+            logger.debug("<color>{}</color>".format(e))
+            logger.debug("<color>The built lyrics URL was not found: the song "
+                         "will be searched</color>")
+            return False, None
+        except OSError as e:
+            # NOTE: requests.RequestException is an OSError
+            self._count_metric('direct_url_errors')
+            logger.warning("<color>The built lyrics URL couldn't be retrieved "
+                           "({}): the song will be searched</color>".format(e))
+            return False, None
+        if lyrics is None or \
+                not self._match_direct_url_song(lyrics, song_title,
+                                                artist_name):
+            self._count_metric('direct_url_misses')
+            logger.debug("<color>The built lyrics URL is not the one of the "
+                         "song: it will be searched</color>")
+            return False, None
+        self._count_metric('direct_url_hits')
+        logger.debug("<color>Direct lyrics URL hit rate: {:.2f}</color>".format(
+            self.direct_url_hit_rate))
+        return True, lyrics
+
+    def _match_direct_url_song(self, lyrics, song_title, artist_name):
+        """Check if the song scraped at a built lyrics URL is the queried one.
+
+        The scraped song title and artist's name must be the same as the
+        queried ones once normalized (the leading 'The' of the artist's names
+        is ignored) or fuzzy match them with a score of at least
+        :attr:`best_match_threshold`.
 
         Parameters
         ----------
-        albums : dict
-        anchor_tag
-        album_title
-        album_year
-        artist_url
+        lyrics : Lyrics
+            The lyrics scraped at the built URL.
+        song_title : str
+            The queried song title, e.g. "New Life".
+        artist_name : str
+            The queried artist's name, e.g. "Depeche Mode".
+
+        Returns
+        -------
+        bool
+            True if the scraped song is the queried one, False otherwise.
+
+        """
+        def strip_the(name):
+            return re.sub(r"^the\s+", "", normalize(name))
+
+        for scraped, queried, strip in [
+                (lyrics.song_title, song_title, normalize),
+                (lyrics.artist_name, artist_name, strip_the)]:
+            if strip(scraped or "") == strip(queried):
+                continue
+            _, score = FuzzyIndex([scraped or ""]).best_match(
+                queried, min_score=self.best_match_threshold)
+            if not score:
+                logger.debug("<color>'{}' doesn't match '{}'</color>".format(
+                    scraped, queried))
+                return False
+        return True
+
+    def _get_songs_lyrics_from_artist(self, song_titles, artist_name):
+        """Get the lyrics of many songs from their artist's webpage.
+
+        Instead of a search request per song, the artist's webpage (whose URL
+        is built from the artist's name) is retrieved once and the song titles
+        are fuzzy matched against all the songs listed on it. Only the lyrics
+        webpages of the matched songs are then retrieved.
+
+        The songs found in the music db are not looked up (see
+        :ref:`local_first <LyricsScraperParametersLabel>`).
+
+        Parameters
+        ----------
+        song_titles : list of str
+            The song titles, e.g. ["New Life", "Just Can't Get Enough"].
+        artist_name : str
+            The name of the songs' artist, e.g. "Depeche Mode".
+
+        Returns
+        -------
+        all_lyrics : list
+            The lyrics of each song or :obj:`None` if it was not found on the
+            artist's webpage.
+
+        Raises
+        ------
+        HTTP404Error
+            Raised if the artist's webpage is not found.
 
         """
-        song_title = anchor_tag.text
+        all_lyrics = [None] * len(song_titles)
+        if self.local_first:
+            for i, song_title in enumerate(song_titles):
+                all_lyrics[i] = self._get_lyrics_from_db("song", song_title,
+                                                         artist_name)
+        missing = [i for i, lyrics in enumerate(all_lyrics) if lyrics is None]
+        artist_slug = self._slugify(artist_name, artist=True)
+        if len(missing) < 2 or not artist_slug:
+            # Not worth the artist's webpage
+            return all_lyrics
+        artist_dir = artist_slug[0] if artist_slug[0].isalpha() else "19"
+        artist_url = self.artist_url.format(artist_dir, artist_slug)
+        logger.debug("<color>Looking up {} songs in the artist webpage {}"
+                     "</color>".format(len(missing), artist_url))
+        # NOTE: all the songs are listed, whatever their year
+        artist_webpage = ArtistWebpage(artist_url, self.webcache, True,
+                                       self.ignore_errors, self.parser)
+        songs = [song for album_data in artist_webpage.get_albums().values()
+                 for song in album_data.songs]
+        index = FuzzyIndex(song_title for _, song_title in songs)
+        matched_urls = {}
+        for i in missing:
+            song_index, score = index.best_match(
+                song_titles[i], min_score=self.best_match_threshold)
+            if song_index is None:
+                logger.debug("<color>The song '{}' was not found in the artist "
+                             "webpage</color>".format(song_titles[i]))
+                continue
+            song_url, song_title = songs[song_index]
+            logger.debug("<color>The song '{}' matched '{}' (score: {:.2f})"
+                         "</color>".format(song_titles[i], song_title, score))
+            matched_urls[i] = song_url
+        urls_to_scrape, processed_lyrics = self._split_processed_urls(
+            list(matched_urls.values()), artist_webpage.artist_name)
+        for i, song_url in matched_urls.items():
+            if song_url not in urls_to_scrape:
+                all_lyrics[i] = processed_lyrics.get(song_url)
+                continue
+            try:
+                all_lyrics[i] = self._scrape_lyrics_page(song_url,
+                                                         check_url=False)
+            except (lyrics_scraping.exceptions.NonUniqueAlbumYearError,
+                    lyrics_scraping.exceptions.NonUniqueLyricsError,
+                    lyrics_scraping.exceptions.WrongAlbumYearError,
+                    pyutils.exceptions.HTTP404Error) as e:
+                # NOTE: the song will be resolved on its own
+                logger.error(e)
+        return all_lyrics
+
+    def _split_processed_urls(self, song_urls, artist_name):
+        """Split song URLs into the ones to scrape and the processed ones.
+
+        The URLs are checked in bulk (see :meth:`_get_urls_to_process`) and
+        the lyrics of the processed ones are read from the music db at once.
+
+        Parameters
+        ----------
+        song_urls : list of str
+            The lyrics URLs, e.g. from an artist webpage.
+        artist_name : str
+            The name of the songs' artist.
+
+        Returns
+        -------
+        urls_to_scrape : set of str
+            The URLs that were not processed yet.
+        processed_lyrics : dict [str, Lyrics]
+            The lyrics of each processed URL that are found in the music db.
+
         """
-        logger.debug("The song <color>'{}'</color> will be <color>"
-                     "added</color>".format(song_title))
+        urls_to_scrape = set(self._get_urls_to_process(song_urls))
+        processed_lyrics = {}
+        if self.db_conn:
+            processed_lyrics = self._select_lyrics_from_urls(
+                [url for url in song_urls if url not in urls_to_scrape],
+                artist_name)
+        return urls_to_scrape, processed_lyrics
+
+    def _iter_search_pages(self, which, search_query):
+        """Iterate lazily over the search result pages.
+
+        A search result page is only fetched when the next one is requested,
+        up to :attr:`max_search_pages` pages. The iteration stops at the first
+        page without search results.
+
+        Parameters
+        ----------
+        which : str
+            The type of search: 'album', 'artist' or 'song'.
+        search_query : str
+            The search query, e.g. "New Life by Depeche Mode".
+
+        Yields
+        ------
+        results : list of dict
+            The search results of the next page, see
+            :meth:`_send_search_request`.
+
         """
-        albums.setdefault(album_title, {})
-        albums[album_title].setdefault('album_year', album_year)
-        albums[album_title].setdefault('songs', [])
-        song_url = self._complete_relative_url(anchor_tag['href'][2:], artist_url)
-        song_data = (song_url, song_title)
-        albums[album_title]['songs'].append(song_data)
+        for page in range(1, self.max_search_pages + 1):
+            try:
+                results = self._send_search_request(which, search_query, page)
+            except pyutils.exceptions.HTTP404Error as e:
+                if page == 1:
+                    raise
+                # No more search result page
+                logger.debug("<color>{}</color>".format(e))
+                return
+            if not results:
+                return
+            logger.debug("<color>Found {} {} result{} (page {})</color>".format(
+                len(results), which, plural(results), page))
+            yield results
 
-    # TODO: change name to _get_songs
-    def _get_lyrics(self, which, which_title=None, artist_name=None,
-                    max_songs=None, year_after=None, year_before=None,
-                    include_unknown_year=False, choose_random=False):
-        """TODO
+    def _select_best_result(self, which, word, results, pages):
+        """Select the search result that best matches the search query across
+        the search result pages.
+
+        The search results of the next page are only fetched if no search
+        result so far has a score of at least :attr:`best_match_threshold`.
 
         Parameters
         ----------
-        which
-        which_title
-        artist_name
-        max_songs
-        year_after
-        year_before
-        include_unknown_year
-        choose_random
+        which : str
+            The type of search: 'album', 'artist' or 'song'.
+        word : str
+            The search query as displayed in the search results, e.g.
+            "New Life by Depeche Mode".
+        results : list of dict
+            The search results of the first page.
+        pages : iterator
+            The following search result pages, see
+            :meth:`_iter_search_pages`.
 
         Returns
         -------
-        TODO
+        result : dict or None
+            The best search result or :obj:`None` if no search result matches
+            the query.
+
+        """
+        best_result, best_score = None, 0.0
+        while results:
+            search_results_list = \
+                self._get_search_results(which, results).search_results_list
+            result_index, score = self._select_best_match(word,
+                                                          search_results_list)
+            # NOTE: the first search result has the index 0
+            if result_index is not None and score > best_score:
+                best_result, best_score = results[result_index], score
+            if best_score >= self.best_match_threshold:
+                # Good enough: no need to fetch the next page
+                break
+            results = next(pages, None)
+        return best_result
+
+    def _search_url(self, which, which_title=None, artist_name=None):
+        """Search the URL of the webpage of a song, an album or an artist.
+
+        The search result is either selected by the user (interactive mode),
+        the best match (see :ref:`best_match <LyricsScraperParametersLabel>`)
+        or the first search result.
+
+        Parameters
+        ----------
+        which : str
+            The type of search: 'album', 'artist' or 'song'.
+        which_title : str, optional
+            The song or album title.
+        artist_name : str, optional
+            The artist's name.
+
+        Returns
+        -------
+        url : str or None
+            The URL of the selected search result or :obj:`None` if no search
+            result was found or selected.
 
         """
-        # TODO: explain
-        # TODO: add assert msg and in other places too
-        assert which in ['album', 'artist', 'song']
         if artist_name and which_title:
             query = "{} by {}".format(which_title, artist_name)
         elif which_title and not artist_name:
@@ -710,16 +879,18 @@ class AZLyricsScraper(LyricsScraper):
             artist_name = ""
         else:
             query = artist_name
-        tags = self._send_search_request(which, query)
-        if not tags and artist_name:
+        # NOTE: the search result pages are fetched lazily, i.e. the next page
+        # is only fetched if the best match is not good enough
+        pages = self._iter_search_pages(which, query)
+        results = next(pages, None)
+        if not results and artist_name:
             logger.debug("<color>Found 0 {} result</color>".format(which))
             logger.debug("<color>We will try to send the {} request with the "
                          "{} title only</color>".format(which, which))
-            tags = self._send_search_request(which, which_title)
-        if tags:
-            logger.debug("<color>Found {} {} result{} (page 1)"
-                         "</color>".format(len(tags), which, plural(tags)))
-            search_results = self._get_search_results(which, tags)
+            pages = self._iter_search_pages(which, which_title)
+            results = next(pages, None)
+        if results:
+            search_results = self._get_search_results(which, results)
             search_results_str = search_results.search_results_str
             search_results_list = search_results.search_results_list
             if self.interactive:
@@ -733,11 +904,11 @@ class AZLyricsScraper(LyricsScraper):
                     assert_msg = "The selected value ({}) must be an " \
                                  "integer".format(num)
                     assert isinstance(num, int), assert_msg
-                    tag = tags[num - 1]
+                    result = results[num - 1]
             else:
                 # No interaction
                 logger.debug("<color>{} result{}: {}</color>".format(
-                    which.upper(), plural(tags), search_results_str[:-1]))
+                    which.upper(), plural(results), search_results_str[:-1]))
                 if self.best_match:  # Select best match
                     if artist_name:
                         # Album and song search results are displayed differently
@@ -747,31 +918,155 @@ class AZLyricsScraper(LyricsScraper):
                             word = "{} by {}".format(which_title, artist_name)
                     else:
                         word = which_title
-                    result_index = self._select_best_match(word,
-                                                           search_results_list)
-                    if result_index:
-                        tag = tags[result_index]
-                    else:
+                    result = self._select_best_result(which, word, results,
+                                                      pages)
+                    if result is None:
                         return None
                 else:  # No match
                     # We choose the first search result
                     logger.debug("<color>Choosing the first search result: "
                                  "{}</color>".format(search_results_list[0]))
-                    tag = tags[0]
-            url = tag.find("a").attrs['href']
+                    result = results[0]
+            url = result['url']
             logger.debug("<color>{}'s URL: {}</color>".format(which, url))
-            logger.debug("<color>Getting lyrics from the {}'s webpage ..."
-                         "</color>".format(which))
-            return self._get_lyrics_from_url(
+            return url
+        else:  # results is empty
+            logger.warning(self.no_results_warning)
+            return None
+
+    def _send_search_request(self, which, search_query, page=1):
+        """TODO
+
+        Parameters
+        ----------
+        which
+        search_query
+        page : int, optional
+            The search result page to fetch (the default value is 1).
+
+        Returns
+        -------
+        results : list of dict
+            The search results as extracted with the 'search' profile, i.e.
+            each result has an 'url' and the 'texts' of its <b> tags.
+
+        """
+        # TODO: explain
+        assert which in ['album', 'artist', 'song']
+        params = dict(self._search_url_params, q=search_query, w=which + "s",
+                      p=page)
+        logger.debug("<color>Sending {} search request (page {}) ..."
+                     "</color>".format(which, page))
+        html = self.webcache.get_webpage(self.search_url, params)
+        return PROFILES['search'].extract_from_html(self.parser, html)['results']
+
+    # TODO: change name to _get_songs
+    def _get_lyrics(self, which, which_title=None, artist_name=None,
+                    max_songs=None, year_after=None, year_before=None,
+                    include_unknown_year=False, choose_random=False):
+        """TODO
+
+        Parameters
+        ----------
+        which
+        which_title
+        artist_name
+        max_songs
+        year_after
+        year_before
+        include_unknown_year
+        choose_random
+
+        Returns
+        -------
+        TODO
+
+        """
+        # TODO: explain
+        # TODO: add assert msg and in other places too
+        assert which in ['album', 'artist', 'song']
+        # NOTE: the songs of an album or an artist found in the music db may
+        # only be some of its songs, unless its webpage was fully scraped
+        if self.local_first and \
+                (which == "song" or
+                 self._is_scraped_in_db(which, which_title, artist_name)):
+            # Every search request costs a delay, thus we first check if the
+            # query can be resolved with the music db
+            lyrics = self._get_lyrics_from_db(
+                which, which_title, artist_name, max_songs,
+                year_after=year_after,
+                year_before=year_before,
+                include_unknown_year=include_unknown_year,
+                choose_random=choose_random)
+            if lyrics:
+                return lyrics
+        if which == "song" and self.direct_urls and artist_name and \
+                which_title:
+            # Every search request costs a delay, thus we first try the song's
+            # lyrics URL which follows a predictable pattern
+            found, lyrics = self._get_lyrics_from_direct_url(which_title,
+                                                             artist_name)
+            if found:
+                return lyrics
+        url = self._search_url(which, which_title, artist_name)
+        if url is None:
+            return None
+        logger.debug("<color>Getting lyrics from the {}'s webpage ..."
+                     "</color>".format(which))
+        return self._get_lyrics_from_url(
+            url,
+            max_songs,
+            year_after=year_after,
+            year_before=year_before,
+            include_unknown_year=include_unknown_year,
+            choose_random=choose_random)
+
+    def _iter_lyrics(self, which, which_title=None, artist_name=None,
+                     max_songs=None, year_after=None, year_before=None,
+                     include_unknown_year=False, choose_random=False):
+        """Iterate over the lyrics of an album's or an artist's songs.
+
+        It is the streaming counterpart of :meth:`_get_lyrics`: the songs from
+        an artist webpage are yielded one at a time, as soon as they are
+        scraped (see :meth:`_iter_artist_page`).
+
+        Parameters
+        ----------
+        See :meth:`_get_lyrics`.
+
+        Yields
+        ------
+        lyrics : Lyrics
+            The lyrics of the next song.
+
+        """
+        assert which in ['album', 'artist']
+        if self.local_first and \
+                self._is_scraped_in_db(which, which_title, artist_name):
+            all_lyrics = self._get_lyrics_from_db(
+                which, which_title, artist_name, max_songs,
+                year_after=year_after,
+                year_before=year_before,
+                include_unknown_year=include_unknown_year,
+                choose_random=choose_random)
+            if all_lyrics:
+                yield from all_lyrics
+                return
+        url = self._search_url(which, which_title, artist_name)
+        if url is None:
+            return
+        if urlparse(url).path.startswith('/lyrics/'):
+            lyrics = self._get_lyrics_from_url(url)
+            if lyrics:
+                yield lyrics
+        else:
+            yield from self._iter_artist_page(
                 url,
                 max_songs,
                 year_after=year_after,
                 year_before=year_before,
                 include_unknown_year=include_unknown_year,
                 choose_random=choose_random)
-        else:  # tags is empty
-            logger.warning(self.no_results_warning)
-            return None
 
     # TODO: change name to _get_songs_from_url
     def _get_lyrics_from_url(self, url, max_songs=None, year_after=None,
@@ -872,8 +1167,41 @@ class AZLyricsScraper(LyricsScraper):
 
         See Also
         --------
+        _iter_artist_page : Yields the songs one at a time instead.
         _scrape_lyrics_page : Scrapes a song webpage instead.
 
+        """
+        return list(self._iter_artist_page(
+            artist_url,
+            max_songs,
+            year_after=year_after,
+            year_before=year_before,
+            include_unknown_year=include_unknown_year,
+            choose_random=choose_random))
+
+    def _iter_artist_page(self, artist_url, max_songs=None, year_after=None,
+                          year_before=None, include_unknown_year=False,
+                          choose_random=False):
+        """Scrape the artist webpage and yield its songs one at a time.
+
+        Each song is yielded as soon as its lyrics webpage is scraped and
+        saved. Only the URLs and titles of the songs from the artist webpage
+        are kept while iterating.
+
+        Once all the songs of an album or of the whole artist webpage are
+        saved, its URL is saved too so that the album or the artist can be
+        later resolved with the music db (see :ref:`local_first
+        <LyricsScraperParametersLabel>`).
+
+        Parameters
+        ----------
+        See :meth:`_scrape_artist_page`.
+
+        Yields
+        ------
+        lyrics : Lyrics
+            The lyrics of the next song.
+
         """
         # TODO: explain
         years_data = self._check_years(year_after, year_before)
@@ -881,71 +1209,112 @@ class AZLyricsScraper(LyricsScraper):
         # TODO: ...
         logger.debug("<color>Scraping the artist webpage {}</color>".format(
                      artist_url))
-        ipdb.set_trace()
         artist_webpage = ArtistWebpage(artist_url, self.webcache,
-                                       include_unknown_year, self.ignore_errors)
+                                       include_unknown_year, self.ignore_errors,
+                                       self.parser)
         # TODO: Save artist data
-        albums = artist_webpage.get_albums()
-        ipdb.set_trace()
-        # Get the <div>'s id from the artist URL
-        filter1 = AlbumIdFilter(album_id=artist_url.split("#")[1])
-        filter2 = AlbumYearFilter(years_data)
-        filter3 = MaxSongsFilter()
-        albums.filter_songs([filter1, filter2, filter3])
-
-        if ".html#" in artist_url:
-            # Case where the artist URL points to a specific album within the
-            # artist webpage
-            #
-            # NOTE: this happens when clicking on an album link from a search
-            # result page after calling get_lyrics_from_album()
-            #
-            # Get the <div>'s id from the artist URL
-            id_ = artist_url.split("#")[1]
-            # Get the <div> tag associated with the id_
-            # Example:
-            # <div class="album" id="7863">album: <b>"Speak &amp; Spell"
-            # </b> (1981)</div>
-            div = soup.find("div", id=id_)
-            # Get the album's title from the <div> tag
-            album_title = self._get_album_title_from_div_tag(div)
-            # Get songs from the given album
-            songs = albums[album_title]['songs']
-        elif year_after is None and year_before is None:
-            # Case where the artist URL refers to all songs from the given
-            # artist even those songs that are not associated to an album
-            #
-            # Get the list of songs URLs for the given artist
-            songs = albums
-        else:
-            # Case where we must filter songs by years
-            # NOTE: this happens when year_after and/or year_before are not None
-            current_year = y.current_year
-            if year_after == self.min_year and year_before == current_year:
-                logger.debug("<color>No filtering based on year_after ({}) "
-                             "and year_before ({})</color>".format(
-                              year_after, year_before))
-                songs = self._get_songs_urls_from_artist_webpage(soup)
-            else:
-                songs = []
-                for album_title, data in albums.items():
-                    album_year = data['album_year']
-                    if not (year_before >= album_year >= year_after):
-                        logger.debug("The album <color>'{}'</color> will be "
-                                     "<color>rejected</color> because its year "
-                                     "<color>{}</color> isn't not within <color>"
-                                     "[{}, {}]</color>".format(
-                                      album_title,
-                                      album_year,
-                                      year_after,
-                                      year_before))
+        # The artist URL can point to a specific album within the artist
+        # webpage, e.g. https://www.azlyrics.com/d/depechemode.html#7863
+        #
+        # NOTE: this happens when clicking on an album link from a search
+        # result page after calling get_lyrics_from_album()
+        album_id = urlparse(artist_url).fragment
+        filters = [AlbumIdFilter(album_id),
+                   AlbumYearFilter(years_data),
+                   MaxSongsFilter(max_songs, choose_random)]
+        albums = artist_webpage.albums.filter_albums(filters)
+        # All the song URLs are checked at once: the songs already in the db
+        # are read from it instead of being scraped again
+        song_urls = [song_url for album_data in albums.values()
+                     for song_url, _ in album_data.songs]
+        urls_to_scrape, processed_lyrics = self._split_processed_urls(
+            song_urls, artist_webpage.artist_name)
+        # The albums with songs that couldn't be saved
+        incomplete_albums = set()
+        try:
+            for album_title, album_data in albums.items():
+                for song_url, song_title in album_data.songs:
+                    if song_url not in urls_to_scrape:
+                        lyrics = processed_lyrics.get(song_url)
+                        if lyrics:
+                            yield lyrics
+                        else:
+                            incomplete_albums.add(album_title)
+                            logger.warning("<color>The URL will be skipped "
+                                           "because it was already processed:"
+                                           "</color> {}".format(song_url))
+                        continue
+                    try:
+                        lyrics = self._scrape_lyrics_page(song_url,
+                                                          check_url=False)
+                    except (
+                            lyrics_scraping.exceptions.NonUniqueAlbumYearError,
+                            lyrics_scraping.exceptions.NonUniqueLyricsError,
+                            lyrics_scraping.exceptions.WrongAlbumYearError) \
+                            as e:
+                        if self.ignore_errors:
+                            logger.error(e)
+                            logger.warning("<color>Skipping the song '{}'"
+                                           "</color>".format(song_title))
+                            incomplete_albums.add(album_title)
+                            continue
+                        else:
+                            raise e
+                    if lyrics:
+                        yield lyrics
                     else:
-                        songs.append(data)
-        all_lyrics = []
-        return all_lyrics
+                        incomplete_albums.add(album_title)
+            if self.db_conn:
+                self._save_scraped_urls(artist_webpage, albums,
+                                        incomplete_albums)
+        finally:
+            # The songs of the artist webpage are inserted in the db at once,
+            # even if the scraping failed
+            if self.db_conn:
+                self.flush()
+
+    def _save_scraped_urls(self, artist_webpage, albums, incomplete_albums):
+        """Save the URLs of the albums and the artist whose songs were all
+        saved from an artist webpage.
+
+        An album is fully scraped if none of its songs were filtered out (e.g.
+        by `max_songs`) or couldn't be saved. The artist is fully scraped if
+        all its albums are, including the songs without album.
+
+        Parameters
+        ----------
+        artist_webpage : ArtistWebpage
+            The scraped artist webpage.
+        albums : dict
+            The albums whose songs were scraped, i.e. the filtered albums of
+            the artist webpage.
+        incomplete_albums : set of str
+            The titles of the albums with songs that couldn't be saved.
+
+        """
+        parsed_url = urlparse(artist_webpage.artist_url)
+        artist_url = parsed_url._replace(fragment="").geturl()
+        all_albums = artist_webpage.get_albums()
+        complete_albums = [
+            album_title for album_title, album_data in albums.items()
+            if album_title not in incomplete_albums and
+            len(album_data.songs) == len(all_albums[album_title].songs)]
+        for album_title in complete_albums:
+            album_id = albums[album_title].album_id
+            if album_title and album_id:
+                logger.debug("<color>The album '{}' was fully scraped"
+                             "</color>".format(album_title))
+                self._insert_album_url(
+                    "{}#{}".format(artist_url, album_id), album_title,
+                    artist_webpage.artist_name)
+        if not parsed_url.fragment and not artist_webpage.nb_skipped_songs \
+                and len(complete_albums) == len(all_albums):
+            logger.debug("<color>The artist '{}' was fully scraped"
+                         "</color>".format(artist_webpage.artist_name))
+            self._insert_artist_url(artist_url, artist_webpage.artist_name)
 
     # TODO: change name to _scrape_song_webpage
-    def _scrape_lyrics_page(self, lyrics_url):
+    def _scrape_lyrics_page(self, lyrics_url, check_url=True):
         """Scrape the lyrics webpage.
 
         It crawls the lyrics webpage and scrapes any useful info to be saved,
@@ -958,6 +1327,10 @@ class AZLyricsScraper(LyricsScraper):
         ----------
         lyrics_url : str
             URL to the lyrics webpage that is being scraped.
+        check_url : bool, optional
+            Whether to check first if the URL was already processed (the
+            default value is True). Set it to False if the URL was already
+            checked in bulk with :meth:`_get_urls_to_process`.
 
         Raises
         ------
@@ -976,21 +1349,23 @@ class AZLyricsScraper(LyricsScraper):
 
         """
         # Check first if the URL was already processed, e.g. is found in the db
-        if self._url_already_processed(lyrics_url) in [0, 2]:
+        if not check_url or self._url_already_processed(lyrics_url) in [0, 2]:
             # Cache the webpage and retrieve its html content
             html = self.webcache.get_webpage(lyrics_url)
             logger.debug("Scraping the song webpage @ {}".format(lyrics_url))
-            soup = BeautifulSoup(html, 'lxml')
             # Get the following data from the lyrics webpage:
             # - the title of the song
             # - the name of the artist
             # - the text of the song
             # - the album title
             # - the year the album was released
-            # TODO: explain
-            song_title = soup.title.text.split('- ')[1].split(' Lyrics')[0]
-            artist_name = soup.title.text.split(' -')[0]
-            lyrics_result = soup.find_all("div", class_="", id="")
+            # NOTE: the document tree is released right after the extraction
+            # and only plain str are kept
+            data = PROFILES['lyrics'].extract_from_html(self.parser, html)
+            del html
+            song_title = data['song_title']
+            artist_name = data['artist_name']
+            lyrics_result = data['lyrics']
             logger.debug("<color>Song title extracted:</color> "
                          "{}".format(song_title))
             logger.debug("<color>Artist name extracted:</color> "
@@ -1001,19 +1376,18 @@ class AZLyricsScraper(LyricsScraper):
                 raise lyrics_scraping.exceptions.NonUniqueLyricsError(
                     "Lyrics extraction scheme broke: no lyrics found or more "
                     "than one lyrics were found")
-            lyrics_text = lyrics_result[0].text.strip()
+            lyrics_text = lyrics_result[0]
             logger.debug("<color>Lyrics text extracted</color>")
-            album_result = soup.find_all("div",
-                                         class_="panel songlist-panel noprint")
+            album_result = data['albums']
             logger.debug("<color>{} album{} found</color>".format(
                 len(album_result), plural(album_result)))
             if len(album_result) == 0:
                 # No album found
                 logger.debug("<color>No album found in the lyrics webpage: "
                              "{}</color>".format(lyrics_url))
-                # Add empty string to the album result to notify that no album
-                # was found when processing each album in the result
-                album_result.append("")
+                # Add None to the album result to notify that no album was
+                # found when processing each album in the result
+                album_result.append(None)
             # Process each album from the album result
             for album in album_result:
                 if album:
@@ -1021,32 +1395,18 @@ class AZLyricsScraper(LyricsScraper):
                     # album: <b>"Album title"</b> (1981)<br/><br/>
                     # And this line is found within a <div> tag:
                     # <div class="panel songlist-panel noprint">
-                    # NOTE: .contents returns all the tag's children
-                    # Thus, .contents[1] returns <b>"Album title"</b>
-                    # album.contents[1].text returns '"Album title"', thus we
-                    # strip to remove the double quotes and get a clean string
-                    # representation like 'Album title'. If we don't do that, then
-                    # we will store the album titles in the database within double
+                    # NOTE: the album title is stripped of its double quotes
+                    # by the 'lyrics' profile. If we don't do that, then we
+                    # will store the album titles in the database within double
                     # quotes, e.g. "New Life"
-                    album_title = album.contents[1].text.strip('"')
-                    # .contents[2] returns ' (1981)'. Thus, we use a regex to
-                    # extract only the numbers from the string.
-                    year_result = re.findall(r'\d+', album.contents[2])
+                    album_title = album['album_title']
+                    # The year is extracted from the text right after the <b>
+                    # tag, i.e. ' (1981)'
+                    year_result = album['year']
                     # Sanity check on the album year: there should be only one
-                    # album year extracted
-                    if len(year_result) != 1:
-                        # 0 or more than 1 album year found
-                        raise lyrics_scraping.exceptions.NonUniqueAlbumYearError(
-                            "The album year extraction doesn't result in a "
-                            "UNIQUE number")
-                    # Sanity check on the album year: the year should be a number
-                    # with four digits
-                    if not (len(year_result[0]) == 4 and
-                            year_result[0].isdecimal()):
-                        raise lyrics_scraping.exceptions.WrongAlbumYearError(
-                            "The Album year extraction scheme broke: the year "
-                            "'{}' is not a number with four digits".format(
-                                year_result[0]))
+                    # album year extracted and it should be a number with four
+                    # digits
+                    Album.check_album_year(year_result)
                     song_year = year_result[0]
                     logger.debug("<color>Album title extracted:</color> "
                                  "{}".format(album_title))
@@ -1062,20 +1422,8 @@ class AZLyricsScraper(LyricsScraper):
                                 lyrics_url=lyrics_url,
                                 lyrics_text=lyrics_text,
                                 year=song_year)
-                # TODO: add these lines in a method
-                """
                 # Save the relevant scraped data
-                self._save_artist(artist_name)
-                self._save_album(album_title=album_title,
-                                 artist_name=artist_name,
-                                 year=song_year)
-                self._save_song(song_title=song_title,
-                                artist_name=artist_name,
-                                album_title=album_title,
-                                lyrics_url=lyrics_url,
-                                lyrics=lyrics_text,
-                                year=song_year)
-                """
+                self._save_lyrics(lyrics)
                 return lyrics
         else:
             # Skip URL
@@ -1106,10 +1454,28 @@ def complete_relative_url(relative_url, base_url):
 
 
 class SongsFilter:
+    """Base class for the filters applied on the songs of an artist webpage.
+
+    The filters are applied in sequence by :meth:`Albums.filter_albums`.
+
+    """
     def __init__(self):
         pass
 
     def filter_albums(self, albums):
+        """Filter the albums and their songs.
+
+        Parameters
+        ----------
+        albums : dict
+            The albums to be filtered, see :meth:`Albums.get_albums`.
+
+        Returns
+        -------
+        albums : dict
+            The filtered albums.
+
+        """
         raise NotImplementedError
 
 
@@ -1132,7 +1498,10 @@ class AlbumIdFilter(SongsFilter):
         """
         if self.album_id:
             # Get only those songs associated with the given album_id
-            return albums.get_songs_from_album_id(self.album_id)
+            # NOTE: the album_id from an URL is a str
+            return {album_title: album_data
+                    for album_title, album_data in albums.items()
+                    if str(album_data.album_id) == str(self.album_id)}
         else:
             # No filtering based on the album_id=None
             return albums
@@ -1159,16 +1528,19 @@ class AlbumYearFilter(SongsFilter):
         # NOTE: this happens when year_after and/or year_before are not None
         year_before = self.y.year_before
         year_after = self.y.year_after
-        if year_after == self.y.min_year and year_before == self.y.current_year:
+        if year_after == self.y.year_min and year_before == self.y.current_year:
             logger.debug("<color>No filtering based on year_after ({}) "
                          "and year_before ({})</color>".format(
                           year_after, year_before))
             return albums
         else:
-            albums = {}
+            filtered_albums = {}
             for album_title, album_data in albums.items():
-                album_year = album_data['album_year']
-                if not (year_before >= album_year >= year_after):
+                album_year = album_data.album_year
+                # NOTE: songs from the section 'other songs' have no year. They
+                # are only found if include_unknown_year=True
+                if album_year != "" and \
+                        not (year_before >= album_year >= year_after):
                     logger.debug("The album <color>'{}'</color> will be "
                                  "<color>rejected</color> because its year "
                                  "<color>{}</color> isn't not within <color>"
@@ -1178,23 +1550,139 @@ class AlbumYearFilter(SongsFilter):
                                   year_after,
                                   year_before))
                 else:
-                    albums.setdefault(album_title, album_data)
-            return albums
+                    filtered_albums.setdefault(album_title, album_data)
+            return filtered_albums
 
 
 class MaxSongsFilter(SongsFilter):
-    def __init__(self):
+    def __init__(self, max_songs=None, choose_random=False):
         super().__init__()
+        self.max_songs = max_songs
+        self.choose_random = choose_random
 
     def filter_albums(self, albums):
-        pass
+        """TODO
+
+        Parameters
+        ----------
+        albums
+
+        Returns
+        -------
+        TODO
+
+        """
+        # All songs along with their album
+        songs = [(album_title, song)
+                 for album_title, album_data in albums.items()
+                 for song in album_data.songs]
+        if not self.max_songs or len(songs) <= self.max_songs:
+            return albums
+        if self.choose_random:
+            # NOTE: the selected songs are kept in their order of appearance
+            selected = sorted(random.sample(range(len(songs)), self.max_songs))
+        else:
+            selected = range(self.max_songs)
+        logger.debug("<color>{} songs selected out of {}</color>".format(
+            self.max_songs, len(songs)))
+        filtered_albums = {}
+        for i in selected:
+            album_title, song = songs[i]
+            filtered_albums.setdefault(
+                album_title, albums[album_title]._replace(songs=[]))
+            filtered_albums[album_title].songs.append(song)
+        return filtered_albums
+
+
+class AlbumSongList(Sequence):
+    """Compact list of the ``(song_url, song_title)`` of an album.
+
+    The URLs of the songs share the same prefix, e.g.
+    'https://www.azlyrics.com/lyrics/', thus only the end of each URL is kept,
+    next to the song title, in a flat list (i.e. without a tuple per song).
+    The ``(song_url, song_title)`` tuples are built when they are read.
+
+    Parameters
+    ----------
+    url_prefix : str
+        The prefix shared by the URLs of the songs.
+    songs : iterable of tuple, optional
+        The ``(song_url, song_title)`` of the songs to add.
+
+    """
+
+    __slots__ = ('url_prefix', '_items')
+
+    def __init__(self, url_prefix, songs=()):
+        self.url_prefix = url_prefix
+        # [url_end_0, song_title_0, url_end_1, song_title_1, ...]
+        self._items = []
+        for song in songs:
+            self.append(song)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("song index out of range")
+        url = self._items[2 * index]
+        # NOTE: an URL without the shared prefix is kept whole
+        if "://" not in url:
+            url = self.url_prefix + url
+        return url, self._items[2 * index + 1]
+
+    def __len__(self):
+        return len(self._items) // 2
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(type(self).__name__, self.url_prefix,
+                                       list(self))
+
+    def append(self, song):
+        """Add a song at the end of the list.
+
+        Parameters
+        ----------
+        song : tuple
+            The ``(song_url, song_title)`` of the song.
+
+        """
+        song_url, song_title = song
+        if song_url.startswith(self.url_prefix):
+            song_url = song_url[len(self.url_prefix):]
+        self._items.extend((song_url, song_title))
+
+
+AlbumSongs = namedtuple("AlbumSongs", "album_id album_year songs")
+AlbumSongs.__doc__ = """Data of an album from an artist webpage.
+
+The `songs` are an :class:`AlbumSongList` of ``(song_url, song_title)``
+tuples (a list once filtered). The album is a tuple (without per-instance
+``__dict__``) since full discographies can be kept in memory."""
 
 
 class Albums:
+    """The albums of an artist webpage.
+
+    The albums are kept in a dict whose keys are the album titles and values
+    are :class:`AlbumSongs`, e.g.::
+
+        {"Speak & Spell": AlbumSongs(album_id=7863, album_year=1981,
+                                     songs=AlbumSongList(...))}
+
+    The songs without album are under the album title "".
+
+    """
     def __init__(self, artist_name, artist_url):
         self.artist_name = artist_name
         self.artist_url = artist_url
         self._albums = {}
+        # All the songs' URLs start with it, see AlbumSongList
+        parsed_url = urlparse(artist_url)
+        self._song_url_prefix = "{}://{}/lyrics/".format(parsed_url.scheme,
+                                                         parsed_url.hostname)
 
     def filter_albums(self, filters):
         """TODO
@@ -1235,9 +1723,9 @@ class Albums:
         TODO
 
         """
-        for album_title, album_data in self._albums.items():
-            if album_data['album_id'] == album_id:
-                return self._albums[album_title]
+        for album_data in self._albums.values():
+            if str(album_data.album_id) == str(album_id):
+                return album_data
         return None
 
     def get_songs_from_album_title(self, album_title):
@@ -1252,51 +1740,62 @@ class Albums:
         TODO
 
         """
-        return self._albums[album_title]['songs']
+        return self._albums[album_title].songs
 
     def get_songs_from_year(self, year_after, year_before):
         pass
 
-    def update_albums(self, anchor_tag, album_title, album_id, album_year):
+    def update_albums(self, song_title, song_href, album_title, album_id,
+                      album_year):
         """TODO
 
         Parameters
         ----------
-        anchor_tag
+        song_title : str
+        song_href : str
+            Relative URL of the song, e.g. '../lyrics/depechemode/title.html'.
         album_title
         album_id
         album_year
 
         """
-        song_title = anchor_tag.text
         """
         logger.debug("The song <color>'{}'</color> will be <color>"
                      "added</color>".format(song_title))
         """
         # TODO: album info should be done in a separate method
-        self._albums.setdefault(album_title, {})
-        self._albums[album_title].setdefault('album_id', album_id)
-        self._albums[album_title].setdefault('album_year', album_year)
-        self._albums[album_title].setdefault('songs', [])
-        song_url = complete_relative_url(anchor_tag['href'][2:], self.artist_url)
-        song_data = (song_url, song_title)
-        self._albums[album_title]['songs'].append(song_data)
+        album_data = self._albums.get(album_title)
+        if album_data is None:
+            album_data = AlbumSongs(album_id, album_year,
+                                    AlbumSongList(self._song_url_prefix))
+            self._albums[album_title] = album_data
+        song_url = complete_relative_url(song_href[2:], self.artist_url)
+        album_data.songs.append((song_url, song_title))
 
 
 class ArtistWebpage:
-    def __init__(self, artist_url, webcache, include_unknown_year, ignore_errors):
+    def __init__(self, artist_url, webcache, include_unknown_year, ignore_errors,
+                 parser=None):
         self.artist_url = artist_url
         self.webcache = webcache
         self.include_unknown_year = include_unknown_year
         self.ignore_errors = ignore_errors
+        self.parser = get_parser() if parser is None else parser
         # Retrieve the webpage's HTML
         # TODO: HTTP404Error and requests.RequestException are raised
-        self.html = self.webcache.get_webpage(self.artist_url)
-        self.soup = BeautifulSoup(self.html, 'lxml')
+        html = self.webcache.get_webpage(self.artist_url)
+        # Extract the artist's name and albums with the 'artist' profile
+        # NOTE: neither the HTML nor the document tree is kept, only the plain
+        # str data extracted from them
+        data = PROFILES['artist'].extract_from_html(self.parser, html)
+        del html
         # Get the name of the artist
-        self.artist_name = self._scrape_artist_name()
+        self.artist_name = self._scrape_artist_name(data)
         self.albums = Albums(self.artist_name, self.artist_url)
-        self._scrape_albums()
+        # Number of songs not added to the albums, e.g. the songs without
+        # album if include_unknown_year=False
+        self.nb_skipped_songs = 0
+        self._scrape_albums(data)
 
     # TODO: use property
     def get_albums(self):
@@ -1320,12 +1819,13 @@ class ArtistWebpage:
         """
         return self.artist_name
 
-    def _add_songs_from_same_album(self, div):
+    def _add_songs_from_same_album(self, album):
         """TODO
 
         Parameters
         ----------
-        div
+        album : dict
+            The album's data as extracted with the 'artist' profile.
 
         Raises
         ------
@@ -1334,10 +1834,11 @@ class ArtistWebpage:
         """
         # TODO: explain
         # The <div> tag refers to an album
-        # Get the album title
-        album_title = self.scrape_album_title(div)
-        # Get the album year
-        year_result = re.findall(r'\((\d+)\)', div.text)
+        # Example:
+        # <div class="album" id="7863">album: <b>"Speak &amp; Spell"
+        # </b> (1981)</div>
+        album_title = album['album_title']
+        year_result = album['album_year']
         # Sanity check the extracted album year
         try:
             Album.check_album_year(year_result)
@@ -1348,6 +1849,7 @@ class ArtistWebpage:
                 logger.error(e)
                 logger.warning("<color>Skipping the album '{}'</color>".format(
                                album_title))
+                self.nb_skipped_songs += len(album['songs'])
             else:
                 raise e
         else:
@@ -1355,147 +1857,97 @@ class ArtistWebpage:
             album_year = int(year_result[0])
             logger.debug("<color>The album '{}' ({}) will be added"
                          "</color>".format(album_title, album_year))
-            # Get album's id
-            album_id = self._scrape_album_id(div)
+            album_id = int(album['album_id'])
             # Get all songs from the given album
-            # Only get those songs (siblings) that are related to the given album
-            siblings = div.find_next_siblings()
-            # TODO: [siblings_refactor]
-            for index, sibling in enumerate(siblings, start=1):
-                # A song must be associated with an <a href="..."> tag
-                # Example:
-                # <a href="../lyrics/depechemode/goingbackwards.html"
-                # target="_blank"> Going Backwards</a>
-                if sibling.get('href'):
-                    self.albums.update_albums(sibling, album_title, album_id,
-                                              album_year)
-                elif sibling.get('class') and \
-                        'album' in sibling.get('class'):
-                    # We arrived at the beginning of another album. Thus, we must
-                    # exit from the 'for loop' since we finished adding all songs
-                    # from the given album
-                    # Example:
-                    # <div class="album" id="7852">album: <b>"A Broken Frame"
-                    # </b> (1982)</div>
-                    break
-                else:
-                    # Neither a song nor an album, e.g. <br/>
-                    # Thus, we skip the current sibling
-                    continue
-            songs = self.albums.get_songs_from_album_title(album_title)
+            # NOTE: the 'artist' profile only gets those songs (siblings) that
+            # are related to the given album, i.e. the <a href="..."> tags
+            # before the <div> tag of the next album
+            # Example:
+            # <a href="../lyrics/depechemode/goingbackwards.html"
+            # target="_blank"> Going Backwards</a>
+            for song in album['songs']:
+                self.albums.update_albums(song['song_title'], song['song_href'],
+                                          album_title, album_id, album_year)
+            album_data = self.albums.get_albums().get(album_title)
+            songs = album_data.songs if album_data else None
             if songs:
                 logger.debug("<color>{} songs added from '{}'"
                              "</color>".format(len(songs), album_title))
 
-    def _add_songs_without_albums(self, div):
+    def _add_songs_without_albums(self, album):
         """TODO
 
         Parameters
         ----------
-        div
+        album : dict
+            The data of the section 'other songs' as extracted with the
+            'artist' profile.
 
         """
         # The <div> tag refers to the section "other songs" which corresponds
         # to songs without album and year
         if self.include_unknown_year:
             logger.debug("<color>Processing the section 'other songs'...</color>")
-            # Get all songs without album and year
-            # Only get those songs (siblings) that are related
-            # to the "other songs" section
-            siblings = div.find_next_siblings()
             album_title = ""
             album_id = ""
             album_year = ""
             logger.debug("<color>{} items found for 'other songs'"
-                         "</color>".format(len(siblings)))
-            for index, sibling in enumerate(siblings, start=1):
-                # logger.debug("<color>Processing sibling #{}"
-                #              "</color>".format(index))
-                if sibling.get('href'):
-                    self.albums.update_albums(sibling, album_title, album_id, album_year)
-                """
-                else:
-                    logger.debug("<color>Skipping sibling #{} since "
-                                 "it's not a song</color>".format(
-                                  index_other))
-                """
-            songs = self.albums.get_songs_from_album_title(album_title)
+                         "</color>".format(len(album['songs'])))
+            for song in album['songs']:
+                self.albums.update_albums(song['song_title'], song['song_href'],
+                                          album_title, album_id, album_year)
+            album_data = self.albums.get_albums().get(album_title)
+            songs = album_data.songs if album_data else None
             if songs:
                 logger.debug("<color>{} songs added from 'other songs'"
                              "</color>".format(len(songs)))
         else:
             logger.debug("<color>No songs from the section 'other songs' will "
                          "be added</color>")
+            self.nb_skipped_songs += len(album['songs'])
 
-    def _scrape_albums(self):
+    def _scrape_albums(self, data):
         """TODO
 
+        Parameters
+        ----------
+        data : dict
+            The data extracted from the artist webpage with the 'artist'
+            profile.
+
         Returns
         -------
         TODO
 
         """
-        # Get all the <div> tags associated with albums
+        # All the <div> tags associated with albums
         # NOTE: even the section "other songs" is included even though it is for
         # songs without albums
         # Examples:
         # 1. <div class="album" id="7863">album: <b>"Speak &amp; Spell"</b>
         #    (1981)</div>
         # 2. <div class="album">other songs:</div>
-        div_album_tags = self.soup.find_all("div", class_="album")
-        # Process each <div> tag in order to extract useful info, e.g. album
+        albums = data['albums']
+        # Process each album in order to extract useful info, e.g. album
         # title, its related songs, ...
-        logger.debug("<color>{} albums found</color>".format(
-            len(div_album_tags)))
-        for index_div, div in enumerate(div_album_tags, start=1):
+        logger.debug("<color>{} albums found</color>".format(len(albums)))
+        for index_div, album in enumerate(albums, start=1):
             logger.debug("<color>Processing item #{}</color>".format(
                 index_div))
-            if div.text.count("other songs"):
-                self._add_songs_without_albums(div)
+            if album['header'].count("other songs"):
+                self._add_songs_without_albums(album)
             else:
-                self._add_songs_from_same_album(div)
-        ipdb.set_trace()
-
-    @staticmethod
-    def scrape_album_title(div):
-        """TODO
-
-        Parameters
-        ----------
-        div
-
-        Returns
-        -------
-        TODO
-
-        """
-        # Get the album's title from a <div> tag
-        # Example:
-        # <div class="album" id="7863">album: <b>"Speak &amp; Spell"
-        # </b> (1981)</div>
-        return div.contents[1].text.strip('"')
+                self._add_songs_from_same_album(album)
 
     @staticmethod
-    def _scrape_album_id(div):
+    def _scrape_artist_name(data):
         """TODO
 
         Parameters
         ----------
-        div
-
-        Returns
-        -------
-        TODO
-
-        """
-        # Get the album's id from a <div> tag
-        # Example:
-        # <div class="album" id="7863">album: <b>"Speak &amp; Spell"
-        # </b> (1981)</div>
-        return int(div.attrs['id'])
-
-    def _scrape_artist_name(self):
-        """TODO
+        data : dict
+            The data extracted from the artist webpage with the 'artist'
+            profile.
 
         Returns
         -------
@@ -1504,23 +1956,4 @@ class ArtistWebpage:
         """
         # The name of the artist is found in the title of the artist webpage as
         # "ArtistName Lyrics"
-        return self.soup.title.text.split(' Lyrics')[0]
-
-    def _scrape_songs_urls(self):
-        """TODO
-
-        Parameters
-        ----------
-        soup
-
-        Returns
-        -------
-        TODO
-
-        """
-        # Get the list of songs URLs for the given artist
-        # The URLs will be found as values to <a>'s href attributes
-        # e.g. <a href="../lyrics/artist_name/song_title.html" ... >
-        anchors = self.soup.find_all(href=re.compile("^../lyrics"))
-        # Get only the songs URLs from the <a> tags
-        return [a.attrs['href'] for a in anchors]
+        return data['artist_name']
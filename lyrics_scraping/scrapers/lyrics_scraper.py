@@ -17,6 +17,8 @@ See the structure of the music database as defined in the `music.sql schema`_.
 .. _guide: https://bit.ly/2xYreie
 .. _HTTP GET request: https://www.webopedia.com/TERM/H/HTTP_request_header.html
 .. _music.sql schema: https://bit.ly/2kIMYvn
+.. _music_v2.sql schema:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/music_v2.sql
 .. _saveutils.py: https://bit.ly/2m5z46A
 .. _saveutils.SaveWebpages: https://bit.ly/2oaz7Px
 .. _scraper.py: https://bit.ly/2msZDTC
@@ -25,21 +27,39 @@ See the structure of the music database as defined in the `music.sql schema`_.
 
 """
 
+import functools
+import json
 import logging
 import os
 import random
 import sqlite3
+import sys
+import tempfile
+import threading
+import time
 # NOTE:
 # For urllib with Python 2, it is
 # from six.moves.urllib.parse import urlparse
 import urllib
+from array import array
+from collections import Counter, OrderedDict, namedtuple
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from logging import NullHandler
 from urllib.request import urlopen
 from urllib.parse import urlparse
 
 import lyrics_scraping.exceptions
 import pyutils.exceptions
-from lyrics_scraping.utils import plural, get_data_filepath
+from lyrics_scraping.bloom import BloomFilter
+from lyrics_scraping.compression import register_lyrics_text
+from lyrics_scraping.dbwriter import DBWriter, write_inserts
+from lyrics_scraping.matching import normalize
+from lyrics_scraping.parsers import DEFAULT_PARSER, get_parser
+from lyrics_scraping.utils import (
+    DB_PRAGMAS, apply_db_pragmas, create_lyrics_fts, create_name_keys,
+    create_url_changes, get_db_schema_version, has_lyrics_fts, plural,
+    get_data_filepath)
 from pyutils.dbutils import connect_db, create_db, sql_sanity_checks
 from pyutils.genutils import create_dir
 from pyutils.logutils import get_error_msg, setup_logging_from_cfg
@@ -51,6 +71,286 @@ logger.addHandler(NullHandler())
 
 _SETUP_LOGGING = True
 
+BatchResult = namedtuple("BatchResult", "query lyrics error")
+# Maximum number of values in the IN (...) clause of a bulk SELECT query
+# NOTE: SQLite allows at most 999 SQL parameters before version 3.32
+_SQL_IN_CHUNK_SIZE = 500
+# Minimum number of URLs that the filter of the URLs in the db can hold
+_MIN_URL_FILTER_CAPACITY = 100000
+# The normalized names of a song, i.e. its title, artist and album (see
+# create_name_keys)
+_SONG_NAMES_SQL = "INSERT INTO name_keys (name_key, name) VALUES (?1, ?2)," \
+                  " (?3, ?4), (?5, ?6) ON CONFLICT(name_key, name) {}"
+# The UPSERT queries of the _insert_* methods for each db schema version and
+# the update done on a conflict if the rows can be updated (see
+# update_tables), only when the content changed
+# NOTE: a row violating a NOT NULL constraint makes its whole batch fail, thus
+# such rows are never queued (see _insert_song). The URLs are only inserted
+# if their song, album or artist is found. The views of the version 2 can't be
+# upserted, thus its tables are filled directly and the album of a song is
+# inserted before it like the view's trigger does (with the same values as
+# the song)
+_INSERT_SQLS = {
+    1: {
+        'album': ("INSERT INTO albums (album_title, artist_name, year)"
+                  " VALUES (?, ?, ?) ON CONFLICT(album_title, artist_name)"
+                  " {}",
+                  "year=excluded.year WHERE year IS NOT excluded.year"),
+        'artist': ("INSERT INTO artists (artist_name) VALUES (?)"
+                   " ON CONFLICT(artist_name) {}", None),
+        'song': ("INSERT INTO songs (song_title, artist_name, album_title,"
+                 " lyrics, year) VALUES (?, ?, ?, ?, ?)"
+                 " ON CONFLICT(song_title, artist_name, album_title) {}",
+                 "lyrics=excluded.lyrics, year=excluded.year WHERE"
+                 " lyrics_text(lyrics) IS NOT lyrics_text(excluded.lyrics)"
+                 " OR year IS NOT excluded.year"),
+        'song_url': ("INSERT INTO songs_urls (song_url, song_title)"
+                     " SELECT ?1, song_title FROM songs WHERE song_title=?2"
+                     " AND artist_name=?3 AND album_title=?4"
+                     " ON CONFLICT(song_url) {}",
+                     "song_title=excluded.song_title WHERE song_title IS NOT"
+                     " excluded.song_title"),
+        'artist_url': ("INSERT INTO artists_urls (artist_url, artist_name,"
+                       " error_on_last_time, nb_requests)"
+                       " SELECT ?1, artist_name, 0, 1 FROM artists WHERE"
+                       " artist_name=?2 ON CONFLICT(artist_url) {}", None),
+        'album_url': ("INSERT INTO albums_urls (album_url, album_title)"
+                      " SELECT ?1, album_title FROM albums WHERE"
+                      " album_title=?2 AND artist_name=?3"
+                      " ON CONFLICT(album_url) {}", None),
+        'song_names': (_SONG_NAMES_SQL, None),
+    },
+    2: {
+        'album': ("INSERT INTO album (artist_id, album_title, year)"
+                  " SELECT artist_id, ?1, ?3 FROM artist WHERE artist_name=?2"
+                  " ON CONFLICT(artist_id, album_title) {}",
+                  "year=excluded.year WHERE year IS NOT excluded.year"),
+        'artist': ("INSERT INTO artist (artist_name) VALUES (?)"
+                   " ON CONFLICT(artist_name) {}", None),
+        'song_album': ("INSERT INTO album (artist_id, album_title, year)"
+                       " SELECT artist_id, ?3, ?5 FROM artist WHERE"
+                       " artist_name=?2 ON CONFLICT(artist_id, album_title)"
+                       " {}", None),
+        'song': ("INSERT INTO song (album_id, song_title, lyrics, year)"
+                 " SELECT album_id, ?1, ?4, ?5 FROM album JOIN artist"
+                 " USING(artist_id) WHERE artist_name=?2 AND album_title=?3"
+                 " ON CONFLICT(album_id, song_title) {}",
+                 "lyrics=excluded.lyrics, year=excluded.year WHERE"
+                 " lyrics_text(lyrics) IS NOT lyrics_text(excluded.lyrics)"
+                 " OR year IS NOT excluded.year"),
+        'song_url': ("INSERT INTO song_url (song_url, song_id)"
+                     " SELECT ?1, song_id FROM song JOIN album"
+                     " USING(album_id) JOIN artist USING(artist_id) WHERE"
+                     " song_title=?2 AND artist_name=?3 AND album_title=?4"
+                     " ON CONFLICT(song_url) {}",
+                     "song_id=excluded.song_id WHERE song_id IS NOT"
+                     " excluded.song_id"),
+        'artist_url': ("INSERT INTO artist_url (artist_url, artist_id,"
+                       " error_on_last_time, nb_requests)"
+                       " SELECT ?1, artist_id, 0, 1 FROM artist WHERE"
+                       " artist_name=?2 ON CONFLICT(artist_url) {}", None),
+        'album_url': ("INSERT INTO album_url (album_url, album_id)"
+                      " SELECT ?1, album_id FROM album JOIN artist"
+                      " USING(artist_id) WHERE album_title=?2 AND"
+                      " artist_name=?3 ON CONFLICT(album_url) {}", None),
+        'song_names': (_SONG_NAMES_SQL, None),
+    },
+}
+# The table of the song URLs joined with the songs for each db schema version
+# NOTE: the URLs of the version 1 are only linked to the songs through their
+# titles whereas the rowid of the songs view of the version 2 is the song_id
+_SONGS_URLS_JOINS = {
+    1: "songs_urls ON songs_urls.song_title=songs.song_title",
+    2: "song_url AS songs_urls ON songs_urls.song_id=songs.rowid",
+}
+# The queries checking if the webpage of an album or an artist was fully
+# scraped, i.e. if its URL was saved, for each db schema version
+# NOTE: the album URLs of the version 1 only know the title of their album
+_SCRAPED_SQLS = {
+    1: {
+        'album': "SELECT 1 FROM albums_urls JOIN albums USING(album_title)"
+                 " WHERE {} LIMIT 1",
+        'artist': "SELECT 1 FROM artists_urls WHERE {} LIMIT 1",
+    },
+    2: {
+        'album': "SELECT 1 FROM album_url JOIN album USING(album_id)"
+                 " JOIN artist USING(artist_id) WHERE {} LIMIT 1",
+        'artist': "SELECT 1 FROM artist_url JOIN artist USING(artist_id)"
+                  " WHERE {} LIMIT 1",
+    },
+}
+BatchResult.__doc__ = """Result of one item of a batch method, e.g.
+:meth:`LyricsScraper.get_songs_lyrics`.
+
+The `query` is the item as given, `lyrics` is what the single-item method
+returned (:obj:`None` if it failed) and `error` is the exception raised while
+resolving the item (:obj:`None` if it succeeded)."""
+
+
+class ScrapedRecords(Sequence):
+    """Insertion-ordered set of scraped records (tuples) keyed on their
+    natural key.
+
+    It is the 'data' of each table of :data:`LyricsScraper.scraped_data`. It
+    reads like a list of tuples (indexing, iteration, :func:`len`) but a
+    record is found from its natural key in constant time, e.g. the song
+    title, the artist's name and the album title of a song. Thus, the
+    lyrics text of a song is never compared for finding a duplicate.
+
+    The records can be bounded in memory: past `max_memory`, the oldest
+    records are spilled to an append-only temporary file (one JSON line per
+    record) and they are read back from it on demand. Only the natural keys
+    and the offsets of the spilled records are kept in memory.
+
+    Parameters
+    ----------
+    key_size : int
+        Number of leading fields of a record which are its natural key, e.g.
+        3 for the songs ``(song_title, artist_name, album_title, ...)``.
+    records : iterable of tuple, optional
+        The records to add.
+    max_memory : int, optional
+        Approximate maximum size in bytes of the records kept in memory (the
+        default value is :obj:`None` which implies that all the records are
+        kept in memory).
+
+    """
+
+    __slots__ = ('key_size', 'max_memory', '_indexes', '_records', '_memory',
+                 '_spill_file', '_spill_offsets', '_spill_lock')
+
+    def __init__(self, key_size, records=(), max_memory=None):
+        self.key_size = key_size
+        self.max_memory = max_memory
+        # Natural key -> position of the record
+        self._indexes = {}
+        # The records in memory, i.e. those after the spilled records
+        self._records = []
+        self._memory = 0
+        self._spill_file = None
+        # Offsets of the spilled records in the spill file
+        self._spill_offsets = array('q')
+        self._spill_lock = threading.Lock()
+        for record in records:
+            self.add(record)
+
+    def __contains__(self, record):
+        return tuple(record[:self.key_size]) in self._indexes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        nb_spilled = len(self._spill_offsets)
+        if index >= nb_spilled:
+            return self._records[index - nb_spilled]
+        with self._spill_lock:
+            self._spill_file.seek(self._spill_offsets[index])
+            return tuple(json.loads(self._spill_file.readline().decode()))
+
+    def __iter__(self):
+        nb_spilled = len(self._spill_offsets)
+        for index in range(nb_spilled):
+            yield self[index]
+        # NOTE: records spilled during the iteration are read from the file
+        for index in range(nb_spilled, len(self)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self._spill_offsets) + len(self._records)
+
+    def __repr__(self):
+        return "{}({}, <{} records, {} spilled>)".format(
+            type(self).__name__, self.key_size, len(self), self.nb_spilled)
+
+    @property
+    def nb_spilled(self):
+        """Number of records spilled to the disk."""
+        return len(self._spill_offsets)
+
+    def add(self, record):
+        """Add a record unless a record with the same natural key was already
+        added.
+
+        Parameters
+        ----------
+        record : tuple
+            The record to add.
+
+        Returns
+        -------
+        added : bool
+            Whether the record was added.
+
+        """
+        key = tuple(record[:self.key_size])
+        if key in self._indexes:
+            return False
+        self._indexes[key] = len(self)
+        self._records.append(record)
+        if self.max_memory is not None:
+            self._memory += self._record_size(record)
+            if self._memory > self.max_memory:
+                self._spill()
+        return True
+
+    def close(self):
+        """Delete the spill file (the spilled records are then lost)."""
+        with self._spill_lock:
+            if self._spill_file:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def get(self, key, default=None):
+        """Return the record with the given natural key.
+
+        Parameters
+        ----------
+        key : tuple
+            The natural key, e.g. ``(album_title, artist_name)`` for an album.
+        default : optional
+            Value returned if no record has this key (the default value is
+            :obj:`None`).
+
+        Returns
+        -------
+        record : tuple
+            The record or `default`.
+
+        """
+        index = self._indexes.get(tuple(key))
+        return default if index is None else self[index]
+
+    @staticmethod
+    def _record_size(record):
+        """Return the approximate size in bytes of a record."""
+        return sys.getsizeof(record) + sum(map(sys.getsizeof, record))
+
+    def _spill(self):
+        """Spill the oldest records in memory to the spill file until half of
+        `max_memory` is used."""
+        with self._spill_lock:
+            if self._spill_file is None:
+                # NOTE: the file is deleted as soon as it is closed
+                self._spill_file = tempfile.TemporaryFile(
+                    prefix="scraped_records_", suffix=".jsonl")
+            self._spill_file.seek(0, os.SEEK_END)
+            nb_spilled = 0
+            for record in self._records:
+                if self._memory <= self.max_memory // 2:
+                    break
+                self._spill_offsets.append(self._spill_file.tell())
+                self._spill_file.write(json.dumps(record).encode() + b"\n")
+                self._memory -= self._record_size(record)
+                nb_spilled += 1
+            self._spill_file.flush()
+            del self._records[:nb_spilled]
+        logger.debug("{} records spilled to the disk ({} in memory)".format(
+            nb_spilled, len(self._records)))
+
 
 class LyricsScraper:
     """Base class for scraping and saving webpages locally.
@@ -79,13 +379,63 @@ class LyricsScraper:
         Whether the changes to the database are committed right away (the
         default is False which implies that the changes won't take effect
         immediately).
+    db_schema_version : int, {1, 2}, optional
+        Version of the schema of the music database when it is created: 1
+        for the `music.sql schema`_ or 2 for the `music_v2.sql schema`_ where
+        the artists, albums and songs are identified by integers (the default
+        value is 1). The version of an existing database is read from it. Both
+        versions are used the same way, see :mod:`~lyrics_scraping.migration`
+        for migrating a database to the version 2.
+    db_profile : str, optional
+        Name of the profile of SQLite pragmas applied when connecting to the
+        database: 'safe', 'fast' or 'bulk-load' (the default value is 'safe').
+        See :data:`~lyrics_scraping.utils.DB_PRAGMAS` for their pragmas.
+        :obj:`None` implies that the SQLite defaults are used.
+    db_pragmas : dict, optional
+        Profiles of SQLite pragmas, e.g. ``{'fast': {'synchronous': 'OFF'}}``,
+        that override the pragmas of the built-in profiles or add new
+        profiles (the default value is :obj:`None`).
+    use_url_filter : bool, optional
+        Whether the song URLs in the database are also kept in a Bloom filter
+        (see :mod:`~lyrics_scraping.bloom`) so that the URLs that are
+        definitely not in the database are never looked up in it (the default
+        value is False). The filter is built from the database when the
+        scraper starts and saved next to it (with the extension *.bloom*) for
+        a fast start the next time.
+    url_filter_error_rate : float, optional
+        False-positive rate of the filter of URLs, i.e. the fraction of new
+        URLs still looked up in the database (the default value is 0.01).
+    use_fts : bool, optional
+        Whether the songs in the database are indexed in a full-text index
+        (the FTS5 table `lyrics_fts`) that is searched with
+        :meth:`search_lyrics` (the default value is False). The index is
+        created with the songs already in the database if it doesn't exist.
+        SQLite must be compiled with FTS5.
+    compress_lyrics : bool, optional
+        Whether the lyrics are inserted in the database as zlib-compressed
+        BLOBs (the default value is False). They are compressed with the last
+        dictionary trained on the lyrics of the database, see
+        :func:`~lyrics_scraping.compression.compress_db_lyrics`. Whatever
+        this option, the compressed lyrics found in the database are
+        transparently decompressed.
+    local_first : bool, optional
+        Whether the search queries (song, album or artist) are first resolved
+        against the music database before sending a search request to the
+        lyrics website (the default value is True). It only applies if a
+        database is used. An album or an artist is only resolved locally if
+        its webpage was fully scraped before, i.e. if its URL was saved in
+        the database once all its songs were saved.
     overwrite_db : bool, optional
         Whether the database will be overwritten. The user is given some time
         to stop the script before the database is overwritten (the default
         value is False).
     update_tables : bool, optional
-        Whether the tables in the database can be updated (the default value is
-        False).
+        Whether the rows already in the database are updated with the newly
+        scraped data, e.g. the lyrics of a song processed again (the default
+        value is False). The rows are saved with UPSERT queries which only
+        update them if their content changed, otherwise they are left
+        untouched. It is implied by `overwrite_db` since the URLs already in
+        the database are then processed again.
     cache_dirpath : str, optional
         Path to the cache directory where webpages are saved (the default value
         is :obj:`None` which implies that the cache will not be used).
@@ -111,6 +461,57 @@ class LyricsScraper:
         according to the `YAML logging file`_ (the default value is False which
         implies that no logging will be used and thus no messages will be
         printed on the console).
+    max_search_pages : int, optional
+        Maximum number of search result pages fetched when looking for the
+        best match (the default value is 3). The next page is only fetched if
+        no search result has a score of at least `best_match_threshold`.
+    best_match_threshold : float, optional
+        Score between 0 and 1 from which a search result is a good enough match
+        for the search query, i.e. no more search result page is fetched (the
+        default value is 0.6).
+    direct_urls : bool, optional
+        Whether to first try to get a song's lyrics webpage from its URL built
+        from the song title and the artist's name, i.e. without any search
+        request (the default value is True). The search is only done if the
+        built URL is not found, can't be retrieved or is the one of another
+        song.
+    group_songs_by_artist : bool, optional
+        Whether the songs of a same artist given to :meth:`get_songs_lyrics`
+        are looked up in the artist's webpage, i.e. with one request for all
+        of them instead of a search request per song (the default value is
+        True).
+    scraped_data_max_mb : float, optional
+        Approximate maximum size in MB of the scraped data kept in memory for
+        each table of :data:`scraped_data` (the default value is 100). The
+        oldest data is spilled to a temporary file past it. :obj:`None`
+        implies that all the scraped data is kept in memory.
+    max_workers : int, optional
+        Number of threads used by the batch methods, e.g.
+        :meth:`get_songs_lyrics` (the default value is 4). The HTTP requests
+        are still sent one at a time.
+    insert_batch_size : int, optional
+        Number of rows inserted in the database at once, with one
+        ``executemany`` per table inside a single transaction (the default
+        value is 500). The pending rows are flushed at the latest at the end
+        of each artist webpage and of each batch job, see :meth:`flush`.
+    insert_flush_interval : float, optional
+        Maximum number of seconds the rows stay pending before being flushed
+        (the default value is 5). It is checked when a row is added.
+    use_db_writer : bool, optional
+        Whether the batches of rows are inserted by a dedicated thread with
+        its own connection to the database (see
+        :class:`~lyrics_scraping.dbwriter.DBWriter`) instead of by the thread
+        that flushes them (the default value is False). The threads resolving
+        the songs then never wait on SQLite locks.
+    db_writer_queue_size : int, optional
+        Maximum number of batches waiting to be inserted by the writer
+        thread before the threads flushing rows are blocked (the default
+        value is 8).
+    parser : str, optional
+        Name of the parser backend used for building the document trees of
+        the scraped webpages, e.g. 'bs4-lxml' or 'selectolax' (the default
+        value is 'bs4-lxml'). See :mod:`~lyrics_scraping.parsers` for the list
+        of backends.
     **kwargs : dict
         TODO
 
@@ -127,18 +528,27 @@ class LyricsScraper:
         Stores the unique URLs that were processed (whether successfully or
         unsuccessfully) during the current session.  Thus, `checked_urls` should
         equal to `skipped_urls` + `good_urls`.
+    metrics : collections.Counter
+        Counts of events during the current session, e.g.
+        'direct_url_hits', 'direct_url_misses' and 'direct_url_errors'.
     db_conn : sqlite3.Connection
-        SQLite database connection.
+        SQLite database connection (:obj:`None` if no database is used). The
+        SQL functions ``normalize()`` and ``lyrics_text()`` are registered on
+        it, see :func:`~lyrics_scraping.matching.normalize` and
+        :func:`~lyrics_scraping.compression.register_lyrics_text`.
     saver : :class:`saveutils.SaveWebpages`
         For retrieving webpages and saving them in cache. See :mod:`saveutils`.
+    parser : :class:`~lyrics_scraping.parsers.ParserBackend`
+        The parser backend used for building the document trees of the
+        scraped webpages.
     valid_domains : list
         Only URLs from these domains will be processed.
     logging_filepath : str
         Path to the `YAML logging file`_ which is used to setup logging for all
         custom modules.
     schema_filepath : str
-        Path to `music.sql schema`_ for building the music database which will
-        store the scraped data.
+        Path to `music.sql schema`_ (or `music_v2.sql schema`_) for building
+        the music database which will store the scraped data.
     scraped_data : dict
         The scraped data is saved as a dictionary. Its structure is based on
         the database's `music.sql schema`_.
@@ -163,22 +573,9 @@ class LyricsScraper:
     """
 
     valid_domains = ["www.azlyrics.com"]
-    scraped_data = {
-        'albums': {
-            'headers': ('album_title', 'artist_name', 'year',),
-            'data': []
-        },
-        'artists': {
-            'headers': ('artist_name',),
-            'data': []
-        },
-        'songs': {
-            'headers': ('song_title', 'artist_name', 'album_title',
-                        'lyrics_url', 'lyrics', 'year',),
-            'data': []
-        }
-    }
-    """The scraped data is saved as a dictionary.
+    scraped_data = None
+    """The scraped data is saved as a dictionary, one per scraper (it is set
+    in :meth:`__init__`).
 
     .. _scraped-data-Label:
 
@@ -189,38 +586,76 @@ class LyricsScraper:
             scraped_data = {
                 'albums': {
                     'headers': ('album_title', 'artist_name', 'year',),
-                    'data': []
+                    'data': ScrapedRecords(2)
                 },
                 'artists': {
                     'headers': ('artist_name',),
-                    'data': []
+                    'data': ScrapedRecords(1)
                 },
                 'songs': {
                     'headers': ('song_title', 'artist_name', 'album_title',
                                 'lyrics_url', 'lyrics', 'year',),
-                    'data': []
+                    'data': ScrapedRecords(3)
                 }
             }
 
-    .. note:: The 'data' key points to a list of tuple that eventually will 
-       store the scraped data from different URLs, i.e. each scraped data from  
-       a given URL is added as a tuple to the list.
+    .. note:: The 'data' key points to a sequence of tuple that eventually will
+       store the scraped data from different URLs, i.e. each scraped data from
+       a given URL is added as a tuple to the sequence. A tuple is unique on
+       its natural key, i.e. the first fields up to the artist's name for an
+       album or an artist and up to the album title for a song (see
+       :class:`ScrapedRecords`). Past :ref:`scraped_data_max_mb
+       <LyricsScraperParametersLabel>`, the oldest tuples of a table are
+       spilled to the disk and read back on demand.
     """
     # TODO: add example of data.
 
-    def __init__(self, db_filepath="", overwrite_db=False,
+    def __init__(self, db_filepath="", overwrite_db=False, autocommit=False,
+                 update_tables=False, db_schema_version=1, db_profile="safe",
+                 db_pragmas=None, use_url_filter=False,
+                 url_filter_error_rate=0.01, use_fts=False,
+                 compress_lyrics=False, local_first=True,
                  use_webcache=True, webcache_dirpath="~/.cache/lyric_scraping/",
                  expire_after=25920000, use_compute_cache=True, ram_size=100,
                  http_get_timeout=5, delay_between_requests=8,
                  headers=WebCache.HEADERS, seed=123456, interactive=False,
-                 delay_interactive=30, best_match=False, simulate=False,
-                 ignore_errors=False):
+                 delay_interactive=30, best_match=False, max_search_pages=3,
+                 best_match_threshold=0.6, direct_urls=True,
+                 group_songs_by_artist=True, scraped_data_max_mb=100,
+                 max_workers=4, insert_batch_size=500, insert_flush_interval=5,
+                 use_db_writer=False, db_writer_queue_size=8, simulate=False,
+                 ignore_errors=False, parser=DEFAULT_PARSER):
         self.skipped_urls = {}
         self.good_urls = set()
         self.checked_urls = set()
+        self.metrics = Counter()
+        # NOTE: the scraped data is not shared between the scrapers
+        self.scraped_data_max_mb = scraped_data_max_mb
+        max_memory = None if scraped_data_max_mb is None \
+            else int(scraped_data_max_mb * 1024 ** 2)
+        self.scraped_data = {
+            'albums': {
+                'headers': ('album_title', 'artist_name', 'year',),
+                'data': ScrapedRecords(2, max_memory=max_memory)
+            },
+            'artists': {
+                'headers': ('artist_name',),
+                'data': ScrapedRecords(1, max_memory=max_memory)
+            },
+            'songs': {
+                'headers': ('song_title', 'artist_name', 'album_title',
+                            'lyrics_url', 'lyrics', 'year',),
+                'data': ScrapedRecords(3, max_memory=max_memory)
+            }
+        }
+        self._metrics_lock = threading.Lock()
         # TODO: AssertionError are raised in both lines
         self.logging_cfg_filepath = get_data_filepath(file_type='log')
-        self.schema_filepath = get_data_filepath(file_type='schema')
+        if db_schema_version not in [1, 2]:
+            raise ValueError("Unknown db schema version: {} (choose from 1, "
+                             "2)".format(db_schema_version))
+        self.schema_filepath = get_data_filepath(
+            file_type='schema_v2' if db_schema_version == 2 else 'schema')
         # ==============
         # Logging config
         # ==============
@@ -236,9 +671,51 @@ class LyricsScraper:
         # Database config
         # ===============
         self.overwrite_db = overwrite_db
+        self.update_tables = update_tables
         self.db_filepath = os.path.expanduser(db_filepath)
-        # TODO: remove db_conn from everywhere
+        self.autocommit = autocommit
+        self.db_schema_version = db_schema_version
+        self.db_profile = db_profile
+        self.db_pragmas = db_pragmas
+        self.use_fts = use_fts
+        self.compress_lyrics = compress_lyrics
+        # The codec of the lyrics, set when connecting to the db
+        self.lyrics_codec = None
+        # The queries of the _insert_* methods, set once the db version is
+        # known
+        self._insert_sqls = None
+        self.local_first = local_first
         self.db_conn = None
+        self._db_closed = False
+        # The db connection is shared by the threads of the batch methods
+        self._db_lock = threading.RLock()
+        # The rows waiting to be inserted: INSERT query -> list of values
+        # NOTE: the queries are flushed in the order they are first seen,
+        # e.g. the artists before their songs
+        self.insert_batch_size = insert_batch_size
+        self.insert_flush_interval = insert_flush_interval
+        self._pending_inserts = OrderedDict()
+        self._nb_pending_inserts = 0
+        self._last_flush = time.monotonic()
+        # The lookup keys of the pending rows (see _add_pending_keys), thus
+        # the lookups in the db only flush them if they need one of them
+        self._pending_keys = set()
+        # The callbacks waiting for the pending rows to be committed
+        self._commit_callbacks = []
+        self.use_db_writer = use_db_writer
+        self.db_writer_queue_size = db_writer_queue_size
+        self.db_writer = None
+        # The last batch queued to the writer, an event set once it is handled
+        # and the first error of the batches that were not waited on
+        # NOTE: the writer thread never takes _db_lock since a producer can
+        # hold it while waiting for room in the writer's queue
+        self._db_writer_future = None
+        self._db_writer_done = None
+        self._db_writer_error = None
+        self._db_writer_lock = threading.Lock()
+        # The lookup keys of the rows queued to the writer and not yet
+        # committed
+        self._in_flight_keys = set()
         if self.db_filepath:
             logger.debug("<color>Setting up the music database ...</color>")
             # Create music db if necessary
@@ -246,10 +723,51 @@ class LyricsScraper:
             create_db(self.db_filepath,
                       self.schema_filepath,
                       self.overwrite_db)
+            # NOTE: the connection is kept open for the whole run (until
+            # close()) and reopened if it was closed
+            # TODO: ValueError is raised
+            self.db_conn = self._connect_db()
+            # NOTE: an existing db keeps its version
+            self.db_schema_version = get_db_schema_version(self.db_conn)
+            logger.debug("<color>Version of the db schema:</color> {}".format(
+                self.db_schema_version))
+            self._insert_sqls = self._get_insert_sqls()
+            create_url_changes(self.db_conn)
+            nb_names = create_name_keys(self.db_conn)
+            if nb_names:
+                logger.info("<color>{} normalized name{} of the songs, albums "
+                            "and artists saved</color>".format(
+                                nb_names, plural(nb_names)))
+            if self.use_db_writer:
+                self.db_writer = DBWriter(
+                    self.db_filepath,
+                    pragmas=self._get_db_pragmas(self.db_profile,
+                                                 self.db_pragmas)
+                    if self.db_profile else None,
+                    max_queue_size=self.db_writer_queue_size,
+                    setup=register_lyrics_text)
+                logger.debug("<color>The rows are inserted by a db writer "
+                             "thread</color>")
+            if self.use_fts and create_lyrics_fts(self.db_conn):
+                # TODO: sqlite3.OperationalError is raised if SQLite is not
+                # compiled with FTS5
+                logger.info("<color>Full-text index of the songs created"
+                            "</color>")
             logger.info("<color>Music database is setup</color>")
         else:
             # No database to fbe used
             logger.debug("<color>No music database used</color>")
+        # =================
+        # URL filter config
+        # =================
+        self.use_url_filter = use_url_filter
+        self.url_filter_error_rate = url_filter_error_rate
+        self.url_filter = None
+        if self.use_url_filter and self.db_conn:
+            logger.debug("<color>Setting up the filter of URLs ...</color>")
+            self.url_filter_filepath = self.db_filepath + ".bloom"
+            self.url_filter = self._load_url_filter()
+            logger.info("<color>Filter of URLs is setup</color>")
         # ================
         # Web cache config
         # ================
@@ -271,12 +789,12 @@ class LyricsScraper:
                 logger.debug("<color>{}</color>".format(e))
                 logger.debug("<color>The webcache directory already exists: "
                              "{}</color>".format(self.webcache_dirpath))
-            self.webcache = WebCache(
+            self.webcache = SerializedWebCache(WebCache(
                 cache_name=self.cache_name,
                 expire_after=self.expire_after,
                 http_get_timeout=self.http_get_timeout,
                 delay_between_requests=self.delay_between_requests,
-                headers=self.headers)
+                headers=self.headers))
             logger.info("<color>web-cache is setup</color>")
         else:
             self.webcache = None
@@ -304,9 +822,18 @@ class LyricsScraper:
         self.interactive = interactive
         self.delay_interactive = delay_interactive
         self.best_match = best_match
+        self.max_search_pages = max_search_pages
+        self.best_match_threshold = best_match_threshold
+        self.direct_urls = direct_urls
+        self.group_songs_by_artist = group_songs_by_artist
+        self.max_workers = max_workers
         self.simulate = simulate
         self.ignore_errors = ignore_errors
         self.min_year = 1000
+        # TODO: UnknownParserError is raised
+        self.parser = get_parser(parser)
+        logger.info("<color>Parser backend used: {}</color>".format(
+            self.parser.name))
 
     def get_song_lyrics(self, song_title, artist_name=None):
         """TODO
@@ -358,6 +885,43 @@ class LyricsScraper:
         # TODO: add message
         raise NotImplementedError("")
 
+    def iter_lyrics_from_album(self, album_title, artist_name=None,
+                               max_songs=None):
+        """Iterate over the lyrics of an album's songs as soon as they are
+        scraped.
+
+        Parameters
+        ----------
+        album_title
+        artist_name
+        max_songs
+
+        Returns
+        -------
+
+        """
+        # TODO: add message
+        raise NotImplementedError("")
+
+    def iter_lyrics_from_artist(self, artist_name, max_songs=None,
+                                year_after=None, year_before=None):
+        """Iterate over the lyrics of an artist's songs as soon as they are
+        scraped.
+
+        Parameters
+        ----------
+        artist_name
+        max_songs
+        year_after
+        year_before
+
+        Returns
+        -------
+
+        """
+        # TODO: add message
+        raise NotImplementedError("")
+
     def search_song_lyrics(self, song_title, artist_name=None):
         """TODO
 
@@ -402,6 +966,79 @@ class LyricsScraper:
         # TODO: add message
         raise NotImplementedError("")
 
+    def get_songs_lyrics(self, songs):
+        """Get the lyrics of many songs at once.
+
+        The songs are normalized and deduplicated, grouped by artist and then
+        resolved concurrently (one artist at a time per thread). The songs of
+        a same artist are first looked up in the artist's webpage (see
+        :ref:`group_songs_by_artist <LyricsScraperParametersLabel>`) and the
+        others are resolved with :meth:`get_song_lyrics`.
+
+        Parameters
+        ----------
+        songs : list
+            The songs given as ``(song_title, artist_name)`` tuples, song
+            titles or dicts with the keys 'title' and 'artist' as in the
+            main config file.
+
+        Returns
+        -------
+        results : list of BatchResult
+            One result for each song, in the same order as `songs`. An error
+            doesn't stop the other songs from being resolved: it is returned
+            in its song's result.
+
+        """
+        return self._get_batch_lyrics("song", songs)
+
+    def get_albums_lyrics(self, albums, **options):
+        """Get the lyrics of many albums at once.
+
+        See :meth:`get_songs_lyrics` for how the albums are resolved.
+
+        Parameters
+        ----------
+        albums : list
+            The albums given as ``(album_title, artist_name)`` tuples, album
+            titles or dicts with the keys 'title' and 'artist' as in the
+            main config file. A dict can also have options of
+            :meth:`get_lyrics_from_album`, e.g. 'max_songs'.
+        **options
+            Default options of :meth:`get_lyrics_from_album` for all the
+            albums, e.g. ``choose_random=True``.
+
+        Returns
+        -------
+        results : list of BatchResult
+            One result for each album, in the same order as `albums`.
+
+        """
+        return self._get_batch_lyrics("album", albums, options)
+
+    def get_artists_lyrics(self, artists, **options):
+        """Get the lyrics of many artists at once.
+
+        See :meth:`get_songs_lyrics` for how the artists are resolved.
+
+        Parameters
+        ----------
+        artists : list
+            The artists given as names or dicts with the key 'name' as in the
+            main config file. A dict can also have options of
+            :meth:`get_lyrics_from_artist`, e.g. 'year_after'.
+        **options
+            Default options of :meth:`get_lyrics_from_artist` for all the
+            artists, e.g. ``include_unknown_year=True``.
+
+        Returns
+        -------
+        results : list of BatchResult
+            One result for each artist, in the same order as `artists`.
+
+        """
+        return self._get_batch_lyrics("artist", artists, options)
+
     def start_scraping(self):
         """Start the web scraping of lyrics websites.
 
@@ -447,8 +1084,7 @@ class LyricsScraper:
             else:
                 skip_url = False
             finally:
-                # Close db connection
-                self.db_conn.close()
+                # NOTE: the db connection is reused for the next URL
                 # Add the URL as skipped or good
                 if skip_url:
                     self._add_skipped_url(url, get_error_msg(error))
@@ -472,7 +1108,9 @@ class LyricsScraper:
         -------
         scraped_data : dict
             The scraped data whose content is described in
-            :data:`~scrapers.lyrics_scraper.LyricsScraper.scraped_data`.
+            :data:`~scrapers.lyrics_scraper.LyricsScraper.scraped_data`. It is
+            a lazy view: the data spilled to the disk is only read when it is
+            accessed.
 
         """
         # If a db was used, inform the user that the scraped data is also to be
@@ -482,6 +1120,693 @@ class LyricsScraper:
                         "'{}'".format(self.db_filepath))
         return self.scraped_data
 
+    def search_lyrics(self, query, limit=10, offset=0):
+        """Search the songs in the database with the full-text index.
+
+        The songs are ranked with the BM25 algorithm of SQLite FTS5: the best
+        matches come first.
+
+        Parameters
+        ----------
+        query : str
+            The FTS5 query, e.g. ``'shady street'`` (both words), ``'"shady
+            street"'`` (the phrase), ``'lyrics: enough OR silence'`` or
+            ``'artist_name: depeche AND life'``.
+        limit : int, optional
+            Maximum number of songs returned (the default value is 10).
+        offset : int, optional
+            Number of best matches skipped, e.g. for getting the next page of
+            results (the default value is 0).
+
+        Returns
+        -------
+        hits : list of LyricsHit
+            The matching songs with an extract of their lyrics where the
+            matched words are between square brackets.
+
+        Raises
+        ------
+        ValueError
+            Raised if no full-text index is used (see :ref:`use_fts
+            <LyricsScraperParametersLabel>`).
+        sqlite3.OperationalError
+            Raised if the query is not valid FTS5 syntax.
+
+        """
+        if not self.db_conn or not has_lyrics_fts(self._get_db_conn()):
+            raise ValueError("No full-text index of the songs, the scraper "
+                             "must be created with a db and use_fts=True")
+        # NOTE: the rows waiting to be inserted are also searched
+        self.flush()
+        if self.db_schema_version == 2:
+            # NOTE: the rowid of the songs view is the song_id
+            url_sql = "SELECT song_url FROM song_url WHERE" \
+                      " song_url.song_id=songs.rowid LIMIT 1"
+        else:
+            # NOTE: the URLs are only linked to the songs through their titles
+            url_sql = "SELECT song_url FROM songs_urls WHERE" \
+                      " songs_urls.song_title=songs.song_title LIMIT 1"
+        sql = "SELECT songs.song_title, songs.artist_name," \
+              " songs.album_title, ({}), songs.year," \
+              " snippet(lyrics_fts, 3, '[', ']', '...', 16)," \
+              " bm25(lyrics_fts) FROM lyrics_fts JOIN songs ON" \
+              " songs.rowid=lyrics_fts.rowid WHERE lyrics_fts MATCH ?" \
+              " ORDER BY rank LIMIT ? OFFSET ?".format(url_sql)
+        rows = self._execute_sql(sql, (query, limit, offset))
+        return [LyricsHit(*row) for row in rows]
+
+    def flush(self, wait=True):
+        """Insert all the pending rows in the database.
+
+        The rows saved by the scraper are first queued and then inserted with
+        one ``executemany`` per INSERT query, all inside a single transaction,
+        i.e. with one commit (see :ref:`insert_batch_size
+        <LyricsScraperParametersLabel>`). If :ref:`use_db_writer
+        <LyricsScraperParametersLabel>` is enabled, the transaction is done by
+        the db writer thread.
+
+        The pending rows are flushed when there are `insert_batch_size` of
+        them, when they are pending for more than `insert_flush_interval`
+        seconds, at the end of each artist webpage and batch job (even if it
+        failed), before looking up lyrics in the database that are among the
+        pending rows and when exiting the scraper's context manager.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for the rows to be committed by the db writer
+            thread (the default value is True). Without a writer thread, the
+            rows are always committed before returning.
+
+        Returns
+        -------
+        nb_rows : int
+            Number of rows that were flushed (including the ones ignored
+            because they were already in the database).
+
+        Raises
+        ------
+        sqlite3.Error
+            Raised if the transaction failed. It is rolled back and its rows
+            are dropped from the database (they are still in
+            :data:`scraped_data`). With a writer thread, the error of a batch
+            that was not waited on is raised by the next flush that waits.
+
+        """
+        with self._db_lock:
+            pending_inserts = self._pending_inserts
+            nb_rows = self._nb_pending_inserts
+            callbacks = self._commit_callbacks
+            pending_keys = self._pending_keys
+            self._pending_inserts = OrderedDict()
+            self._nb_pending_inserts = 0
+            self._commit_callbacks = []
+            self._pending_keys = set()
+            self._last_flush = time.monotonic()
+            if nb_rows:
+                logger.debug("Flushing {} row{} in the music db".format(
+                    nb_rows, plural(nb_rows)))
+            if self.db_writer is None:
+                error = None
+                nb_changes = 0
+                try:
+                    if nb_rows:
+                        nb_changes = write_inserts(self._get_db_conn(),
+                                                   pending_inserts)
+                except (pyutils.exceptions.SQLSanityCheckError,
+                        sqlite3.Error) as e:
+                    logger.error("<color>Couldn't flush {} row{} in the music "
+                                 "db:</color> {}".format(nb_rows,
+                                                         plural(nb_rows), e))
+                    error = e
+                    raise
+                finally:
+                    self._on_inserts_written(nb_rows, callbacks, error,
+                                             nb_changes)
+                return nb_rows
+            if nb_rows:
+                done = threading.Event()
+                with self._db_writer_lock:
+                    self._in_flight_keys |= pending_keys
+                future = self.db_writer.submit(pending_inserts)
+                # NOTE: the last batch is known before it is handled
+                self._db_writer_future = future
+                self._db_writer_done = done
+                future.add_done_callback(functools.partial(
+                    self._on_db_writer_done, nb_rows, callbacks, done))
+                with self._metrics_lock:
+                    self.metrics['db_writer_max_queue_depth'] = \
+                        self.db_writer.max_queue_depth
+            done = self._db_writer_done
+        if wait and done is not None:
+            # NOTE: the batches are inserted in order, thus the previous ones
+            # are also committed
+            done.wait()
+            with self._db_writer_lock:
+                error, self._db_writer_error = self._db_writer_error, None
+            if error is not None:
+                raise error
+        return nb_rows
+
+    def add_commit_callback(self, callback):
+        """Add a function called once the rows saved so far are committed.
+
+        It lets the producers of rows know when their rows are durable, e.g.
+        for acknowledging a job only once its lyrics are in the database.
+
+        Parameters
+        ----------
+        callback : function
+            Called with the exception that made the transaction fail or
+            :obj:`None` if the rows were committed. With a db writer thread,
+            it is called by the writer thread and thus it must not wait on
+            the scraper.
+
+        """
+        with self._db_lock:
+            if self._nb_pending_inserts:
+                self._commit_callbacks.append(callback)
+            elif self._db_writer_future is not None:
+                # Called once the last batch queued to the writer is handled
+                # (right away if it is already)
+                self._db_writer_future.add_done_callback(
+                    lambda future: self._on_inserts_written(
+                        0, [callback], future.exception()))
+            else:
+                # The rows already flushed are committed
+                self._on_inserts_written(0, [callback])
+
+    @property
+    def db_queue_depth(self):
+        """Number of batches of rows waiting to be inserted by the db writer
+        thread."""
+        return self.db_writer.queue_depth if self.db_writer else 0
+
+    def close(self):
+        """Insert the pending rows and close the connections to the
+        databases.
+
+        It is done when exiting the scraper's context manager. The filter of
+        URLs is also saved and the db writer thread is stopped. If the scraper
+        is used again afterward, it reconnects to the music database.
+
+        """
+        try:
+            if self.db_conn and not self._db_closed:
+                try:
+                    self.flush()
+                    self.save_url_filter()
+                finally:
+                    if self.db_writer:
+                        self.db_writer.close()
+                    self.db_conn.close()
+                    self._db_closed = True
+        finally:
+            if self.compute_cache:
+                self.compute_cache.db_conn.close()
+
+    def save_url_filter(self):
+        """Save the filter of the URLs in the database next to it.
+
+        The pending rows are first flushed so that the saved filter matches
+        the database. It is done when exiting the scraper's context manager.
+
+        """
+        if self.url_filter is None:
+            return
+        with self._db_lock:
+            self.flush()
+            self.url_filter.tag = self._get_url_filter_tag()
+            self.url_filter.save(self.url_filter_filepath)
+
+    def _get_batch_lyrics(self, which, items, options=None):
+        """Resolve a batch of songs, albums or artists.
+
+        Parameters
+        ----------
+        which : str
+            The type of the items: 'album', 'artist' or 'song'.
+        items : list
+            The items to resolve, see :meth:`get_songs_lyrics`.
+        options : dict, optional
+            Default options for the single-item method.
+
+        Returns
+        -------
+        results : list of BatchResult
+            One result for each item, in the same order as `items`.
+
+        """
+        assert which in ['album', 'artist', 'song']
+        # Normalize the items and group the unique ones by artist
+        keys = []
+        unique_keys = set()
+        groups = {}
+        for i, item in enumerate(items):
+            try:
+                title, artist_name, item_options = self._parse_batch_item(
+                    which, item, options)
+                key = (normalize(title or ""), normalize(artist_name or ""),
+                       tuple(sorted(item_options.items())))
+                # NOTE: an unhashable option value (e.g. a list) raises a
+                # TypeError which is only an error of this item
+                if key in unique_keys:
+                    keys.append(key)
+                    continue
+                unique_keys.add(key)
+            except (KeyError, TypeError, ValueError) as e:
+                keys.append(e)
+                continue
+            keys.append(key)
+            # NOTE: the items without artist are not grouped together so that
+            # they are resolved concurrently, but they are still deduplicated
+            group_key = key[1] or ("", i)
+            groups.setdefault(group_key, {})[key] = (title, artist_name,
+                                                     item_options)
+        nb_unique = len(unique_keys)
+        logger.info("<color>Resolving {} unique {}{} (out of {}) from {} "
+                    "group{}</color>".format(nb_unique, which,
+                                             plural(nb_unique), len(keys),
+                                             len(groups), plural(len(groups))))
+        resolved = {}
+        try:
+            if self.interactive or self.max_workers <= 1:
+                # NOTE: the interactive mode relies on signals which only work
+                # in the main thread
+                for group in groups.values():
+                    resolved.update(self._resolve_batch_group(which, group))
+            else:
+                with ThreadPoolExecutor(
+                        max_workers=self.max_workers) as executor:
+                    for group_resolved in executor.map(
+                            lambda group: self._resolve_batch_group(which,
+                                                                    group),
+                            groups.values()):
+                        resolved.update(group_resolved)
+        finally:
+            if self.db_conn:
+                self.flush()
+        results = []
+        for item, key in zip(items, keys):
+            if isinstance(key, Exception):
+                results.append(BatchResult(item, None, key))
+            else:
+                results.append(BatchResult(item, *resolved[key]))
+        nb_errors = sum(1 for result in results if result.error)
+        if nb_errors:
+            logger.warning("<color>{} {}{} couldn't be resolved</color>".format(
+                nb_errors, which, plural(nb_errors)))
+        return results
+
+    @staticmethod
+    def _parse_batch_item(which, item, options=None):
+        """Get the title, the artist's name and the options of a batch item.
+
+        Parameters
+        ----------
+        which : str
+            The type of the item: 'album', 'artist' or 'song'.
+        item : str, tuple or dict
+            The item as given to a batch method.
+        options : dict, optional
+            Default options which are overridden by the item's options.
+
+        Returns
+        -------
+        batch_item : tuple
+            ``(title, artist_name, options)`` where `title` is :obj:`None` for
+            an artist.
+
+        Raises
+        ------
+        KeyError
+            Raised if a dict item is missing its title or name.
+        TypeError
+            Raised if the item is not a str, tuple or dict.
+
+        """
+        item_options = dict(options or {})
+        if isinstance(item, str):
+            title, artist_name = item, None
+        elif isinstance(item, (list, tuple)):
+            title, artist_name = (list(item) + [None])[:2]
+        elif isinstance(item, dict):
+            item = dict(item)
+            if which == "artist":
+                title, artist_name = item.pop('name'), None
+            else:
+                title = item.pop('title')
+                artist_name = item.pop('artist', None)
+            item_options.update(item)
+        else:
+            raise TypeError("Invalid {} item: {}".format(which, item))
+        if which == "artist":
+            # The artist's name is the only "title" of an artist item
+            title, artist_name = None, title
+        return title, artist_name, item_options
+
+    def _resolve_batch_group(self, which, group):
+        """Resolve the unique items of a group sequentially.
+
+        Parameters
+        ----------
+        which : str
+            The type of the items: 'album', 'artist' or 'song'.
+        group : dict
+            The unique items of the group, i.e. normalized key ->
+            ``(title, artist_name, options)``.
+
+        Returns
+        -------
+        resolved : dict
+            Normalized key -> ``(lyrics, error)``.
+
+        """
+        try:
+            return self._resolve_batch_group_items(which, group)
+        finally:
+            # The rows saved by the job are inserted even if it failed
+            if self.db_conn:
+                self.flush()
+
+    def _resolve_batch_group_items(self, which, group):
+        """Resolve the unique items of a group, see
+        :meth:`_resolve_batch_group`."""
+        resolved = {}
+        if which == "song" and self.group_songs_by_artist and len(group) > 1:
+            # NOTE: only the groups of songs with an artist have more than one
+            # song
+            resolved.update(self._resolve_songs_from_artist(group))
+        for key, (title, artist_name, item_options) in group.items():
+            if key in resolved:
+                continue
+            try:
+                if which == "song":
+                    lyrics = self.get_song_lyrics(title, artist_name,
+                                                  **item_options)
+                elif which == "album":
+                    lyrics = self.get_lyrics_from_album(title, artist_name,
+                                                        **item_options)
+                else:
+                    lyrics = self.get_lyrics_from_artist(artist_name,
+                                                         **item_options)
+            except Exception as e:
+                # NOTE: one failed item must not stop the others
+                logger.error("<color>Couldn't resolve the {} {}:</color> "
+                             "{}".format(which, (title, artist_name), e))
+                resolved[key] = (None, e)
+            else:
+                resolved[key] = (lyrics, None)
+        return resolved
+
+    def _resolve_songs_from_artist(self, group):
+        """Resolve the songs of a same artist with the artist's webpage.
+
+        Parameters
+        ----------
+        group : dict
+            The unique songs of the artist, i.e. normalized key ->
+            ``(song_title, artist_name, options)``.
+
+        Returns
+        -------
+        resolved : dict
+            Normalized key -> ``(lyrics, None)`` for each song that was found.
+            The other songs must be resolved one by one.
+
+        """
+        keys = list(group)
+        song_titles = [group[key][0] for key in keys]
+        artist_name = group[keys[0]][1]
+        try:
+            all_lyrics = self._get_songs_lyrics_from_artist(song_titles,
+                                                            artist_name)
+        except Exception as e:
+            # NOTE: the songs will be resolved one by one instead
+            logger.warning("<color>Couldn't get the songs from the artist "
+                           "'{}':</color> {}".format(artist_name, e))
+            return {}
+        return {key: (lyrics, None)
+                for key, lyrics in zip(keys, all_lyrics) if lyrics}
+
+    def _get_songs_lyrics_from_artist(self, song_titles, artist_name):
+        """Get the lyrics of many songs from their artist's webpage.
+
+        By default, no song is found, i.e. the songs are resolved one by one
+        with :meth:`get_song_lyrics`. A derived class can override this
+        method for getting the songs with fewer requests.
+
+        Parameters
+        ----------
+        song_titles : list of str
+            The song titles.
+        artist_name : str
+            The name of the songs' artist.
+
+        Returns
+        -------
+        all_lyrics : list
+            The lyrics of each song or :obj:`None` if it was not found.
+
+        """
+        return [None] * len(song_titles)
+
+    @staticmethod
+    def _get_db_pragmas(db_profile, db_pragmas=None):
+        """Return the SQLite pragmas of a profile.
+
+        Parameters
+        ----------
+        db_profile : str
+            Name of the profile, e.g. 'fast'.
+        db_pragmas : dict, optional
+            Profiles overriding the pragmas of the built-in profiles, see
+            :ref:`db_pragmas <LyricsScraperParametersLabel>`.
+
+        Returns
+        -------
+        pragmas : dict
+            The pragmas of the profile.
+
+        Raises
+        ------
+        ValueError
+            Raised if the profile is unknown.
+
+        """
+        custom_pragmas = (db_pragmas or {}).get(db_profile)
+        if db_profile not in DB_PRAGMAS and custom_pragmas is None:
+            raise ValueError("Unknown db profile '{}' (choose from {})".format(
+                db_profile, ", ".join(sorted(set(DB_PRAGMAS) |
+                                             set(db_pragmas or {})))))
+        pragmas = dict(DB_PRAGMAS.get(db_profile, {}))
+        pragmas.update(custom_pragmas or {})
+        return pragmas
+
+    def _connect_db(self):
+        """Connect to the music database.
+
+        The SQL functions ``normalize()`` and ``lyrics_text()`` (see
+        :func:`~lyrics_scraping.compression.register_lyrics_text`) are added
+        to the connection and the pragmas of the :ref:`db_profile
+        <LyricsScraperParametersLabel>` are applied.
+
+        Returns
+        -------
+        db_conn : sqlite3.Connection
+            The connection to the music database.
+
+        Raises
+        ------
+        ValueError
+            Raised if the db profile or one of its pragmas is unknown.
+
+        """
+        # NOTE: the connection can be used by the threads of the batch methods
+        # since they serialize their access with _db_lock
+        db_conn = sqlite3.connect(
+            self.db_filepath, check_same_thread=False,
+            isolation_level=None if self.autocommit else "")
+        # For matching the normalized titles and names within SQL queries
+        db_conn.create_function("normalize", 1, normalize)
+        # For reading the compressed lyrics
+        self.lyrics_codec = register_lyrics_text(db_conn)
+        if self.db_profile:
+            pragmas = self._get_db_pragmas(self.db_profile, self.db_pragmas)
+            applied_pragmas = apply_db_pragmas(db_conn, pragmas)
+            logger.debug("<color>Pragmas of the db profile '{}':</color> "
+                         "{}".format(self.db_profile, applied_pragmas))
+        self._db_closed = False
+        return db_conn
+
+    def _get_db_conn(self):
+        """Return the connection to the music database, reconnecting if it
+        was closed (e.g. by :meth:`close`).
+
+        Returns
+        -------
+        db_conn : sqlite3.Connection
+            The open connection to the music database.
+
+        """
+        with self._db_lock:
+            try:
+                # NOTE: raised by any use of a closed connection
+                self.db_conn.total_changes
+            except sqlite3.ProgrammingError:
+                logger.warning("<color>Reconnecting to the music db:</color> "
+                               "{}".format(self.db_filepath))
+                self.db_conn = self._connect_db()
+                self._count_metric('db_reconnects')
+            return self.db_conn
+
+    def _get_insert_sqls(self):
+        """Return the queries of the `_insert_*` methods for the version of
+        the db schema.
+
+        The rows already in the database are updated only if
+        :ref:`update_tables <LyricsScraperParametersLabel>` (or
+        `overwrite_db`) is enabled.
+
+        Returns
+        -------
+        insert_sqls : dict [str, str]
+            The INSERT query of each kind of row: 'album', 'album_url',
+            'artist', 'artist_url', 'song', 'song_url' and for a version 2
+            database, 'song_album' (the album of a song).
+
+        """
+        update = self.update_tables or self.overwrite_db
+        insert_sqls = {}
+        for name, (sql, update_sql) in \
+                _INSERT_SQLS[self.db_schema_version].items():
+            action = "DO UPDATE SET " + update_sql if update and update_sql \
+                else "DO NOTHING"
+            insert_sqls[name] = sql.format(action)
+        return insert_sqls
+
+    def _get_url_filter_tag(self):
+        """Return the tag identifying the URLs in the database, i.e. the
+        counter of the changes of the song URLs (see
+        :func:`~lyrics_scraping.utils.create_url_changes`), which changes
+        whenever a URL is inserted, deleted or updated."""
+        res = self._execute_sql("SELECT nb_changes FROM url_changes", ())
+        return res[0][0]
+
+    def _load_url_filter(self):
+        """Load the filter of the URLs in the database.
+
+        The saved filter is used if it is up to date with the database, i.e.
+        no URL was inserted, deleted or updated since it was saved. Otherwise,
+        the filter is rebuilt from all the URLs in the database and saved.
+
+        Returns
+        -------
+        url_filter : lyrics_scraping.bloom.BloomFilter
+            The filter of the URLs in the database.
+
+        """
+        tag = self._get_url_filter_tag()
+        if os.path.exists(self.url_filter_filepath):
+            try:
+                url_filter = BloomFilter.load(self.url_filter_filepath)
+            except (OSError, ValueError) as e:
+                logger.warning("<color>The filter of URLs couldn't be loaded:"
+                               "</color> {}".format(e))
+            else:
+                if url_filter.tag == tag and \
+                        url_filter.error_rate == self.url_filter_error_rate \
+                        and len(url_filter) <= url_filter.capacity:
+                    logger.debug("Filter of {} URL{} loaded: {}".format(
+                        len(url_filter), plural(len(url_filter)),
+                        self.url_filter_filepath))
+                    return url_filter
+                logger.info("<color>The filter of URLs is out of date</color>")
+        nb_urls = self._execute_sql("SELECT COUNT(*) FROM songs_urls",
+                                    ())[0][0]
+        logger.info("<color>Building the filter of {} URL{} ..."
+                    "</color>".format(nb_urls, plural(nb_urls)))
+        # NOTE: room is made for as many new URLs as there are in the db
+        url_filter = BloomFilter(max(2 * nb_urls, _MIN_URL_FILTER_CAPACITY),
+                                 self.url_filter_error_rate)
+        with self._db_lock:
+            cur = self._get_db_conn().execute(
+                "SELECT song_url FROM songs_urls")
+            url_filter.update(row[0] for row in cur)
+        url_filter.tag = tag
+        url_filter.save(self.url_filter_filepath)
+        return url_filter
+
+    def _url_maybe_in_db(self, url):
+        """Check with the filter of URLs if a URL may be in the database.
+
+        Parameters
+        ----------
+        url : str
+            The URL to check.
+
+        Returns
+        -------
+        maybe_in_db : bool
+            False if the URL is definitely not in the database, True if it
+            may be (or if no filter is used).
+
+        """
+        if self.url_filter is None or url in self.url_filter:
+            return True
+        self._count_metric('url_filter_skips')
+        return False
+
+    def _on_db_writer_done(self, nb_rows, callbacks, done, future):
+        """Handle a batch of rows committed (or failed) by the db writer."""
+        try:
+            error = future.exception()
+            with self._db_writer_lock:
+                if error is not None and self._db_writer_error is None:
+                    self._db_writer_error = error
+                # NOTE: the batches are handled in order, thus all the queued
+                # rows are handled with the last batch
+                if future is self._db_writer_future:
+                    self._in_flight_keys = set()
+            nb_changes = future.result() if error is None else 0
+            self._on_inserts_written(nb_rows, callbacks, error, nb_changes)
+        finally:
+            done.set()
+
+    def _on_inserts_written(self, nb_rows, callbacks, error=None,
+                            nb_changes=0):
+        """Count a flush of rows in the metrics and call the callbacks that
+        were waiting for it.
+
+        `nb_changes` is the number of rows actually inserted or updated, the
+        other rows were already in the database."""
+        if error is None and nb_rows:
+            self._count_metric('db_flushes')
+            self._count_metric('db_flushed_rows', nb_rows)
+            self._count_metric('db_changed_rows', nb_changes)
+        for callback in callbacks:
+            try:
+                callback(error)
+            except Exception as e:
+                # NOTE: a failing callback must not stop the other ones
+                logger.exception("<color>Commit callback failed:</color> "
+                                 "{}".format(e))
+
+    def _count_metric(self, name, count=1):
+        """Increment a metric of the current session.
+
+        Parameters
+        ----------
+        name : str
+            Name of the metric, e.g. 'direct_url_hits'.
+        count : int, optional
+            Increment of the metric (the default value is 1).
+
+        """
+        # NOTE: the metrics can be updated by the threads of the batch methods
+        with self._metrics_lock:
+            self.metrics[name] += count
+
     def _add_skipped_url(self, url, error):
         """Add an URL as skipped.
 
@@ -530,7 +1855,8 @@ class LyricsScraper:
         if url in self.checked_urls:
             logger.warning("The URL was already processed during this "
                            "session: {}".format(url))
-        elif self.db_filepath and self._url_in_db(url) == 2:
+        elif self.db_filepath and self._url_maybe_in_db(url) and \
+                self._url_in_db(url) == 2:
             # The URL was found in the db
             retcode = 2
         else:
@@ -540,6 +1866,43 @@ class LyricsScraper:
             self.checked_urls.add(url)
         return retcode
 
+    def _get_urls_to_process(self, urls):
+        """Check in bulk which URLs were not already processed.
+
+        It is the bulk counterpart of :meth:`_url_already_processed`: the
+        URLs processed during the current session are filtered out and the
+        remaining ones are all checked against the database at once (see
+        :meth:`_select_songs_urls`) instead of one query per URL.
+
+        Parameters
+        ----------
+        urls : iterable of str
+            The URLs to check, e.g. all the lyrics URLs of an artist webpage.
+
+        Returns
+        -------
+        urls_to_process : list of str
+            The unique URLs that are still to be processed, in the given
+            order. They are marked as processed for the current session.
+
+        """
+        urls_to_process = []
+        seen_urls = set()
+        for url in urls:
+            if url not in self.checked_urls and url not in seen_urls:
+                seen_urls.add(url)
+                urls_to_process.append(url)
+        if self.db_conn and not self.overwrite_db:
+            # NOTE: the URLs definitely not in the db are not looked up
+            urls_in_db = self._select_songs_urls(
+                [url for url in urls_to_process if self._url_maybe_in_db(url)])
+            urls_to_process = [url for url in urls_to_process
+                               if url not in urls_in_db]
+        logger.debug("{} URL{} still to be processed".format(
+            len(urls_to_process), plural(len(urls_to_process))))
+        self.checked_urls.update(urls_to_process)
+        return urls_to_process
+
     def _url_in_db(self, url):
         """Check if an URL is already present in the database.
 
@@ -736,6 +2099,165 @@ class LyricsScraper:
                                   " implemented by the derived classes of"
                                   " LyricsScraper.")
 
+    def _get_lyrics_from_db(self, which, which_title=None, artist_name=None,
+                            max_songs=None, year_after=None, year_before=None,
+                            include_unknown_year=False, choose_random=False):
+        """Resolve a search query against the music database.
+
+        The songs are first looked up with an exact match on the title and
+        the artist's name. If there is no exact match, the normalized title
+        and artist's name are matched instead, i.e. the case, the accents and
+        the punctuation are ignored (see
+        :func:`~lyrics_scraping.matching.normalize`).
+
+        Parameters
+        ----------
+        which : str
+            The type of search query: 'album', 'artist' or 'song'.
+        which_title : str, optional
+            The title of the album or song.
+        artist_name : str, optional
+            The name of the artist.
+        max_songs : int, optional
+            Maximum number of songs to return (the default value is
+            :obj:`None` which implies that all the found songs are returned).
+        year_after : int, optional
+            Only the songs published after or in this year are returned.
+        year_before : int, optional
+            Only the songs published before or in this year are returned.
+        include_unknown_year : bool, optional
+            Whether the songs without year are also returned when filtering by
+            year (the default value is False).
+        choose_random : bool, optional
+            Whether the `max_songs` songs are randomly chosen instead of being
+            the first ones (the default value is False).
+
+        Returns
+        -------
+        lyrics : Lyrics, list of Lyrics or None
+            The song's lyrics if `which` is 'song', the list of the album's or
+            artist's lyrics otherwise. :obj:`None` if the query can't be
+            resolved locally, i.e. it needs to be sent to the lyrics website.
+
+        Notes
+        -----
+        An album or an artist found in the music db only has the songs that
+        were previously scraped. Check first with :meth:`_is_scraped_in_db`
+        that all its songs were scraped.
+
+        """
+        assert which in ['album', 'artist', 'song']
+        if not self.db_conn:
+            return None
+        for normalized in [False, True]:
+            rows = self._select_lyrics(which, which_title, artist_name,
+                                       normalized)
+            if rows:
+                break
+        else:
+            logger.debug("<color>The {} was not found in the music db</color>"
+                         "".format(which))
+            return None
+        logger.info("<color>The {} was found in the music db: {} song{}"
+                    "</color>".format(which, len(rows), plural(rows)))
+        all_lyrics = [Lyrics(*row) for row in rows]
+        if which == "song":
+            return all_lyrics[0]
+        if year_after is not None or year_before is not None:
+            year_after = self.min_year if year_after is None else year_after
+            year_before = 9999 if year_before is None else year_before
+            all_lyrics = [
+                lyrics for lyrics in all_lyrics
+                if (lyrics.year and year_after <= int(lyrics.year) <= year_before)
+                or (not lyrics.year and include_unknown_year)]
+        if max_songs is not None and max_songs < len(all_lyrics):
+            if choose_random:
+                # Keep the order of the songs
+                indices = sorted(random.sample(range(len(all_lyrics)),
+                                               max_songs))
+                all_lyrics = [all_lyrics[i] for i in indices]
+            else:
+                all_lyrics = all_lyrics[:max_songs]
+        return all_lyrics
+
+    def _is_scraped_in_db(self, which, which_title=None, artist_name=None):
+        """Check if the webpage of an album or an artist was fully scraped.
+
+        The URL of an album or an artist is saved in the database once all
+        the songs of its webpage are saved (see :meth:`_insert_album_url` and
+        :meth:`_insert_artist_url`). The album or the artist is matched like
+        in :meth:`_get_lyrics_from_db`.
+
+        Parameters
+        ----------
+        which : str
+            The type of search query: 'album' or 'artist'.
+        which_title : str, optional
+            The title of the album.
+        artist_name : str, optional
+            The name of the artist.
+
+        Returns
+        -------
+        scraped : bool
+            True if the webpage of the album or the artist was fully scraped.
+
+        Notes
+        -----
+        With a version 1 database, the URL of an album is only linked to its
+        title. Thus, an album is found if another artist's album with the
+        same title was fully scraped and the artist's name is not given.
+
+        """
+        assert which in ['album', 'artist']
+        if not self.db_conn:
+            return False
+        conditions = []
+        values = []
+        if which == "album":
+            conditions.append("album_title")
+            values.append(which_title)
+        if artist_name:
+            conditions.append("artist_name")
+            values.append(artist_name)
+        if not values or not all(values):
+            return False
+        # The URLs saved but not yet inserted must be found too
+        self._flush_pending_keys(
+            [(which + "_url",) + tuple(normalize(v) for v in values)])
+        sql = _SCRAPED_SQLS[self.db_schema_version][which]
+        for normalized in [False, True]:
+            where_values = self._get_names_where(conditions, values,
+                                                 normalized)
+            if where_values and self._execute_sql(
+                    sql.format(where_values[0]), where_values[1]):
+                return True
+        logger.debug("<color>The {}'s webpage was not fully scraped before"
+                     "</color>".format(which))
+        return False
+
+    def _save_lyrics(self, lyrics):
+        """Save the scraped data about a song along with its artist and album.
+
+        Parameters
+        ----------
+        lyrics : Lyrics
+            The song scraped from its lyrics webpage.
+
+        """
+        with self._db_lock:
+            self._save_artist(lyrics.artist_name)
+            if lyrics.album_title:
+                self._save_album(album_title=lyrics.album_title,
+                                 artist_name=lyrics.artist_name,
+                                 year=lyrics.year)
+            self._save_song(song_title=lyrics.song_title,
+                            artist_name=lyrics.artist_name,
+                            album_title=lyrics.album_title,
+                            lyrics_url=lyrics.lyrics_url,
+                            lyrics=lyrics.lyrics_text,
+                            year=lyrics.year)
+
     def _save_album(self, album_title, artist_name, year):
         """Save the scraped data about an album.
 
@@ -847,26 +2369,26 @@ class LyricsScraper:
 
         Update the list of scraped by adding the tuple of data.
 
-        The tuple of data must be **unique** in order to be added to the list
-        of scraped data.
+        The tuple of data must be **unique** on its natural key in order to be
+        added to the list of scraped data.
 
         Parameters
         ----------
         data_tuple : tuple
             The tuple of data to be added to the list of scraped data.
-        scraped_data : list
+        scraped_data : ScrapedRecords
             The list of scraped data where the tuple of data will be added.
 
         """
-        # Check if tuple of data is unique
-        if data_tuple in scraped_data:
-            # Tuple of data is not unique
-            logger.debug("Scraped data already previously saved: "
+        # NOTE: the uniqueness is checked on the natural key of the tuple in
+        # constant time
+        if scraped_data.add(data_tuple):
+            # Tuple of data is unique. Thus, it is saved.
+            logger.debug("Scraped data successfully saved: "
                          "{}".format(data_tuple))
         else:
-            # Tuple of data is unique. Thus, save it.
-            scraped_data.append(data_tuple)
-            logger.debug("Scraped data successfully saved: "
+            # Tuple of data is not unique
+            logger.debug("Scraped data already previously saved: "
                          "{}".format(data_tuple))
 
     def _execute_sql(self, sql, values):
@@ -942,32 +2464,33 @@ class LyricsScraper:
            schema`_.
 
         """
-        cur = self.db_conn.cursor()
-        try:
-            sql_sanity_checks(sql, values)
-            cur.execute(sql, values)
-        except sqlite3.IntegrityError as e:
-            # Duplicate data can't be inserted
-            logger.debug(e)
-            return None
-        except pyutils.exceptions.SQLSanityCheckError as e:
-            # One of the SQL sanity checks failed
-            logger.error(e)
-            raise
-        else:
-            # Successful SQL expression execution
-            if sql.lower().startswith("select"):
-                # SELECT query
-                return cur.fetchall()
+        with self._db_lock:
+            cur = self._get_db_conn().cursor()
+            try:
+                sql_sanity_checks(sql, values)
+                cur.execute(sql, values)
+            except sqlite3.IntegrityError as e:
+                # Duplicate data can't be inserted
+                logger.debug(e)
+                return None
+            except pyutils.exceptions.SQLSanityCheckError as e:
+                # One of the SQL sanity checks failed
+                logger.error(e)
+                raise
             else:
-                # INSERT query
-                if not self.autocommit:
-                    # Since autocommit is disabled, we must manually commit
-                    # all pending changes to the database
-                    self.db_conn.commit()
-                logger.debug("Query execution successful! "
-                             "lastrowid={}".format(cur.lastrowid))
-                return cur.lastrowid
+                # Successful SQL expression execution
+                if sql.lower().startswith("select"):
+                    # SELECT query
+                    return cur.fetchall()
+                else:
+                    # INSERT query
+                    if not self.autocommit:
+                        # Since autocommit is disabled, we must manually commit
+                        # all pending changes to the database
+                        self.db_conn.commit()
+                    logger.debug("Query execution successful! "
+                                 "lastrowid={}".format(cur.lastrowid))
+                    return cur.lastrowid
 
     def _insert_album(self, album):
         """Insert data about an album in the database.
@@ -985,9 +2508,7 @@ class LyricsScraper:
             the year the album was published.
 
         """
-        sql = "INSERT INTO albums (album_title, artist_name, year)" \
-              " VALUES (?, ?, ?)"
-        self._execute_sql(sql, album)
+        self._queue_insert(self._insert_sqls['album'], album)
 
     def _insert_artist(self, artist_name):
         """Insert an artist's name in the database.
@@ -1003,8 +2524,51 @@ class LyricsScraper:
             database.
 
         """
-        sql = "INSERT INTO artists (artist_name) VALUES (?)"
-        self._execute_sql(sql, artist_name)
+        self._queue_insert(self._insert_sqls['artist'], artist_name)
+
+    def _insert_album_url(self, album_url, album_title, artist_name):
+        """Insert the URL of an album whose songs were all saved.
+
+        The URL is only inserted if the album is in the database.
+
+        See the `albums_urls` table as defined in the `music.sql schema`_.
+
+        Parameters
+        ----------
+        album_url : str
+            The URL of the album, e.g. the artist's URL with the album's id
+            as fragment.
+        album_title : str
+            The title of the album.
+        artist_name : str
+            The name of the artist.
+
+        """
+        self._queue_insert(self._insert_sqls['album_url'],
+                           (album_url, album_title, artist_name))
+        album_title, artist_name = normalize(album_title), \
+            normalize(artist_name)
+        self._add_pending_keys([("album_url", album_title),
+                                ("album_url", album_title, artist_name)])
+
+    def _insert_artist_url(self, artist_url, artist_name):
+        """Insert the URL of an artist whose songs were all saved.
+
+        The URL is only inserted if the artist is in the database.
+
+        See the `artists_urls` table as defined in the `music.sql schema`_.
+
+        Parameters
+        ----------
+        artist_url : str
+            The URL of the artist's webpage.
+        artist_name : str
+            The name of the artist.
+
+        """
+        self._queue_insert(self._insert_sqls['artist_url'],
+                           (artist_url, artist_name))
+        self._add_pending_keys([("artist_url", normalize(artist_name))])
 
     def _insert_song(self, song):
         """Insert data about a song in the database.
@@ -1022,9 +2586,222 @@ class LyricsScraper:
             the lyrics text.
 
         """
-        sql = "INSERT INTO songs (song_title, artist_name, album_title," \
-              " lyrics_url, lyrics, year) VALUES (?, ?, ?, ?, ?, ?)"
-        self._execute_sql(sql, song)
+        song_title, artist_name, album_title, lyrics_url, lyrics, year = song
+        if not artist_name:
+            logger.warning("<color>The song '{}' has no artist, it won't be "
+                           "saved in the music db</color>".format(song_title))
+            return
+        # NOTE: the songs without album are saved with an empty album title
+        # like the songs from the section 'other songs' of an artist webpage
+        album_title = album_title or ""
+        if self.compress_lyrics:
+            lyrics = self.lyrics_codec.compress(lyrics)
+        values = (song_title, artist_name, album_title, lyrics, year)
+        if 'song_album' in self._insert_sqls:
+            self._queue_insert(self._insert_sqls['song_album'], values)
+        self._queue_insert(self._insert_sqls['song'], values)
+        keys = [normalize(song_title), normalize(artist_name),
+                normalize(album_title)]
+        # NOTE: the normalized names are saved for matching the songs whatever
+        # their case, accents and punctuation
+        self._queue_insert(self._insert_sqls['song_names'],
+                           (keys[0], song_title, keys[1], artist_name,
+                            keys[2], album_title))
+        self._add_pending_keys([("song", keys[0]), ("song",) + tuple(keys[:2]),
+                                ("album", keys[2]),
+                                ("album", keys[2], keys[1]),
+                                ("artist", keys[1])])
+        if not lyrics_url:
+            return
+        # NOTE: the song's URL is saved in its own table, linked to the song
+        # found from its title, artist and album
+        self._queue_insert(self._insert_sqls['song_url'],
+                           (lyrics_url, song_title, artist_name, album_title))
+        self._add_pending_keys([("url", lyrics_url)])
+        if self.url_filter is not None:
+            self.url_filter.add(lyrics_url)
+
+    def _queue_insert(self, sql, values):
+        """Queue a row to be inserted in the database.
+
+        The pending rows are inserted at once by :meth:`flush`, either right
+        away if there are :ref:`insert_batch_size
+        <LyricsScraperParametersLabel>` of them or if the oldest one is
+        pending for more than `insert_flush_interval` seconds, or later.
+
+        Parameters
+        ----------
+        sql : str
+            The INSERT query. It should handle the rows already in the
+            database (e.g. with ``ON CONFLICT DO NOTHING``) since all the rows
+            of a flush are inserted in one transaction.
+        values : tuple of str
+            The values of the row.
+
+        """
+        with self._db_lock:
+            if not self._nb_pending_inserts:
+                self._last_flush = time.monotonic()
+            self._pending_inserts.setdefault(sql, []).append(values)
+            self._nb_pending_inserts += 1
+            if self._nb_pending_inserts >= self.insert_batch_size or \
+                    time.monotonic() - self._last_flush >= \
+                    self.insert_flush_interval:
+                # NOTE: with a db writer thread, the batch is only queued
+                self.flush(wait=False)
+
+    def _add_pending_keys(self, keys):
+        """Add the lookup keys of a pending row.
+
+        The keys are the normalized values (see
+        :func:`~lyrics_scraping.matching.normalize`) that a lookup in the
+        database can match, e.g. ``('song', song_title, artist_name)``, thus
+        a lookup only flushes the pending rows if it needs one of them (see
+        :meth:`_flush_pending_keys`).
+
+        Parameters
+        ----------
+        keys : list of tuple
+            The lookup keys of the row.
+
+        """
+        with self._db_lock:
+            self._pending_keys.update(keys)
+
+    def _flush_pending_keys(self, keys):
+        """Flush the pending rows before a lookup in the database if it may
+        match one of them.
+
+        The rows queued to the db writer thread and not yet committed are
+        also waited on if the lookup may match one of them.
+
+        Parameters
+        ----------
+        keys : list of tuple
+            The lookup keys that the lookup matches, see
+            :meth:`_add_pending_keys`.
+
+        """
+        with self._db_lock:
+            needed = not self._pending_keys.isdisjoint(keys)
+        if not needed:
+            with self._db_writer_lock:
+                needed = not self._in_flight_keys.isdisjoint(keys)
+        if needed:
+            self._count_metric('db_lookup_flushes')
+            self.flush()
+
+    def _select_lyrics(self, which, which_title=None, artist_name=None,
+                       normalized=False):
+        """Select the songs matching a search query from the database.
+
+        See the `songs` and `songs_urls` tables as defined in the `music.sql
+        schema`_.
+
+        Parameters
+        ----------
+        which : str
+            The type of search query: 'album', 'artist' or 'song'.
+        which_title : str, optional
+            The title of the album or song.
+        artist_name : str, optional
+            The name of the artist.
+        normalized : bool, optional
+            Whether the normalized titles and names are matched instead of the
+            exact ones (the default value is False).
+
+        Returns
+        -------
+        cur.fetchall() : list of tuple
+            List of ``(song_title, artist_name, album_title, song_url, lyrics,
+            year)`` tuple, one for each song with lyrics.
+
+        """
+        conditions = []
+        values = []
+        if which in ['album', 'song']:
+            conditions.append(which + "_title")
+            values.append(which_title)
+        if artist_name:
+            conditions.append("artist_name")
+            values.append(artist_name)
+        if not conditions:
+            return []
+        # The lyrics saved but not yet inserted must be found too
+        self._flush_pending_keys(
+            [(which,) + tuple(normalize(v) for v in values)])
+        where_values = self._get_names_where(
+            ["songs." + c for c in conditions], values, normalized)
+        if where_values is None:
+            return []
+        where, values = where_values
+        logger.debug("Selecting the songs where {}: {}".format(where, values))
+        # NOTE: a song can have many URLs (or many songs have the same title
+        # with a version 1 db), hence the grouping for getting one URL per song
+        sql = "SELECT songs.song_title, songs.artist_name, songs.album_title," \
+              " songs_urls.song_url, lyrics_text(songs.lyrics), songs.year" \
+              " FROM songs LEFT JOIN {} WHERE {} AND songs.lyrics IS NOT NULL" \
+              " GROUP BY songs.song_title, songs.artist_name," \
+              " songs.album_title ORDER BY songs.rowid".format(
+                  _SONGS_URLS_JOINS[self.db_schema_version], where)
+        return self._execute_sql(sql, values)
+
+    def _get_names_where(self, columns, names, normalized=False):
+        """Return the WHERE clause matching titles or names.
+
+        The normalized names are first looked up in the table `name_keys`
+        (see :func:`~lyrics_scraping.utils.create_name_keys`) with its index,
+        thus the rows are then matched on their exact names.
+
+        Parameters
+        ----------
+        columns : list of str
+            The columns, e.g. ``['songs.song_title', 'songs.artist_name']``.
+        names : list of str
+            The title or name matched by each column.
+        normalized : bool, optional
+            Whether the normalized names are matched instead of the exact ones
+            (the default value is False).
+
+        Returns
+        -------
+        where_values : tuple or None
+            ``(where, values)`` where `where` is the WHERE clause and
+            `values` its values, or :obj:`None` if a normalized name is not
+            found in the database.
+
+        """
+        if not normalized:
+            return " AND ".join("{}=?".format(c) for c in columns), \
+                tuple(names)
+        conditions = []
+        values = []
+        for column, name in zip(columns, names):
+            exact_names = self._select_names(name)
+            if not exact_names:
+                return None
+            conditions.append("{} IN ({})".format(
+                column, ", ".join("?" * len(exact_names))))
+            values.extend(exact_names)
+        return " AND ".join(conditions), tuple(values)
+
+    def _select_names(self, name):
+        """Select the titles and names of the database that are the same as a
+        given one once normalized.
+
+        Parameters
+        ----------
+        name : str
+            The title or name, e.g. "speak and spell".
+
+        Returns
+        -------
+        names : list of str
+            The titles and names, e.g. ``["Speak & Spell"]``.
+
+        """
+        sql = "SELECT name FROM name_keys WHERE name_key=?"
+        return [row[0] for row in self._execute_sql(sql, (normalize(name),))]
 
     def _select_song_from_url(self, lyrics_url):
         """Select a song from the database based on a song URL.
@@ -1047,53 +2824,132 @@ class LyricsScraper:
 
         """
         logger.debug("Selecting the song where "
-                     "lyrics_url={}".format(lyrics_url))
-        sql = "SELECT * FROM songs_urls WHERE lyrics_url=?"
+                     "song_url={}".format(lyrics_url))
+        sql = "SELECT * FROM songs_urls WHERE song_url=?"
         return self._execute_sql(sql, (lyrics_url,))
 
+    def _select_songs_urls(self, urls):
+        """Select from the database the song URLs that are already saved.
+
+        The URLs are looked up with the primary key of `songs_urls` in
+        chunked ``IN (...)`` queries, i.e. with one query per 500 URLs.
+
+        See the `songs_urls` table as defined in the `music.sql schema`_.
+
+        Parameters
+        ----------
+        urls : list of str
+            The song URLs to look up.
+
+        Returns
+        -------
+        urls_in_db : set of str
+            The URLs found in the database.
+
+        """
+        # The URLs saved but not yet inserted must be found too
+        self._flush_pending_keys([("url", url) for url in urls])
+        urls_in_db = set()
+        for i in range(0, len(urls), _SQL_IN_CHUNK_SIZE):
+            chunk = tuple(urls[i:i + _SQL_IN_CHUNK_SIZE])
+            sql = "SELECT song_url FROM songs_urls WHERE song_url IN " \
+                  "({})".format(", ".join("?" * len(chunk)))
+            urls_in_db.update(row[0] for row in self._execute_sql(sql, chunk))
+        return urls_in_db
+
+    def _select_lyrics_from_urls(self, urls, artist_name=None):
+        """Select the songs with the given URLs from the database.
+
+        The URLs are looked up in chunked ``IN (...)`` queries like in
+        :meth:`_select_songs_urls`.
+
+        Parameters
+        ----------
+        urls : list of str
+            The song URLs to look up.
+        artist_name : str, optional
+            The name of the songs' artist, matched once normalized. Since the
+            song URLs of a version 1 db are only linked to the songs through
+            their titles, it avoids picking the song of another artist with
+            the same title.
+
+        Returns
+        -------
+        all_lyrics : dict [str, Lyrics]
+            The lyrics of each URL found in the database.
+
+        """
+        self._flush_pending_keys([("url", url) for url in urls])
+        all_lyrics = {}
+        artist_names = []
+        if artist_name:
+            artist_names = self._select_names(artist_name)
+            if not artist_names:
+                return all_lyrics
+        for i in range(0, len(urls), _SQL_IN_CHUNK_SIZE):
+            values = list(urls[i:i + _SQL_IN_CHUNK_SIZE])
+            where = "songs_urls.song_url IN ({})".format(
+                ", ".join("?" * len(values)))
+            if artist_names:
+                where += " AND songs.artist_name IN ({})".format(
+                    ", ".join("?" * len(artist_names)))
+                values.extend(artist_names)
+            sql = "SELECT songs.song_title, songs.artist_name," \
+                  " songs.album_title, songs_urls.song_url," \
+                  " lyrics_text(songs.lyrics), songs.year FROM songs" \
+                  " JOIN {} WHERE {} AND songs.lyrics IS NOT NULL" \
+                  " GROUP BY songs_urls.song_url".format(
+                      _SONGS_URLS_JOINS[self.db_schema_version], where)
+            for row in self._execute_sql(sql, tuple(values)):
+                all_lyrics[row[3]] = Lyrics(*row)
+        return all_lyrics
+
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
         # print("Exception has been handled")
-        self.compute_cache.db_conn.close()
+        # The pending rows are inserted even if an exception was raised
+        self.close()
         return True
 
 
-class Lyrics:
+class Lyrics(namedtuple("Lyrics", "song_title artist_name album_title "
+                                   "lyrics_url lyrics_text year")):
     """TODO: remove, to be replaced by Song
+
+    NOTE: the records are tuples (without per-instance ``__dict__``) since
+    full discographies can be kept in memory.
     """
-    def __init__(self, song_title, artist_name, album_title, lyrics_url,
-                 lyrics_text, year):
-        self.song_title = song_title
-        self.artist_name = artist_name
-        self.album_title = album_title
-        self.lyrics_url = lyrics_url
-        self.lyrics_text = lyrics_text
-        self.year = year
+    __slots__ = ()
+
 
+class LyricsHit(namedtuple("LyricsHit", "song_title artist_name album_title "
+                                         "lyrics_url year snippet rank")):
+    """A song found by :meth:`LyricsScraper.search_lyrics`.
 
-class Song:
+    `snippet` is an extract of the lyrics with the matched words between
+    square brackets and `rank` is the BM25 score of the song (the lower, the
+    better).
+
+    With a version 1 database, the URLs are only linked to the songs through
+    their titles. Thus, the `lyrics_url` of a song can be the URL of another
+    artist's song with the same title.
+    """
+    __slots__ = ()
+
+
+class Song(namedtuple("Song", "song_title artist_name album_title lyrics_url "
+                              "lyrics_text year")):
     """TODO
     """
-    def __init__(self, song_title, artist_name, album_title, lyrics_url,
-                 lyrics_text, year):
-        self.song_title = song_title
-        self.artist_name = artist_name
-        self.album_title = album_title
-        self.lyrics_url = lyrics_url
-        self.lyrics_text = lyrics_text
-        self.year = year
+    __slots__ = ()
 
 
-class Album:
+class Album(namedtuple("Album", "album_title artist_name album_url year")):
     """TODO
     """
-    def __init__(self, album_title, artist_name, album_url, year):
-        self.artist_name = artist_name
-        self.album_title = album_title
-        self.album_url = album_url
-        self.year = year
+    __slots__ = ()
 
     @staticmethod
     def check_album_year(year_result):
@@ -1116,13 +2972,37 @@ class Album:
                 "number with four digits".format(year_result[0]))
 
 
-class Artist:
+class Artist(namedtuple("Artist", "song_title artist_name artist_url")):
     """TODO
     """
-    def __init__(self, song_title, artist_name, artist_url):
-        self.song_title = song_title
-        self.artist_name = artist_name
-        self.artist_url = artist_url
+    __slots__ = ()
+
+
+class SerializedWebCache:
+    """Web cache whose requests are sent one at a time.
+
+    The batch methods (e.g. :meth:`LyricsScraper.get_songs_lyrics`) share
+    the web cache between threads. Serializing the requests keeps the delay
+    between requests and doesn't share the HTTP session concurrently.
+
+    Parameters
+    ----------
+    webcache : pyutils.webcache.WebCache
+        The web cache to wrap. Its other attributes are still accessible.
+
+    """
+    def __init__(self, webcache):
+        self._webcache = webcache
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._webcache, name)
+
+    def get_webpage(self, *args, **kwargs):
+        """Get a webpage from the wrapped web cache, see
+        :meth:`pyutils.webcache.WebCache.get_webpage`."""
+        with self._lock:
+            return self._webcache.get_webpage(*args, **kwargs)
 
 
 class ComputeCache:
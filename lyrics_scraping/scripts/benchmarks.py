@@ -0,0 +1,582 @@
+#!/usr/script/env python
+"""Script to benchmark the performance-sensitive parts of the lyrics scraper.
+
+The benchmarks are run locally, i.e. no HTTP request is ever sent to a lyrics
+website.
+
+Usage
+-----
+    ``$ scraper-bench [-h] {parsers,search,records,db} ...``
+
+Compare all the parser backends over a local corpus of HTML webpages::
+
+    $ scraper-bench parsers ~/data/lyrics_scraping/corpus
+
+Compare the restricted parse of the search webpages with the full parse::
+
+    $ scraper-bench search ~/data/lyrics_scraping/corpus/search
+
+Compare the memory used by the in-memory records of one million songs::
+
+    $ scraper-bench records -n 1000000
+
+Compare the insert throughput of the SQLite pragmas profiles::
+
+    $ scraper-bench db -n 20000 -b 500
+
+Notes
+-----
+Each backend is benchmarked in its own process so that its peak memory usage
+is not polluted by the other backends.
+
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from logging import NullHandler
+
+from lyrics_scraping import __version__
+from lyrics_scraping.extraction import load_profiles
+from lyrics_scraping.parsers import DEFAULT_PARSER, available_parsers, get_parser
+from lyrics_scraping.scrapers.azlyrics_scraper import Albums, \
+    complete_relative_url
+from lyrics_scraping.scrapers.lyrics_scraper import Lyrics
+from lyrics_scraping.utils import DB_PRAGMAS, apply_db_pragmas, \
+    get_data_filepath
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: tracemalloc will be used instead
+    resource = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+def load_corpus(corpus_dirpath):
+    """Load all the HTML webpages found in a directory (and its
+    subdirectories).
+
+    Parameters
+    ----------
+    corpus_dirpath : str
+        Path to the directory containing the HTML webpages.
+
+    Returns
+    -------
+    corpus : list of str
+        The HTML of each webpage, sorted by file path.
+
+    """
+    filepaths = []
+    for dirpath, _, filenames in os.walk(os.path.expanduser(corpus_dirpath)):
+        filepaths.extend(os.path.join(dirpath, f) for f in filenames
+                         if f.endswith((".html", ".htm")))
+    corpus = []
+    for filepath in sorted(filepaths):
+        with open(filepath, encoding='utf-8', errors='replace') as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def extract_summary(backend, doc, profiles):
+    """Extract the data that is compared across the parser backends.
+
+    Since the type of a webpage from the corpus is not known, all the
+    extraction profiles are run on it.
+
+    Parameters
+    ----------
+    backend : lyrics_scraping.parsers.ParserBackend
+        The backend that built `doc`.
+    doc
+        The document tree of a webpage.
+    profiles : dict [str, lyrics_scraping.extraction.ExtractionProfile]
+        The extraction profiles to run on the webpage.
+
+    Returns
+    -------
+    summary : list of dict
+        The data extracted by each profile.
+
+    """
+    return [profile.extract(backend, doc) for profile in profiles.values()]
+
+
+def _bench_parser(parser_name, corpus_dirpath, repeat):
+    """Benchmark one parser backend over the corpus.
+
+    This function runs in a child process.
+
+    Returns
+    -------
+    result : tuple
+        Pages parsed per second, peak memory in MB and the extracted summaries
+        used for checking correctness.
+
+    """
+    backend = get_parser(parser_name)
+    profiles = load_profiles(get_data_filepath('profiles'))
+    corpus = load_corpus(corpus_dirpath)
+    if resource:
+        start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        tracemalloc.start()
+    summaries = []
+    start = time.perf_counter()
+    for i in range(repeat):
+        for html in corpus:
+            doc = backend.parse(html)
+            summary = extract_summary(backend, doc, profiles)
+            if i == 0:
+                summaries.append(summary)
+            backend.release(doc)
+    duration = time.perf_counter() - start
+    if resource:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # NOTE: ru_maxrss is in KB on Linux but in bytes on macOS
+        unit = 1024 ** 2 if os.uname().sysname == "Darwin" else 1024
+        peak_mb = (peak_rss - start_rss) / unit
+    else:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    pages_per_sec = len(corpus) * repeat / duration if duration else 0.0
+    return pages_per_sec, peak_mb, summaries
+
+
+def bench_parsers(corpus_dirpath, parser_names=None, repeat=3):
+    """Run every parser backend over a local corpus of HTML webpages.
+
+    The speed (pages parsed per second) and the peak memory usage are measured
+    for each backend. Also, the data extracted by each backend with the
+    extraction profiles is compared with the one extracted by the default
+    backend (bs4-lxml) so that we only pick a fast backend that is still
+    correct.
+
+    Parameters
+    ----------
+    corpus_dirpath : str
+        Path to the directory containing the HTML webpages.
+    parser_names : list of str, optional
+        Names of the backends to benchmark (the default value is :obj:`None`
+        which implies that all the registered backends are benchmarked).
+    repeat : int, optional
+        Number of passes over the corpus (the default value is 3).
+
+    Returns
+    -------
+    results : list of tuple
+        One ``(parser_name, pages_per_sec, peak_mb, correct)`` tuple per
+        backend, sorted from the fastest to the slowest backend.
+
+    """
+    # The reference backend is always benchmarked first
+    parser_names = [DEFAULT_PARSER] + \
+        [name for name in parser_names or available_parsers()
+         if name != DEFAULT_PARSER]
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    ref_summaries = None
+    for name in parser_names:
+        logger.info("Benchmarking the parser '{}' ...".format(name))
+        # A fresh process per backend for measuring its own peak memory
+        with ctx.Pool(1) as pool:
+            pages_per_sec, peak_mb, summaries = pool.apply(
+                _bench_parser, (name, corpus_dirpath, repeat))
+        if ref_summaries is None:
+            ref_summaries = summaries
+        results.append((name, pages_per_sec, peak_mb,
+                        summaries == ref_summaries))
+    return sorted(results, key=lambda r: r[1], reverse=True)
+
+
+def _time_search_extraction(backend, profile, corpus, repeat, restricted):
+    """Extract the search results from the corpus with a parse mode.
+
+    Returns
+    -------
+    result : tuple
+        Pages parsed per second and the extracted search results.
+
+    """
+    results = []
+    start = time.perf_counter()
+    for i in range(repeat):
+        for html in corpus:
+            data = profile.extract_from_html(backend, html, restricted)
+            if i == 0:
+                results.append(data)
+    duration = time.perf_counter() - start
+    pages_per_sec = len(corpus) * repeat / duration if duration else 0.0
+    return pages_per_sec, results
+
+
+def bench_search(corpus_dirpath, parser_names=None, repeat=3):
+    """Compare the restricted parse of the search webpages with the full
+    parse.
+
+    With the restricted parse, only the search results (i.e. the nodes given
+    by 'parse_only' in the 'search' profile) are built. The search results
+    extracted both ways must be the same.
+
+    Parameters
+    ----------
+    corpus_dirpath : str
+        Path to the directory containing the search webpages.
+    parser_names : list of str, optional
+        Names of the backends to benchmark (the default value is :obj:`None`
+        which implies that all the registered backends are benchmarked).
+    repeat : int, optional
+        Number of passes over the corpus (the default value is 3).
+
+    Returns
+    -------
+    results : list of tuple
+        One ``(parser_name, full_pages_per_sec, restricted_pages_per_sec,
+        speedup, correct)`` tuple per backend.
+
+    """
+    profile = load_profiles(get_data_filepath('profiles'))['search']
+    corpus = load_corpus(corpus_dirpath)
+    results = []
+    for name in parser_names or available_parsers():
+        logger.info("Benchmarking the search parse modes with the parser "
+                    "'{}' ...".format(name))
+        backend = get_parser(name)
+        full_speed, full_results = _time_search_extraction(
+            backend, profile, corpus, repeat, restricted=False)
+        restricted_speed, restricted_results = _time_search_extraction(
+            backend, profile, corpus, repeat, restricted=True)
+        speedup = restricted_speed / full_speed if full_speed else 0.0
+        results.append((name, full_speed, restricted_speed, speedup,
+                        restricted_results == full_results))
+    return results
+
+
+class _PlainLyrics:
+    """The former :class:`~lyrics_scraping.scrapers.lyrics_scraper.Lyrics`
+    with a per-instance ``__dict__``, kept for comparison."""
+
+    def __init__(self, song_title, artist_name, album_title, lyrics_url,
+                 lyrics_text, year):
+        self.song_title = song_title
+        self.artist_name = artist_name
+        self.album_title = album_title
+        self.lyrics_url = lyrics_url
+        self.lyrics_text = lyrics_text
+        self.year = year
+
+
+def _measure_mb(build, nb_songs, nb_songs_per_album):
+    """Return the memory in MB allocated by `build` and still used by the
+    structure it returns."""
+    tracemalloc.start()
+    structure = build(nb_songs, nb_songs_per_album)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del structure
+    return size / 1024 ** 2
+
+
+_ALBUM_TITLES = {}
+
+
+def _song(i, nb_songs_per_album):
+    """Return the fields of the i-th generated song.
+
+    NOTE: the same str objects are used for all the songs (except the album
+    titles which are the keys of the albums) so that only the structures
+    holding them are measured.
+
+    """
+    album = i // nb_songs_per_album
+    album_title = _ALBUM_TITLES.get(album)
+    if album_title is None:
+        album_title = _ALBUM_TITLES[album] = "Album {}".format(album)
+    return ("Song", "Artist", album_title,
+            "https://www.azlyrics.com/lyrics/artist/song.html", "", "1981")
+
+
+def _build_plain_lyrics(nb_songs, nb_songs_per_album):
+    return [_PlainLyrics(*_song(i, nb_songs_per_album))
+            for i in range(nb_songs)]
+
+
+def _build_lyrics(nb_songs, nb_songs_per_album):
+    return [Lyrics(*_song(i, nb_songs_per_album)) for i in range(nb_songs)]
+
+
+def _build_dict_albums(nb_songs, nb_songs_per_album):
+    # The former layout of Albums: a dict per album
+    albums = {}
+    for i in range(nb_songs):
+        title, _, album_title, url, _, _ = _song(i, nb_songs_per_album)
+        album = albums.setdefault(album_title, {})
+        album.setdefault('album_id', i // nb_songs_per_album)
+        album.setdefault('album_year', 1981)
+        # NOTE: the song URL is built like in Albums.update_albums()
+        url = complete_relative_url(url[len("https://www.azlyrics.com"):],
+                                    "https://www.azlyrics.com/a/artist.html")
+        album.setdefault('songs', []).append((url, title))
+    return albums
+
+
+def _build_albums(nb_songs, nb_songs_per_album):
+    albums = Albums("", "https://www.azlyrics.com/a/artist.html")
+    for i in range(nb_songs):
+        title, _, album_title, url, _, _ = _song(i, nb_songs_per_album)
+        albums.update_albums(title, ".." + url[len("https://www.azlyrics.com"):],
+                             album_title, i // nb_songs_per_album, 1981)
+    return albums
+
+
+def bench_records(nb_songs=1000000, nb_songs_per_album=12):
+    """Compare the memory used by the in-memory records of many songs.
+
+    The records (:class:`~lyrics_scraping.scrapers.lyrics_scraper.Lyrics`
+    and :class:`~lyrics_scraping.scrapers.azlyrics_scraper.Albums`) are
+    compared with their former layouts (an object with a ``__dict__`` per
+    song and a dict per album). The songs share their str fields so that
+    only the structures are compared, i.e. the measured memory is the
+    overhead of the structure on top of the scraped text.
+
+    Parameters
+    ----------
+    nb_songs : int, optional
+        Number of generated songs (the default value is 1000000).
+    nb_songs_per_album : int, optional
+        Number of songs per album (the default value is 12).
+
+    Returns
+    -------
+    results : list of tuple
+        One ``(structure, layout, mb, bytes_per_song)`` tuple per layout.
+
+    """
+    layouts = [("Lyrics", "__dict__", _build_plain_lyrics),
+               ("Lyrics", "tuple", _build_lyrics),
+               ("Albums", "dict per album", _build_dict_albums),
+               ("Albums", "compact", _build_albums)]
+    # The album titles are built before the measures
+    for i in range(0, nb_songs, nb_songs_per_album):
+        _song(i, nb_songs_per_album)
+    results = []
+    for structure, layout, build in layouts:
+        logger.info("Measuring {} ({}) ...".format(structure, layout))
+        mb = _measure_mb(build, nb_songs, nb_songs_per_album)
+        results.append((structure, layout, mb,
+                        int(mb * 1024 ** 2 / nb_songs) if nb_songs else 0))
+    return results
+
+
+def _time_inserts(db_filepath, pragmas, nb_songs, batch_size):
+    """Return the number of songs inserted per second in a new music db."""
+    with open(get_data_filepath('schema')) as f:
+        schema = f.read()
+    db_conn = sqlite3.connect(db_filepath)
+    try:
+        if pragmas:
+            apply_db_pragmas(db_conn, pragmas)
+        db_conn.executescript(schema)
+        # NOTE: the songs are inserted like LyricsScraper.flush() does, i.e.
+        # one executemany per table and one transaction per batch
+        songs_sql = "INSERT OR IGNORE INTO songs (song_title, artist_name," \
+                    " album_title, lyrics, year) VALUES (?, ?, ?, ?, ?)"
+        urls_sql = "INSERT OR IGNORE INTO songs_urls (song_url, song_title)" \
+                   " VALUES (?, ?)"
+        lyrics = "I stand still stepping on a shady street\n" * 30
+        start = time.perf_counter()
+        for first in range(0, nb_songs, batch_size):
+            titles = ["Song {}".format(i)
+                      for i in range(first, min(first + batch_size, nb_songs))]
+            db_conn.execute("BEGIN")
+            db_conn.executemany(songs_sql, [
+                (title, "Artist", "Album", lyrics, "1981")
+                for title in titles])
+            db_conn.executemany(urls_sql, [
+                ("https://www.azlyrics.com/lyrics/artist/{}.html".format(
+                    title), title) for title in titles])
+            db_conn.commit()
+        duration = time.perf_counter() - start
+    finally:
+        db_conn.close()
+    return nb_songs / duration if duration else 0.0
+
+
+def bench_db_profiles(nb_songs=20000, batch_size=500, profiles=None):
+    """Compare the insert throughput of the SQLite pragmas profiles.
+
+    For each profile (see :data:`~lyrics_scraping.utils.DB_PRAGMAS`), the
+    songs are inserted in a new music db, in batches of `batch_size` songs
+    each inserted in one transaction. The SQLite defaults (rollback journal,
+    ``synchronous=FULL``) are also measured as a reference.
+
+    Parameters
+    ----------
+    nb_songs : int, optional
+        Number of inserted songs (the default value is 20000).
+    batch_size : int, optional
+        Number of songs per transaction (the default value is 500). Use 1 for
+        measuring one commit per song.
+    profiles : list of str, optional
+        Names of the profiles to benchmark (the default value is :obj:`None`
+        which implies that all the profiles are benchmarked).
+
+    Returns
+    -------
+    results : list of tuple
+        One ``(profile, songs_per_second, speedup)`` tuple per profile, the
+        speedup being relative to the SQLite defaults.
+
+    """
+    profiles = [None] + (profiles or sorted(DB_PRAGMAS))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dirpath:
+        for profile in profiles:
+            name = profile or "sqlite defaults"
+            logger.info("Inserting {} songs with the profile '{}' ...".format(
+                nb_songs, name))
+            db_filepath = os.path.join(tmp_dirpath,
+                                       "{}.sqlite".format(name))
+            speed = _time_inserts(db_filepath, profile, nb_songs, batch_size)
+            results.append((name, speed))
+    default_speed = results[0][1]
+    return [(name, speed, speed / default_speed if default_speed else 0.0)
+            for name, speed in results]
+
+
+def print_results(headers, results):
+    """Print the results of a benchmark as a table."""
+    rows = [headers] + [
+        tuple("{:.2f}".format(v) if isinstance(v, float) else str(v)
+              for v in row)
+        for row in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(headers))]
+    for i, row in enumerate(rows):
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+        if i == 0:
+            print("  ".join("-" * w for w in widths))
+
+
+def setup_argparser():
+    """Setup the argument parser for the command-line script.
+
+    Returns
+    -------
+    args : argparse.Namespace
+        Simple class used by default by `parse_args()` to create an object
+        holding attributes and return it.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="scraper-bench",
+        description="Benchmark the performance-sensitive parts of the lyrics "
+                    "scraper. No HTTP request is sent.")
+    parser.add_argument("--version", action='version',
+                        version='%(prog)s {}'.format(__version__))
+    subparsers = parser.add_subparsers(dest="benchmark")
+    # =================
+    # Parsers benchmark
+    # =================
+    parsers_parser = subparsers.add_parser(
+        "parsers", help="Compare the parser backends over a local HTML corpus")
+    parsers_parser.add_argument(
+        "corpus_dirpath",
+        help="Directory containing the HTML webpages (e.g. azlyrics search, "
+             "artist and lyrics webpages)")
+    parsers_parser.add_argument(
+        "-p", "--parsers", nargs="+", choices=available_parsers(),
+        help="Parser backends to benchmark (default: all of them)")
+    parsers_parser.add_argument(
+        "-n", "--repeat", type=int, default=3,
+        help="Number of passes over the corpus (default: 3)")
+    # ===========================
+    # Search parse mode benchmark
+    # ===========================
+    search_parser = subparsers.add_parser(
+        "search", help="Compare the restricted parse of the search webpages "
+                       "with the full parse")
+    search_parser.add_argument(
+        "corpus_dirpath", help="Directory containing the search webpages")
+    search_parser.add_argument(
+        "-p", "--parsers", nargs="+", choices=available_parsers(),
+        help="Parser backends to benchmark (default: all of them)")
+    search_parser.add_argument(
+        "-n", "--repeat", type=int, default=3,
+        help="Number of passes over the corpus (default: 3)")
+    # =================
+    # Records benchmark
+    # =================
+    records_parser = subparsers.add_parser(
+        "records", help="Compare the memory used by the in-memory records of "
+                        "many songs")
+    records_parser.add_argument(
+        "-n", "--nb-songs", type=int, default=1000000, dest="nb_songs",
+        help="Number of generated songs (default: 1000000)")
+    records_parser.add_argument(
+        "-a", "--songs-per-album", type=int, default=12,
+        dest="nb_songs_per_album",
+        help="Number of songs per album (default: 12)")
+    # ============
+    # DB benchmark
+    # ============
+    db_parser = subparsers.add_parser(
+        "db", help="Compare the insert throughput of the SQLite pragmas "
+                   "profiles")
+    db_parser.add_argument(
+        "-n", "--nb-songs", type=int, default=20000, dest="nb_songs",
+        help="Number of inserted songs (default: 20000)")
+    db_parser.add_argument(
+        "-b", "--batch-size", type=int, default=500, dest="batch_size",
+        help="Number of songs per transaction (default: 500)")
+    db_parser.add_argument(
+        "-p", "--profiles", nargs="+", choices=sorted(DB_PRAGMAS),
+        help="Profiles to benchmark (default: all of them)")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry-point to the script.
+
+    Returns
+    -------
+    retcode : int
+        0 if the benchmark was run, 1 otherwise.
+
+    """
+    args = setup_argparser()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.benchmark is None:
+        print("No benchmark selected: parsers, search, records, db")
+        return 1
+    if args.benchmark == "records":
+        results = bench_records(args.nb_songs, args.nb_songs_per_album)
+        print_results(("structure", "layout", "MB", "bytes/song"), results)
+        return 0
+    if args.benchmark == "db":
+        results = bench_db_profiles(args.nb_songs, args.batch_size,
+                                    args.profiles)
+        print_results(("profile", "songs/s", "speedup"), results)
+        return 0
+    if not load_corpus(args.corpus_dirpath):
+        logger.error("No HTML webpage found in {}".format(args.corpus_dirpath))
+        return 1
+    if args.benchmark == "parsers":
+        results = bench_parsers(args.corpus_dirpath, args.parsers, args.repeat)
+        print_results(("parser", "pages/s", "peak MB", "correct"), results)
+    else:
+        results = bench_search(args.corpus_dirpath, args.parsers, args.repeat)
+        print_results(("parser", "full pages/s", "restricted pages/s",
+                       "speedup", "correct"), results)
+    return 0
+
+
+if __name__ == '__main__':
+    main()
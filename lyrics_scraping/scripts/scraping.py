@@ -36,6 +36,18 @@ Reset the main config file to default values::
 
     $ scraping -r main
 
+Export the music database to Parquet files::
+
+    $ scraping -x ~/lyrics_parquet
+
+Build or rebuild the full-text index of the songs in the music database::
+
+    $ scraping -f
+
+Migrate the music database to the version 2 of its schema (integer keys)::
+
+    $ scraping -m ~/data/lyrics_scraping/music_v2.sqlite
+
 Notes
 -----
 More information is available at:
@@ -55,9 +67,14 @@ import sqlite3
 from logging import NullHandler
 
 from lyrics_scraping import __version__
+from lyrics_scraping.compression import (
+    compress_db_lyrics, register_lyrics_text)
+from lyrics_scraping.export import export_parquet
+from lyrics_scraping.migration import migrate_db
 from lyrics_scraping.scrapers.azlyrics_scraper import AZLyricsScraper
 from lyrics_scraping.utils import (
-    get_backup_cfg_filepath, get_data_filepath, load_cfg)
+    create_lyrics_fts, get_backup_cfg_filepath, get_data_filepath, load_cfg,
+    plural, rebuild_lyrics_fts)
 from pyutils import uninstall_colored_logger
 from pyutils.genutils import load_yaml, run_cmd
 from pyutils.logutils import setup_basic_logger, setup_logging_from_cfg
@@ -227,6 +244,138 @@ def undo_config(cfg_type):
         return retcode
 
 
+def export_db(dirpath):
+    """Export the music database to Parquet files.
+
+    The database is the one found at `db_filepath` in the main configuration
+    file *main_cfg.yaml*. One Parquet file is written per table.
+
+    Parameters
+    ----------
+    dirpath : str
+        Path to the directory where the Parquet files are written.
+
+    Returns
+    -------
+    retcode : int
+        0 if the database is successfully exported, 1 if no database is
+        configured.
+
+    """
+    main_cfg = load_yaml(get_data_filepath('main'))
+    db_filepath = main_cfg.get('db_filepath')
+    if not db_filepath:
+        logger.error("No music database (db_filepath) configured in the main "
+                     "config file")
+        return 1
+    filepaths = export_parquet(dirpath, db_filepath=db_filepath)
+    logger.info("<color>Music database exported:</color> {}".format(
+        ", ".join(filepaths[table] for table in sorted(filepaths))))
+    return 0
+
+
+def rebuild_fts():
+    """Build or rebuild the full-text index of the songs in the music
+    database.
+
+    The database is the one found at `db_filepath` in the main configuration
+    file *main_cfg.yaml*. The index is needed by
+    :meth:`~scrapers.lyrics_scraper.LyricsScraper.search_lyrics` and is kept
+    in sync with the songs once built.
+
+    Returns
+    -------
+    retcode : int
+        0 if the index is successfully built, 1 if no database is configured
+        or found.
+
+    """
+    main_cfg = load_yaml(get_data_filepath('main'))
+    db_filepath = os.path.expanduser(main_cfg.get('db_filepath') or '')
+    if not os.path.isfile(db_filepath):
+        logger.error("No music database (db_filepath) found: {}".format(
+            db_filepath))
+        return 1
+    db_conn = sqlite3.connect(db_filepath)
+    try:
+        register_lyrics_text(db_conn)
+        if not create_lyrics_fts(db_conn):
+            # The index already exists
+            rebuild_lyrics_fts(db_conn)
+        nb_songs = db_conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+    finally:
+        db_conn.close()
+    logger.info("<color>Full-text index of {} songs built:</color> {}".format(
+        nb_songs, db_filepath))
+    return 0
+
+
+def migrate_config_db(dst_db_filepath):
+    """Migrate the music database to the version 2 of its schema.
+
+    The database is the one found at `db_filepath` in the main configuration
+    file *main_cfg.yaml*. It is left untouched: the version 2 database is
+    written in a new file which can then be set as `db_filepath`.
+
+    Parameters
+    ----------
+    dst_db_filepath : str
+        Path to the version 2 database. The file must not exist.
+
+    Returns
+    -------
+    retcode : int
+        0 if the database is successfully migrated, 1 if no database is
+        configured or found.
+
+    """
+    main_cfg = load_yaml(get_data_filepath('main'))
+    db_filepath = os.path.expanduser(main_cfg.get('db_filepath') or '')
+    if not os.path.isfile(db_filepath):
+        logger.error("No music database (db_filepath) found: {}".format(
+            db_filepath))
+        return 1
+    counts = migrate_db(db_filepath, dst_db_filepath)
+    logger.info("<color>Rows migrated:</color> {}".format(
+        ", ".join("{}={}".format(table, count)
+                  for table, count in sorted(counts.items()))))
+    return 0
+
+
+def compress_config_db(compress=True):
+    """Compress (or decompress) the lyrics of the music database.
+
+    The database is the one found at `db_filepath` in the main configuration
+    file *main_cfg.yaml*. The lyrics are compressed with a new dictionary
+    trained on a sample of them, see
+    :func:`~lyrics_scraping.compression.compress_db_lyrics`.
+
+    Parameters
+    ----------
+    compress : bool, optional
+        Whether the lyrics are compressed, otherwise they are stored back as
+        text (the default value is True).
+
+    Returns
+    -------
+    retcode : int
+        0 if the lyrics are successfully converted, 1 if no database is
+        configured or found.
+
+    """
+    main_cfg = load_yaml(get_data_filepath('main'))
+    db_filepath = os.path.expanduser(main_cfg.get('db_filepath') or '')
+    if not os.path.isfile(db_filepath):
+        logger.error("No music database (db_filepath) found: {}".format(
+            db_filepath))
+        return 1
+    stats = compress_db_lyrics(db_filepath, compress=compress)
+    logger.info("<color>Lyrics of {} song{} {}compressed:</color> {}".format(
+        stats['songs'], plural(stats['songs']), "" if compress else "de",
+        db_filepath))
+    return 0
+
+
 def start_scraper():
     """Start the lyrics scraper.
 
@@ -248,8 +397,11 @@ def start_scraper():
     log_cfg_filepath = get_data_filepath('log')
     # Load the main config dict from the config file on disk
     main_cfg = load_yaml(main_cfg_filepath)
+    # The songs, albums and artists to scrape are not options of the scraper
+    batches_cfg = [(which, main_cfg.pop('{}s_config'.format(which), None))
+                   for which in ['song', 'album', 'artist']]
     # Setup logging if required
-    if main_cfg['use_logging']:
+    if main_cfg.pop('use_logging', True):
         # Setup logging from the logging config file: this will setup the
         # logging to all custom modules, including the current script
         setup_logging_from_cfg(log_cfg_filepath)
@@ -259,7 +411,27 @@ def start_scraper():
         # Start the scraping of lyrics webpages
         logger.info("Starting the lyrics scraping")
         scraper = AZLyricsScraper(**main_cfg)
-        scraper.start_scraping()
+        # NOTE: the db connections are kept open for all the items and closed
+        # (after inserting the pending rows) at the end, even on failure
+        try:
+            for which, batch_cfg in batches_cfg:
+                if not batch_cfg or batch_cfg.get('skip'):
+                    logger.info("Skipping the {}s".format(which))
+                    continue
+                batch_cfg = dict(batch_cfg)
+                batch_cfg.pop('skip', None)
+                items = batch_cfg.pop('{}s'.format(which), None) or []
+                get_batch_lyrics = getattr(scraper,
+                                           'get_{}s_lyrics'.format(which))
+                # The remaining keys (e.g. include_unknown_year) are the
+                # default options of all the items
+                results = get_batch_lyrics(items, **batch_cfg)
+                for result in results:
+                    if result.error:
+                        logger.error("Couldn't get the lyrics for {}: "
+                                     "{}".format(result.query, result.error))
+        finally:
+            scraper.close()
     except (FileNotFoundError, KeyboardInterrupt, KeyError, OSError,
             sqlite3.Error):
         raise
@@ -339,6 +511,26 @@ config file to have access to the complete list of options, i.e.
         "-s", "--start_scraper", action="store_true",
         help='''Scrape lyrics from webpages and save them locally in a SQLite 
         database''')
+    start_group.add_argument(
+        "-x", "--export", metavar="DIRPATH",
+        help='''Export the music database to Parquet files (one per table) in
+        the given directory. pyarrow is required, i.e.
+        pip install LyricsScraping[export]''')
+    start_group.add_argument(
+        "-f", "--rebuild-fts", action="store_true",
+        help='''Build or rebuild the full-text index of the songs in the music
+        database (requires SQLite compiled with FTS5)''')
+    start_group.add_argument(
+        "-m", "--migrate-db", metavar="DST_DB_FILEPATH",
+        help='''Migrate the music database to the version 2 of its schema
+        (integer keys) in a new database file''')
+    start_group.add_argument(
+        "-z", "--compress-lyrics", action="store_true",
+        help='''Compress the lyrics of the music database with a dictionary
+        trained on a sample of them''')
+    start_group.add_argument(
+        "--decompress-lyrics", action="store_true",
+        help='''Store the lyrics of the music database back as text''')
     # ===========
     # Edit config
     # ===========
@@ -418,12 +610,22 @@ def main():
             retcode = undo_config(args.undo)
         elif args.start_scraper:
             retcode = start_scraper()
+        elif args.export:
+            retcode = export_db(args.export)
+        elif args.rebuild_fts:
+            retcode = rebuild_fts()
+        elif args.migrate_db:
+            retcode = migrate_config_db(args.migrate_db)
+        elif args.compress_lyrics or args.decompress_lyrics:
+            retcode = compress_config_db(compress=args.compress_lyrics)
         else:
             # TODO: default when no action given is to start scraping?
-            print("No action selected: edit (-e), reset (-r) or start the "
-                  "scraper (-s)")
+            print("No action selected: edit (-e), reset (-r), start the "
+                  "scraper (-s), export the db (-x), rebuild its full-text "
+                  "index (-f), migrate it (-m) or compress its lyrics (-z)")
     except (AssertionError, AttributeError, FileNotFoundError,
-            KeyboardInterrupt, OSError, sqlite3.Error) as e:
+            ImportError, KeyboardInterrupt, OSError, sqlite3.Error,
+            ValueError) as e:
         # TODO: explain this line
         # traceback.print_exc()
         e = "<color>{}</color>".format(e)
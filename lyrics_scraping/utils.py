@@ -5,15 +5,25 @@
 .. _user-defined logging configuration file: https://bit.ly/2niTDgY
 .. _user-defined main configuration file: https://bit.ly/2oyt0VJ
 .. _SQL schema file music.sql: https://bit.ly/2kIMYvn
+.. _SQL schema file music_v2.sql:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/music_v2.sql
+.. _SQL schema file lyrics_fts.sql:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/lyrics_fts.sql
+.. _SQL file lyrics_fts_temp.sql:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/lyrics_fts_temp.sql
+.. _extraction profiles file azlyrics_profiles.yaml:
+   https://github.com/raul23/LyricsScraping/blob/master/lyrics_scraping/data/azlyrics_profiles.yaml
 
 """
 
 from collections import namedtuple
 import os
+import re
 
 import yaml
 
 from lyrics_scraping import data
+from lyrics_scraping.matching import normalize
 from pyutils.genutils import load_yaml
 
 
@@ -22,7 +32,80 @@ _CFG_EXT = "yaml"
 _LOG_CFG_FILENAME = 'logging_cfg'
 _MAIN_CFG_FILENAME = 'main_cfg'
 _SCHEMA_FILENAME = "music.sql"
-_data_filenames = namedtuple("data_filenames", "user_cfg default_cfg schema")
+_SCHEMA_V2_FILENAME = "music_v2.sql"
+_FTS_SCHEMA_FILENAME = "lyrics_fts.sql"
+_FTS_SCHEMA_V2_FILENAME = "lyrics_fts_v2.sql"
+_FTS_TEMP_FILENAME = "lyrics_fts_temp.sql"
+_FTS_TEMP_V2_FILENAME = "lyrics_fts_temp_v2.sql"
+_PROFILES_FILENAME = "azlyrics_profiles.yaml"
+_data_filenames = namedtuple("data_filenames",
+                             "user_cfg default_cfg schema schema_v2 "
+                             "fts_schema fts_schema_v2 fts_temp "
+                             "fts_temp_v2 profiles")
+# The SQLite pragmas applied when connecting to the music db, by profile:
+# - safe: no transaction is ever lost, even on a power failure
+# - fast: the last transactions can be lost on a power failure (but the db is
+#   never corrupted)
+# - bulk-load: the db can be corrupted by a crash, only for filling a new db
+#
+# NOTE: the negative cache_size is in KiB instead of pages, the mmap_size and
+# journal_size_limit are in bytes
+DB_PRAGMAS = {
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'journal_size_limit': 67108864,
+    },
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'journal_size_limit': 67108864,
+    },
+    'bulk-load': {
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'cache_size': -256000,
+        'mmap_size': 1073741824,
+        'temp_store': 'MEMORY',
+        'journal_size_limit': 67108864,
+    },
+}
+_DB_PRAGMA_NAMES = {'cache_size', 'journal_mode', 'journal_size_limit',
+                    'mmap_size', 'synchronous', 'temp_store'}
+_DB_PRAGMA_VALUE_REGEX = re.compile(r"^-?\w+$")
+# The normalized names of the songs, albums and artists of a music db
+# NOTE: the same table for both versions of the db schema
+_NAME_KEYS_SQL = """
+create table if not exists name_keys (
+    name_key text not null, -- normalized name, e.g. "speak and spell"
+    name text not null, -- song title, album title or artist name
+    primary key(name_key, name)
+) without rowid;
+"""
+# The counter of the changes of the song URLs of a music db, e.g. for knowing
+# if a filter of the URLs is up to date
+# NOTE: the counter starts at a random value so that it doesn't match a tag
+# saved before the triggers existed
+_URL_CHANGES_SQL = """
+create table if not exists url_changes (nb_changes integer not null);
+insert into url_changes select random() & 4294967295
+    where not exists (select 1 from url_changes);
+create trigger if not exists {0}_insert_change after insert on {0} begin
+    update url_changes set nb_changes = nb_changes + 1;
+end;
+create trigger if not exists {0}_delete_change after delete on {0} begin
+    update url_changes set nb_changes = nb_changes + 1;
+end;
+create trigger if not exists {0}_update_change after update on {0} begin
+    update url_changes set nb_changes = nb_changes + 1;
+end;
+"""
 
 
 def _add_data_filenames():
@@ -35,6 +118,12 @@ def _add_data_filenames():
         [("default_" + k, "default_" + v)
          for k, v in _data_filenames.user_cfg.items()])
     _data_filenames.schema = _SCHEMA_FILENAME
+    _data_filenames.schema_v2 = _SCHEMA_V2_FILENAME
+    _data_filenames.fts_schema = _FTS_SCHEMA_FILENAME
+    _data_filenames.fts_schema_v2 = _FTS_SCHEMA_V2_FILENAME
+    _data_filenames.fts_temp = _FTS_TEMP_FILENAME
+    _data_filenames.fts_temp_v2 = _FTS_TEMP_V2_FILENAME
+    _data_filenames.profiles = _PROFILES_FILENAME
 
 
 _add_data_filenames()
@@ -85,6 +174,264 @@ def plural(obj, plural_end="s", singular_end=""):
     return plural_end if num > 1 else singular_end
 
 
+def apply_db_pragmas(db_conn, pragmas):
+    """Apply SQLite pragmas to a database connection.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the database. No transaction should be open since
+        the journal mode can't be changed within a transaction.
+    pragmas : str or dict
+        The name of a profile from :data:`DB_PRAGMAS` (e.g. 'fast') or the
+        pragmas themselves, e.g. ``{'synchronous': 'NORMAL'}``.
+
+    Returns
+    -------
+    pragmas : dict
+        The value of each pragma as reported by SQLite once applied, e.g.
+        ``{'journal_mode': 'wal', ...}``.
+
+    Raises
+    ------
+    ValueError
+        Raised if the profile or a pragma is unknown or if a pragma's value
+        is not a number or a keyword.
+
+    """
+    if isinstance(pragmas, str):
+        if pragmas not in DB_PRAGMAS:
+            raise ValueError("Unknown db pragmas profile '{}' (choose from "
+                             "{})".format(pragmas,
+                                          ", ".join(sorted(DB_PRAGMAS))))
+        pragmas = DB_PRAGMAS[pragmas]
+    applied_pragmas = {}
+    for name, value in pragmas.items():
+        # NOTE: the pragmas can't be given as SQL parameters, hence the checks
+        if name not in _DB_PRAGMA_NAMES:
+            raise ValueError("Unknown db pragma '{}' (choose from {})".format(
+                name, ", ".join(sorted(_DB_PRAGMA_NAMES))))
+        if not _DB_PRAGMA_VALUE_REGEX.match(str(value)):
+            raise ValueError("Invalid value for the db pragma '{}': "
+                             "{}".format(name, value))
+        row = db_conn.execute("PRAGMA {}={}".format(name, value)).fetchone()
+        if row is None:
+            # Only some pragmas return their new value
+            row = db_conn.execute("PRAGMA {}".format(name)).fetchone()
+        applied_pragmas[name] = row[0]
+    return applied_pragmas
+
+
+def create_lyrics_fts(db_conn):
+    """Create the full-text index of the songs in a music database.
+
+    The index (the FTS5 table `lyrics_fts`) and the triggers that keep it in
+    sync with the `songs` table are defined in the `SQL schema file
+    lyrics_fts.sql`_ (or in *lyrics_fts_v2.sql* for a version 2 database). If
+    the index didn't exist, the songs already in the database are indexed.
+
+    The index reads the lyrics with the SQL function ``lyrics_text()`` which
+    must be registered on the connection, see
+    :func:`~lyrics_scraping.compression.register_lyrics_text`. The triggers
+    index the plain-text lyrics without it, thus the songs can be modified
+    from any connection (e.g. the sqlite3 shell) as long as their lyrics are
+    not compressed. The compressed lyrics are indexed by temporary triggers
+    (see :func:`create_lyrics_fts_temp_triggers`) which only exist on the
+    connections where the function is registered.
+
+    The triggers of the previous versions, which called the function for
+    every song, are replaced.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    created : bool
+        True if the index was created, False if it already existed.
+
+    Raises
+    ------
+    sqlite3.OperationalError
+        Raised if SQLite is not compiled with FTS5.
+
+    """
+    created = not has_lyrics_fts(db_conn)
+    if not created:
+        old_triggers = [row[0] for row in db_conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='trigger' AND "
+            "tbl_name IN ('songs', 'song') AND sql LIKE '%lyrics_text(%'")]
+        if not old_triggers:
+            create_lyrics_fts_temp_triggers(db_conn)
+            return False
+        for name in old_triggers:
+            db_conn.execute("DROP TRIGGER {}".format(name))
+    file_type = 'fts_schema_v2' if get_db_schema_version(db_conn) == 2 \
+        else 'fts_schema'
+    with open(get_data_filepath(file_type), 'rt') as f:
+        db_conn.executescript(f.read())
+    create_lyrics_fts_temp_triggers(db_conn)
+    if created:
+        rebuild_lyrics_fts(db_conn)
+    return created
+
+
+def create_lyrics_fts_temp_triggers(db_conn):
+    """Create the temporary triggers that index the compressed lyrics of the
+    songs in the full-text index.
+
+    The triggers (defined in the `SQL file lyrics_fts_temp.sql`_ or in
+    *lyrics_fts_temp_v2.sql* for a version 2 database) call the SQL function
+    ``lyrics_text()``, thus they only exist on a connection where it is
+    registered. Nothing is done if the database doesn't have a full-text
+    index.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    created : bool
+        True if the triggers were created, False if the database doesn't
+        have a full-text index.
+
+    """
+    if not has_lyrics_fts(db_conn):
+        return False
+    file_type = 'fts_temp_v2' if get_db_schema_version(db_conn) == 2 \
+        else 'fts_temp'
+    with open(get_data_filepath(file_type), 'rt') as f:
+        db_conn.executescript(f.read())
+    return True
+
+
+def create_name_keys(db_conn):
+    """Create the table of the normalized names of a music database.
+
+    The table `name_keys` maps the normalized names (see
+    :func:`~lyrics_scraping.matching.normalize`) of the songs, albums and
+    artists to their names, thus they are found whatever their case, accents
+    and punctuation with its index instead of normalizing every row. If the
+    table is empty, it is filled with the names already in the database.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    nb_names : int
+        Number of names added to the table.
+
+    """
+    db_conn.executescript(_NAME_KEYS_SQL)
+    if db_conn.execute("SELECT 1 FROM name_keys LIMIT 1").fetchone():
+        return 0
+    db_conn.create_function("normalize", 1, normalize)
+    with db_conn:
+        cur = db_conn.execute(
+            "INSERT INTO name_keys (name_key, name)"
+            " SELECT normalize(name), name FROM (SELECT song_title AS name"
+            " FROM songs UNION SELECT album_title FROM albums"
+            " UNION SELECT artist_name FROM artists) WHERE true"
+            " ON CONFLICT(name_key, name) DO NOTHING")
+    return cur.rowcount
+
+
+def create_url_changes(db_conn):
+    """Create the counter of the changes of the song URLs in a music
+    database.
+
+    The table `url_changes` has a single row whose `nb_changes` is
+    incremented by triggers whenever a song URL is inserted, deleted or
+    updated, from any connection. Unlike the number of URLs or their largest
+    rowid, it always changes, e.g. when a URL is deleted and another one
+    inserted.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    nb_changes : int
+        The current value of the counter.
+
+    """
+    # NOTE: the URLs of a version 2 db are in the table song_url (songs_urls
+    # is a view)
+    table = 'song_url' if get_db_schema_version(db_conn) == 2 \
+        else 'songs_urls'
+    db_conn.executescript(_URL_CHANGES_SQL.format(table))
+    return db_conn.execute("SELECT nb_changes FROM url_changes").fetchone()[0]
+
+
+def get_db_schema_version(db_conn):
+    """Return the version of the schema of a music database.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    version : int
+        2 for the `SQL schema file music_v2.sql`_ and 1 for the `SQL schema
+        file music.sql`_ (which doesn't set the ``user_version`` pragma).
+
+    """
+    return db_conn.execute("PRAGMA user_version").fetchone()[0] or 1
+
+
+def has_lyrics_fts(db_conn):
+    """Check if a music database has a full-text index of its songs.
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    bool
+        True if the table `lyrics_fts` exists, False otherwise.
+
+    """
+    return db_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND "
+        "name='lyrics_fts'").fetchone() is not None
+
+
+def rebuild_lyrics_fts(db_conn):
+    """Rebuild the full-text index of the songs from the `songs` table.
+
+    It is needed for a database whose songs were modified while the triggers
+    didn't exist or after a `VACUUM` (which can renumber the rowids of the
+    songs).
+
+    Parameters
+    ----------
+    db_conn : sqlite3.Connection
+        The connection to the music database.
+
+    Returns
+    -------
+    nb_songs : int
+        Number of songs indexed.
+
+    """
+    with db_conn:
+        db_conn.execute("INSERT INTO lyrics_fts(lyrics_fts) VALUES('rebuild')")
+    return db_conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+
 def get_backup_cfg_filepath(cfg_type):
     """TODO
 
@@ -130,10 +477,23 @@ def get_data_filepath(file_type):
       setup a lyrics scraper.
     - **schema**: refers to the `SQL schema file music.sql`_ used for creating the SQLite
       database which stores the scraped data.
+    - **schema_v2**: refers to the `SQL schema file music_v2.sql`_, the
+      version 2 of the database schema with integer keys.
+    - **fts_schema**: refers to the `SQL schema file lyrics_fts.sql`_ used for
+      creating the full-text index of the songs in the database.
+    - **fts_schema_v2**: refers to the same file as **fts_schema** but for a
+      version 2 database.
+    - **fts_temp**: refers to the `SQL file lyrics_fts_temp.sql`_ defining the
+      temporary triggers that index the compressed lyrics.
+    - **fts_temp_v2**: refers to the same file as **fts_temp** but for a
+      version 2 database.
+    - **profiles**: refers to the `extraction profiles file
+      azlyrics_profiles.yaml`_ which describes where the data is found on the
+      azlyrics webpages.
 
     Parameters
     ----------
-    file_type : str, {'default_log', 'default_main', 'log', 'main', 'schema'}
+    file_type : str, {'default_log', 'default_main', 'log', 'main', 'schema', 'schema_v2', 'fts_schema', 'fts_schema_v2', 'fts_temp', 'fts_temp_v2', 'profiles'}
         The type of data file for which we want the path.
 
     Returns
@@ -145,19 +505,34 @@ def get_data_filepath(file_type):
     ------
     AssertionError
         Raised if the wrong type of data file is given to the function. Only
-        {'default_log', 'default_main', 'log', 'main', 'schema'} are accepted
-        for `file_type`.
+        {'default_log', 'default_main', 'log', 'main', 'schema', 'schema_v2',
+        'fts_schema', 'fts_schema_v2', 'fts_temp', 'fts_temp_v2', 'profiles'}
+        are accepted for `file_type`.
 
     """
     # TODO: explain
     valid_file_types = list(_data_filenames.user_cfg.keys()) \
         + list(_data_filenames.default_cfg.keys())
-    valid_file_types.append("schema")
+    valid_file_types.extend(["schema", "schema_v2", "fts_schema",
+                             "fts_schema_v2", "fts_temp", "fts_temp_v2",
+                             "profiles"])
     assert file_type in valid_file_types, \
         "Wrong type of data file: '{}' (choose from {})".format(
             file_type, ", ".join(valid_file_types))
     if file_type == 'schema':
         filename = _data_filenames.schema
+    elif file_type == 'schema_v2':
+        filename = _data_filenames.schema_v2
+    elif file_type == 'fts_schema':
+        filename = _data_filenames.fts_schema
+    elif file_type == 'fts_schema_v2':
+        filename = _data_filenames.fts_schema_v2
+    elif file_type == 'fts_temp':
+        filename = _data_filenames.fts_temp
+    elif file_type == 'fts_temp_v2':
+        filename = _data_filenames.fts_temp_v2
+    elif file_type == 'profiles':
+        filename = _data_filenames.profiles
     elif file_type.startswith('default'):
         filename = _data_filenames.default_cfg[file_type]
     else:
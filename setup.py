@@ -42,7 +42,13 @@ setup(name='LyricsScraping',
           'requests',
           'py-common-utils @ https://github.com/raul23/py-common-utils/tarball/master'
       ],
+      extras_require={
+          'export': ['pyarrow'],
+          'parsers': ['cssselect', 'selectolax'],
+      },
       entry_points={
-          'console_scripts': ['scraper=lyrics_scraping.scripts.scraping:main']
+          'console_scripts': [
+              'scraper=lyrics_scraping.scripts.scraping:main',
+              'scraper-bench=lyrics_scraping.scripts.benchmarks:main']
       },
       zip_safe=False)
@@ -8,9 +8,11 @@ import unittest
 from logging import NullHandler
 
 from .utils import TestLyricsScraping
+import pyutils.exceptions
 from lyrics_scraping.scrapers import lyrics_scraper
 from lyrics_scraping.scrapers import azlyrics_scraper
 from lyrics_scraping.scrapers.azlyrics_scraper import AZLyricsScraper
+from lyrics_scraping.scrapers.lyrics_scraper import Lyrics
 from lyrics_scraping.utils import load_cfg
 from pyutils.genutils import get_qualname
 from pyutils.logutils import setup_logging_from_cfg
@@ -19,6 +21,40 @@ logger = logging.getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
+ARTIST_URL = "https://www.azlyrics.com/d/depechemode.html"
+# A compact artist webpage with two albums
+ARTIST_HTML = """<html><head><title>Depeche Mode Lyrics</title></head>
+<body><div id="listAlbum">
+<div class="album" id="7863">album: <b>"Speak &amp; Spell"</b> (1981)</div>
+<a href="../lyrics/depechemode/newlife.html">New Life</a><br/>
+<a href="../lyrics/depechemode/justcantgetenough.html">Just Can't Get Enough</a>
+<div class="album" id="7852">album: <b>"A Broken Frame"</b> (1982)</div>
+<a href="../lyrics/depechemode/leaveinsilence.html">Leave In Silence</a><br/>
+</div></body></html>"""
+
+
+class WebCacheStub:
+    """Web cache giving back the webpages of a dictionary instead of sending
+    HTTP requests.
+
+    The URLs of the retrieved webpages are recorded in `retrieved_urls` and
+    an :exc:`HTTP404Error` is raised for the URLs without webpage. Like with
+    an HTTP request, the fragment of a URL is ignored.
+
+    """
+
+    def __init__(self, webpages):
+        self.webpages = webpages
+        self.retrieved_urls = []
+
+    def get_webpage(self, url, params=None):
+        self.retrieved_urls.append(url)
+        webpage = self.webpages.get(url.split("#")[0])
+        if webpage is None:
+            raise pyutils.exceptions.HTTP404Error(url)
+        return webpage
+
+
 class TestScrapingScript(TestLyricsScraping):
     # TODO
     TEST_MODULE_QUALNAME = get_qualname(azlyrics_scraper)
@@ -352,6 +388,277 @@ class TestScrapingScript(TestLyricsScraping):
         self.assertTrue(scraper.webcache.response.from_cache, assert_msg)
         logger.info("Second HTTP request used cache <color>as expected</color>")
 
+    def test_select_best_result_case_1(self):
+        """Test that the search result pages are fetched lazily: the next page
+        is only fetched if no good enough match was found.
+
+        No HTTP request is sent: the search results of each page are given.
+
+        """
+        pages_results = {
+            1: [{'url': "1", 'texts': ["Old Death", "Nobody"]}],
+            2: [{'url': "2", 'texts': ["New Life", "Depeche Mode"]}],
+            3: [{'url': "3", 'texts': ["New Life", "Depeche Mode"]}]}
+        fetched_pages = []
+
+        def send_search_request(which, search_query, page=1):
+            fetched_pages.append(page)
+            return pages_results.get(page, [])
+
+        scraper = AZLyricsScraper(use_webcache=False, use_compute_cache=False,
+                                  best_match=True)
+        scraper._send_search_request = send_search_request
+        word = "New Life by Depeche Mode"
+        pages = scraper._iter_search_pages("song", word)
+        result = scraper._select_best_result("song", word, next(pages), pages)
+        self.assertEqual(result['url'], "2")
+        self.assertEqual(fetched_pages, [1, 2])
+        # No good enough match within the maximum number of pages
+        fetched_pages.clear()
+        scraper.max_search_pages = 1
+        pages = scraper._iter_search_pages("song", word)
+        result = scraper._select_best_result("song", word, next(pages), pages)
+        self.assertIsNone(result)
+        self.assertEqual(fetched_pages, [1])
+
+    def test_get_lyrics_from_direct_url_case_1(self):
+        """Test that a song is first looked up at its lyrics URL built from the
+        song title and the artist's name and only searched if the URL is not
+        found, can't be retrieved or is the one of another song.
+
+        No HTTP request is sent: the lyrics webpages and the search results
+        are given.
+
+        """
+        url = "https://www.azlyrics.com/lyrics/{}.html"
+        found_songs = {
+            url.format("depechemode/justcantgetenough"):
+                ("Just Can't Get Enough", "Depeche Mode"),
+            url.format("cure/boysdontcry"): ("Boys Don't Cry", "The Cure"),
+            url.format("depechemode/hello"): ("Hello", "Depeche Mode"),
+            url.format("depechemode/newlife"): None}
+        scraped_urls = []
+        searches = []
+
+        def scrape_lyrics_page(lyrics_url, check_url=True):
+            scraped_urls.append(lyrics_url)
+            if lyrics_url == url.format("depechemode/enjoythesilence"):
+                raise OSError("Connection reset by peer")
+            if lyrics_url not in found_songs:
+                raise pyutils.exceptions.HTTP404Error(
+                    "404 - Page not found: {}".format(lyrics_url))
+            if found_songs[lyrics_url] is None:
+                # The URL was already processed
+                return None
+            return Lyrics(*found_songs[lyrics_url], "", lyrics_url, "", "")
+
+        def send_search_request(which, search_query, page=1):
+            searches.append(search_query)
+            return []
+
+        scraper = AZLyricsScraper(use_webcache=False, use_compute_cache=False)
+        scraper._scrape_lyrics_page = scrape_lyrics_page
+        scraper._send_search_request = send_search_request
+        self.assertEqual(
+            scraper.get_song_lyrics("Just Can't Get Enough",
+                                    "Depeche Mode").lyrics_url,
+            url.format("depechemode/justcantgetenough"))
+        self.assertEqual(
+            scraper.get_song_lyrics("Boys Don't Cry", "Cure").lyrics_url,
+            url.format("cure/boysdontcry"))
+        self.assertIsNone(scraper.get_song_lyrics("Unknown", "Depeche Mode"))
+        self.assertEqual(searches, ["Unknown by Depeche Mode", "Unknown"])
+        self.assertEqual(len(scraped_urls), 3)
+        self.assertAlmostEqual(scraper.direct_url_hit_rate, 2 / 3)
+        # The URL of another song, the URL already processed and the request
+        # that failed are searched too
+        for song_title in ["Hell O", "New Life", "Enjoy The Silence"]:
+            searches.clear()
+            self.assertIsNone(scraper.get_song_lyrics(song_title,
+                                                      "Depeche Mode"))
+            self.assertEqual(searches[0],
+                             "{} by Depeche Mode".format(song_title))
+        self.assertEqual(scraper.metrics['direct_url_misses'], 3)
+        self.assertEqual(scraper.metrics['direct_url_errors'], 1)
+        # Without the artist's name, the song is searched right away
+        scraper.get_song_lyrics("New Life")
+        self.assertEqual(len(scraped_urls), 6)
+        self.assertEqual(searches[-1], "New Life")
+
+    def test_iter_lyrics_from_artist_case_1(self):
+        """Test that the songs of an artist are yielded one at a time, as soon
+        as their lyrics webpages are scraped.
+
+        No HTTP request is sent: the search results and the artist webpage are
+        given and the lyrics webpages are not scraped.
+
+        """
+        scraped_urls = []
+
+        def scrape_lyrics_page(lyrics_url, check_url=True):
+            scraped_urls.append(lyrics_url)
+            return lyrics_url
+
+        scraper = AZLyricsScraper(use_webcache=False, use_compute_cache=False)
+        scraper.webcache = WebCacheStub({ARTIST_URL: ARTIST_HTML})
+        scraper._scrape_lyrics_page = scrape_lyrics_page
+        scraper._send_search_request = lambda which, query, page=1: [
+            {'url': ARTIST_URL, 'texts': ["Depeche Mode"]}]
+        all_lyrics = scraper.iter_lyrics_from_artist("Depeche Mode")
+        self.assertEqual(scraped_urls, [])
+        self.assertEqual(
+            next(all_lyrics),
+            "https://www.azlyrics.com/lyrics/depechemode/newlife.html")
+        # Only the first song was scraped so far
+        self.assertEqual(len(scraped_urls), 1)
+        self.assertEqual(len(list(all_lyrics)), 2)
+        self.assertEqual(len(scraped_urls), 3)
+        # The years are checked before the iteration
+        with self.assertRaises(ValueError):
+            scraper.iter_lyrics_from_artist("Depeche Mode", year_after=1990,
+                                            year_before=1980)
+
+    def test_get_songs_lyrics_case_1(self):
+        """Test that the songs of a same artist are looked up in the artist's
+        webpage which is retrieved only once.
+
+        No HTTP request is sent: the artist webpage is given and the lyrics
+        webpages are not scraped.
+
+        """
+        scraped_urls = []
+
+        def scrape_lyrics_page(lyrics_url, check_url=True):
+            scraped_urls.append(lyrics_url)
+            if lyrics_url.endswith("unknownsong.html"):
+                raise pyutils.exceptions.HTTP404Error(lyrics_url)
+            return lyrics_url
+
+        scraper = AZLyricsScraper(use_webcache=False, use_compute_cache=False,
+                                  max_workers=1)
+        scraper.webcache = WebCacheStub({ARTIST_URL: ARTIST_HTML})
+        scraper._scrape_lyrics_page = scrape_lyrics_page
+        scraper._send_search_request = lambda which, query, page=1: []
+        results = scraper.get_songs_lyrics([
+            ("new life", "Depeche Mode"),
+            ("Just Cant Get Enough", "depeche mode"),
+            ("Unknown Song", "Depeche Mode"),
+            ("Leave in Silence", "Depeche Mode")])
+        self.assertEqual(
+            [result.lyrics for result in results],
+            ["https://www.azlyrics.com/lyrics/depechemode/newlife.html",
+             "https://www.azlyrics.com/lyrics/depechemode/"
+             "justcantgetenough.html",
+             None,
+             "https://www.azlyrics.com/lyrics/depechemode/leaveinsilence.html"])
+        self.assertEqual(scraper.webcache.retrieved_urls, [ARTIST_URL])
+        # The song not found in the artist webpage was then tried on its own
+        self.assertEqual(
+            scraped_urls[-1],
+            "https://www.azlyrics.com/lyrics/depechemode/unknownsong.html")
+        self.assertEqual(len(scraped_urls), 4)
+
+    def test_local_first_case_1(self):
+        """Test that an album or an artist is only resolved with the music db
+        once all the songs of its webpage were scraped, even if some of them
+        are already in the db.
+
+        No HTTP request is sent: the search results and the artist webpage are
+        given and the lyrics webpages are not scraped.
+
+        """
+        url_prefix = "https://www.azlyrics.com/lyrics/depechemode/"
+        all_lyrics = [
+            Lyrics("New Life", "Depeche Mode", "Speak & Spell",
+                   url_prefix + "newlife.html", "I stand still", "1981"),
+            Lyrics("Just Can't Get Enough", "Depeche Mode", "Speak & Spell",
+                   url_prefix + "justcantgetenough.html", "When I'm with you",
+                   "1981"),
+            Lyrics("Leave In Silence", "Depeche Mode", "A Broken Frame",
+                   url_prefix + "leaveinsilence.html", "Leave in silence",
+                   "1982")]
+        for db_schema_version in [1, 2]:
+            scraped_urls = []
+            searches = []
+
+            def scrape_lyrics_page(lyrics_url, check_url=True):
+                scraped_urls.append(lyrics_url)
+                lyrics = next(lyrics for lyrics in all_lyrics
+                              if lyrics.lyrics_url == lyrics_url)
+                scraper._save_lyrics(lyrics)
+                return lyrics
+
+            def send_search_request(which, search_query, page=1):
+                searches.append(search_query)
+                if which == "album":
+                    return [{'url': ARTIST_URL + "#7863",
+                             'texts': ["Depeche Mode - Speak & Spell"]}]
+                return [{'url': ARTIST_URL, 'texts': ["Depeche Mode"]}]
+
+            db_filepath = os.path.join(
+                self.sandbox_tmpdir,
+                "music_v{}.sqlite".format(db_schema_version))
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      db_schema_version=db_schema_version,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            scraper.webcache = WebCacheStub({ARTIST_URL: ARTIST_HTML})
+            scraper._scrape_lyrics_page = scrape_lyrics_page
+            scraper._send_search_request = send_search_request
+            # Only one song of the artist is in the db
+            scraper._save_lyrics(all_lyrics[0])
+            self.assertEqual(
+                scraper.get_lyrics_from_album("Speak & Spell", "Depeche Mode"),
+                all_lyrics[:2])
+            self.assertEqual(scraped_urls, [all_lyrics[1].lyrics_url])
+            self.assertEqual(scraper.get_lyrics_from_artist("Depeche Mode"),
+                             all_lyrics)
+            self.assertEqual(scraped_urls, [all_lyrics[1].lyrics_url,
+                                            all_lyrics[2].lyrics_url])
+            self.assertEqual(len(searches), 2)
+            # The album and the artist are now fully scraped
+            self.assertEqual(
+                scraper.get_lyrics_from_album("speak and spell",
+                                              "Depeche Mode"),
+                all_lyrics[:2])
+            self.assertEqual(
+                list(scraper.iter_lyrics_from_artist("Depeche Mode")),
+                all_lyrics)
+            self.assertEqual(len(searches), 2)
+            self.assertEqual(len(scraped_urls), 2)
+            self.assertEqual(scraper.webcache.retrieved_urls,
+                             [ARTIST_URL + "#7863", ARTIST_URL])
+            scraper.close()
+
+    def test_albums_case_1(self):
+        """Test that the compact albums of an artist webpage give back the
+        URLs and titles of their songs.
+        """
+        albums = azlyrics_scraper.Albums(
+            "Depeche Mode", "https://www.azlyrics.com/d/depechemode.html")
+        albums.update_albums("New Life", "../lyrics/depechemode/newlife.html",
+                             "Speak & Spell", 7863, 1981)
+        albums.update_albums("Leave In Silence",
+                             "../lyrics/depechemode/leaveinsilence.html",
+                             "A Broken Frame", 7852, 1982)
+        albums.update_albums("Dreaming Of Me",
+                             "../lyrics/depechemode/dreamingofme.html",
+                             "Speak & Spell", 7863, 1981)
+        album_data = albums.get_albums()["Speak & Spell"]
+        self.assertEqual((album_data.album_id, album_data.album_year),
+                         (7863, 1981))
+        expected_songs = [
+            ("https://www.azlyrics.com/lyrics/depechemode/newlife.html",
+             "New Life"),
+            ("https://www.azlyrics.com/lyrics/depechemode/dreamingofme.html",
+             "Dreaming Of Me")]
+        self.assertEqual(list(album_data.songs), expected_songs)
+        self.assertEqual(album_data.songs[-1], expected_songs[-1])
+        self.assertEqual(album_data.songs[:1], expected_songs[:1])
+        self.assertEqual(
+            albums.get_songs_from_album_id(7852).songs[0][1],
+            "Leave In Silence")
+
     def check_bulk_lyrics(self, bulk_lyrics, meth_params=None,
                           expected_nb_songs=None, which_assert="assertTrue",
                           log_lyrics_msg=False, log_final_msg=True):
@@ -410,7 +717,7 @@ class TestScrapingScript(TestLyricsScraping):
                         "<color>as expected</color>")
         else:
             assert_method = self.__getattribute__(which_assert)
-            for attr_name, attr_value in lyrics.__dict__.items():
+            for attr_name, attr_value in lyrics._asdict().items():
                 assert_msg = "{} not found".format(attr_name)
                 self.assertTrue(attr_value, assert_msg)
                 if attrs_to_check and attrs_to_check.get(attr_name):
@@ -0,0 +1,65 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.bloom`
+"""
+
+import logging
+import os
+import unittest
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping import bloom
+from lyrics_scraping.bloom import BloomFilter
+from pyutils.genutils import get_qualname
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+URL = "https://www.azlyrics.com/lyrics/band/song{}.html"
+
+
+class TestBloom(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(bloom)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    def test_bloom_filter_case_1(self):
+        """Test that the added strings are always found and that the
+        false-positive rate is close to the wanted one.
+        """
+        urls = BloomFilter(capacity=10000, error_rate=0.01)
+        urls.update(URL.format(i) for i in range(10000))
+        self.assertEqual(len(urls), 10000)
+        for i in range(10000):
+            self.assertIn(URL.format(i), urls)
+        nb_false_positives = sum(URL.format(i) in urls
+                                 for i in range(10000, 30000))
+        self.assertLess(nb_false_positives / 20000, 0.02)
+        # About 1.2 bytes per string
+        self.assertLess(urls.nb_bytes, 13000)
+
+    def test_bloom_filter_case_2(self):
+        """Test that a saved filter is loaded back unchanged and that an
+        invalid file raises a ValueError.
+        """
+        filepath = os.path.join(self.sandbox_tmpdir, "urls.bloom")
+        urls = BloomFilter(capacity=1000)
+        urls.update(URL.format(i) for i in range(100))
+        urls.tag = 42
+        urls.save(filepath)
+        loaded_urls = BloomFilter.load(filepath)
+        self.assertEqual(loaded_urls.tag, 42)
+        self.assertEqual(len(loaded_urls), 100)
+        self.assertEqual(loaded_urls.nb_bytes, urls.nb_bytes)
+        self.assertIn(URL.format(0), loaded_urls)
+        with open(filepath, "r+b") as f:
+            f.truncate(100)
+        with self.assertRaises(ValueError):
+            BloomFilter.load(filepath)
+        with self.assertRaises(ValueError):
+            BloomFilter(capacity=1000, error_rate=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
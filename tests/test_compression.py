@@ -0,0 +1,166 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.compression`
+
+The lyrics are saved directly in a music database (no HTTP request is sent)
+and then compressed.
+
+"""
+
+import logging
+import os
+import sqlite3
+import unittest
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping import compression
+from lyrics_scraping.compression import (
+    LyricsCodec, compress_db_lyrics, train_zdict)
+from lyrics_scraping.migration import migrate_db
+from lyrics_scraping.scrapers import lyrics_scraper
+from lyrics_scraping.scrapers.azlyrics_scraper import AZLyricsScraper
+from lyrics_scraping.scrapers.lyrics_scraper import Lyrics
+from pyutils.genutils import get_qualname
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+CHORUS = "Just can't get enough\nJust can't get enough\n"
+SONGS = [
+    ("New Life", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/newlife.html",
+     "I stand still stepping on a shady street\n" + CHORUS * 3, "1981"),
+    ("Just Can't Get Enough", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/justcantgetenough.html",
+     "When I'm with you baby\n" + CHORUS * 4, "1981"),
+    ("Leave In Silence", "Depeche Mode", "A Broken Frame",
+     "https://www.azlyrics.com/lyrics/depechemode/leaveinsilence.html",
+     "Leave in silence\n" + CHORUS, "1982"),
+]
+
+
+class TestCompression(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(compression)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    @classmethod
+    def setUpClass(cls):
+        """TODO
+        """
+        super().setUpClass()
+        # We will take charge of setting logging for lyrics_scraper
+        lyrics_scraper._SETUP_LOGGING = False
+
+    def setUp(self):
+        """Set the path of the music database of the test.
+        """
+        self.db_filepath = os.path.join(
+            self.sandbox_tmpdir, "{}.sqlite".format(self._testMethodName))
+
+    def _get_stored_lyrics(self, db_filepath):
+        """Return the lyrics as stored in the songs of a database.
+        """
+        db_conn = sqlite3.connect(db_filepath)
+        try:
+            return [row[0] for row in db_conn.execute(
+                "SELECT lyrics FROM songs ORDER BY rowid")]
+        finally:
+            db_conn.close()
+
+    def test_lyrics_codec_case_1(self):
+        """Test that the lyrics are compressed and decompressed with and
+        without a dictionary.
+        """
+        zdict = train_zdict([song[4] for song in SONGS])
+        self.assertIn(b"Just can't get enough", zdict)
+        codec = LyricsCodec()
+        codec_with_zdict = LyricsCodec({1: zdict}, 1)
+        lyrics = SONGS[2][4]
+        value = codec.compress(lyrics)
+        value_with_zdict = codec_with_zdict.compress(lyrics)
+        self.assertLess(len(value_with_zdict), len(value))
+        self.assertEqual(codec.decompress(value), lyrics)
+        self.assertEqual(codec_with_zdict.decompress(value_with_zdict), lyrics)
+        # The text and NULL are returned as is
+        self.assertEqual(codec.decompress(lyrics), lyrics)
+        self.assertIsNone(codec.decompress(None))
+        with self.assertRaises(ValueError):
+            codec.decompress(value_with_zdict)
+        with self.assertRaises(ValueError):
+            codec.decompress(b"\x01\x00\x00garbage")
+
+    def test_compress_lyrics_case_1(self):
+        """Test that the lyrics inserted by a scraper are compressed and read
+        back as text, including by the full-text index.
+        """
+        scraper = AZLyricsScraper(db_filepath=self.db_filepath, use_fts=True,
+                                  compress_lyrics=True, use_db_writer=True,
+                                  use_webcache=False, use_compute_cache=False)
+        for song in SONGS:
+            scraper._save_lyrics(Lyrics(*song))
+        album = scraper._get_lyrics_from_db("album", "Speak & Spell",
+                                            "Depeche Mode")
+        self.assertEqual(list(album), [Lyrics(*song) for song in SONGS[:2]])
+        self.assertEqual(
+            scraper._select_lyrics_from_urls([SONGS[2][3]]),
+            {SONGS[2][3]: Lyrics(*SONGS[2])})
+        hits = scraper.search_lyrics("silence")
+        self.assertEqual(len(hits), 1)
+        self.assertTrue(hits[0].snippet.startswith("Leave in [silence]\n"))
+        scraper.close()
+        self.assertTrue(all(isinstance(value, bytes)
+                            for value in self._get_stored_lyrics(
+                                self.db_filepath)))
+
+    def test_compress_db_lyrics_case_1(self):
+        """Test that the lyrics of an existing database are compressed with a
+        trained dictionary, migrated and then decompressed.
+        """
+        scraper = AZLyricsScraper(db_filepath=self.db_filepath, use_fts=True,
+                                  use_webcache=False, use_compute_cache=False)
+        for song in SONGS:
+            scraper._save_lyrics(Lyrics(*song))
+        scraper.close()
+        stats = compress_db_lyrics(self.db_filepath)
+        self.assertEqual(stats['songs'], 3)
+        self.assertLess(stats['lyrics_bytes_after'],
+                        stats['lyrics_bytes_before'])
+        values = self._get_stored_lyrics(self.db_filepath)
+        self.assertTrue(all(isinstance(value, bytes) for value in values))
+        # The songs can still be modified without lyrics_text() as long as
+        # their lyrics are not changed
+        db_conn = sqlite3.connect(self.db_filepath)
+        with db_conn:
+            db_conn.execute("UPDATE songs SET year='1981' WHERE "
+                            "song_title='Leave In Silence'")
+            db_conn.execute("UPDATE songs SET year='1982' WHERE "
+                            "song_title='Leave In Silence'")
+        db_conn.close()
+        # The compressed lyrics and their dictionary are migrated
+        v2_db_filepath = os.path.join(self.sandbox_tmpdir, "music_v2.sqlite")
+        counts = migrate_db(self.db_filepath, v2_db_filepath)
+        self.assertEqual(counts['lyrics_zdict'], 1)
+        for db_filepath in [self.db_filepath, v2_db_filepath]:
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      compress_lyrics=True, use_fts=True,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            self.assertEqual(scraper.lyrics_codec.zdict_id, 1)
+            self.assertEqual(
+                scraper._select_lyrics_from_urls([SONGS[0][3]]),
+                {SONGS[0][3]: Lyrics(*SONGS[0])})
+            self.assertEqual(
+                [hit.song_title for hit in scraper.search_lyrics("stepping")],
+                ["New Life"])
+            scraper.close()
+        stats = compress_db_lyrics(self.db_filepath, compress=False)
+        self.assertEqual(stats['lyrics_bytes_after'],
+                         sum(len(song[4]) for song in SONGS))
+        self.assertEqual(self._get_stored_lyrics(self.db_filepath),
+                         [song[4] for song in SONGS])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.export`
+
+The scraped data and the music database are filled directly (no HTTP request
+is sent) and then exported to Parquet files that are read back.
+
+"""
+
+import logging
+import os
+import unittest
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping import export
+from lyrics_scraping.export import COLUMNS, export_parquet
+from lyrics_scraping.scrapers import lyrics_scraper
+from lyrics_scraping.scrapers.azlyrics_scraper import AZLyricsScraper
+from lyrics_scraping.scrapers.lyrics_scraper import Lyrics
+from pyutils.genutils import get_qualname
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+SONGS = [
+    ("New Life", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/newlife.html",
+     "I stand still stepping on a shady street", "1981"),
+    ("Just Can't Get Enough", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/justcantgetenough.html",
+     "When I'm with you baby", "1981"),
+    ("Leave In Silence", "Depeche Mode", "A Broken Frame",
+     "https://www.azlyrics.com/lyrics/depechemode/leaveinsilence.html",
+     "Leave in silence", "1982"),
+]
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestExport(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(export)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    @classmethod
+    def setUpClass(cls):
+        """TODO
+        """
+        super().setUpClass()
+        # We will take charge of setting logging for lyrics_scraper
+        lyrics_scraper._SETUP_LOGGING = False
+
+    def setUp(self):
+        """Create a music database filled with a few songs.
+        """
+        self.db_filepath = os.path.join(
+            self.sandbox_tmpdir, "{}.sqlite".format(self._testMethodName))
+        self.scraper = AZLyricsScraper(db_filepath=self.db_filepath,
+                                       use_webcache=False,
+                                       use_compute_cache=False)
+        for song in SONGS:
+            self.scraper._save_lyrics(Lyrics(*song))
+        # The db is read with its own connection
+        self.scraper.flush()
+
+    def check_songs_table(self, filepath):
+        """Check the rows and the dictionary-encoded columns of an exported
+        songs table.
+        """
+        table = pyarrow.parquet.read_table(filepath)
+        self.assertEqual(tuple(table.column_names), COLUMNS['songs'])
+        self.assertEqual(
+            sorted(zip(*(table.column(c).to_pylist()
+                         for c in COLUMNS['songs']))),
+            sorted(SONGS))
+        for column in ['artist_name', 'album_title', 'year']:
+            self.assertTrue(pyarrow.types.is_dictionary(
+                table.schema.field(column).type), column)
+        self.assertTrue(pyarrow.types.is_large_string(
+            table.schema.field('lyrics').type))
+
+    def test_export_parquet_case_1(self):
+        """Test that the scraped data is exported in several record batches and
+        read back unchanged.
+        """
+        dirpath = os.path.join(self.sandbox_tmpdir, self._testMethodName)
+        filepaths = export_parquet(
+            dirpath, scraped_data=self.scraper.get_scraped_data(),
+            batch_size=2)
+        self.assertEqual(sorted(filepaths), ['albums', 'artists', 'songs'])
+        self.check_songs_table(filepaths['songs'])
+        albums = pyarrow.parquet.read_table(filepaths['albums'])
+        self.assertEqual(albums.num_rows, 2)
+        artists = pyarrow.parquet.read_table(filepaths['artists'])
+        self.assertEqual(artists.column('artist_name').to_pylist(),
+                         ["Depeche Mode"])
+
+    def test_export_parquet_case_2(self):
+        """Test that the music database is exported table by table.
+        """
+        dirpath = os.path.join(self.sandbox_tmpdir, self._testMethodName)
+        filepaths = export_parquet(dirpath, db_filepath=self.db_filepath,
+                                   tables=['songs'], batch_size=2)
+        self.assertEqual(list(filepaths), ['songs'])
+        self.check_songs_table(filepaths['songs'])
+
+    def test_export_parquet_case_3(self):
+        """Test that the songs with the same title by two artists are exported
+        with their own URLs from a version 2 db and without URL from a version
+        1 db.
+        """
+        songs = [
+            ("Hello", "Adele", "25",
+             "https://www.azlyrics.com/lyrics/adele/hello.html",
+             "Hello, it's me", "2015"),
+            ("Hello", "Lionel Richie", "Can't Slow Down",
+             "https://www.azlyrics.com/lyrics/lionelrichie/hello.html",
+             "Hello, is it me you're looking for?", "1983")]
+        for db_schema_version in [1, 2]:
+            db_filepath = os.path.join(
+                self.sandbox_tmpdir, "{}_v{}.sqlite".format(
+                    self._testMethodName, db_schema_version))
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      db_schema_version=db_schema_version,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            for song in SONGS + songs:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper.close()
+            dirpath = os.path.join(self.sandbox_tmpdir, "{}_v{}".format(
+                self._testMethodName, db_schema_version))
+            filepaths = export_parquet(dirpath, db_filepath=db_filepath,
+                                       tables=['songs'])
+            table = pyarrow.parquet.read_table(filepaths['songs'])
+            urls = dict(zip(table.column('artist_name').to_pylist(),
+                            table.column('lyrics_url').to_pylist()))
+            if db_schema_version == 2:
+                self.assertEqual(urls["Adele"], songs[0][3])
+                self.assertEqual(urls["Lionel Richie"], songs[1][3])
+            else:
+                self.assertIsNone(urls["Adele"])
+                self.assertIsNone(urls["Lionel Richie"])
+            # The songs with a unique title keep their URL
+            self.assertEqual(table.num_rows, len(SONGS) + 2)
+            self.assertIn(SONGS[0][3], table.column('lyrics_url').to_pylist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,687 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.scrapers.lyrics_scraper`
+
+The music database is filled directly (no HTTP request is sent).
+
+"""
+
+import inspect
+import logging
+import os
+import sqlite3
+import unittest
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping.scrapers import lyrics_scraper
+from lyrics_scraping.scrapers.azlyrics_scraper import AZLyricsScraper
+from lyrics_scraping.scrapers.lyrics_scraper import (
+    Lyrics, LyricsScraper, ScrapedRecords)
+from lyrics_scraping.utils import load_cfg
+from pyutils.genutils import get_qualname
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+SONGS = [
+    ("New Life", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/newlife.html",
+     "I stand still stepping on a shady street", "1981"),
+    ("Just Can't Get Enough", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/justcantgetenough.html",
+     "When I'm with you baby", "1981"),
+    ("Leave In Silence", "Depeche Mode", "A Broken Frame",
+     "https://www.azlyrics.com/lyrics/depechemode/leaveinsilence.html",
+     "Leave in silence", "1982"),
+]
+
+
+class TestLyricsScraper(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(lyrics_scraper)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    @classmethod
+    def setUpClass(cls):
+        """TODO
+        """
+        super().setUpClass()
+        # We will take charge of setting logging for lyrics_scraper
+        lyrics_scraper._SETUP_LOGGING = False
+
+    def setUp(self):
+        """Create a music database filled with a few songs.
+        """
+        # NOTE: one db per test since overwriting a db pauses the program
+        db_filepath = os.path.join(self.sandbox_tmpdir,
+                                   "{}.sqlite".format(self._testMethodName))
+        self.scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                       use_webcache=False,
+                                       use_compute_cache=False)
+        for song in SONGS:
+            self.scraper._save_lyrics(Lyrics(*song))
+
+    def tearDown(self):
+        self.scraper.db_conn.close()
+
+    def test_get_lyrics_from_db_case_1(self):
+        """Test that a song is resolved with the music db from an exact and a
+        normalized title and artist's name.
+        """
+        for song_title, artist_name in [("New Life", "Depeche Mode"),
+                                        ("new life!", "DEPECHE MODE"),
+                                        ("Just Cant Get Enough", None)]:
+            lyrics = self.scraper._get_lyrics_from_db("song", song_title,
+                                                      artist_name)
+            self.assertIsNotNone(lyrics, song_title)
+            self.assertIn(lyrics.lyrics_url, [song[3] for song in SONGS])
+        self.assertIsNone(
+            self.scraper._get_lyrics_from_db("song", "New Life", "Other Band"))
+
+    def test_get_lyrics_from_db_case_2(self):
+        """Test that the songs of an album and an artist are resolved with the
+        music db along with the filters on the year and number of songs.
+        """
+        album = self.scraper._get_lyrics_from_db("album", "Speak and Spell",
+                                                 "Depeche Mode")
+        self.assertEqual([lyrics.song_title for lyrics in album],
+                         ["New Life", "Just Can't Get Enough"])
+        artist = self.scraper._get_lyrics_from_db("artist", None,
+                                                  "depeche mode",
+                                                  year_after=1982)
+        self.assertEqual([lyrics.song_title for lyrics in artist],
+                         ["Leave In Silence"])
+        artist = self.scraper._get_lyrics_from_db("artist", None,
+                                                  "Depeche Mode", max_songs=2,
+                                                  choose_random=True)
+        self.assertEqual(len(artist), 2)
+
+    def test_get_lyrics_from_db_case_3(self):
+        """Test that the songs with the same title by two artists are read
+        from a version 2 db with their own URLs.
+        """
+        db_filepath = os.path.join(self.sandbox_tmpdir, "music_v2.sqlite")
+        scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                  db_schema_version=2, use_webcache=False,
+                                  use_compute_cache=False)
+        songs = [
+            ("Hello", "Adele", "25",
+             "https://www.azlyrics.com/lyrics/adele/hello.html",
+             "Hello, it's me", "2015"),
+            ("Hello", "Lionel Richie", "Can't Slow Down",
+             "https://www.azlyrics.com/lyrics/lionelrichie/hello.html",
+             "Hello, is it me you're looking for?", "1983")]
+        # The songs and their URLs are inserted in the same flush
+        for song in songs:
+            scraper._save_lyrics(Lyrics(*song))
+        for song in songs:
+            self.assertEqual(
+                scraper._get_lyrics_from_db("song", "Hello", song[1]),
+                Lyrics(*song))
+        self.assertEqual(
+            scraper._select_lyrics_from_urls([song[3] for song in songs]),
+            {song[3]: Lyrics(*song) for song in songs})
+        scraper.db_conn.close()
+
+    def test_get_lyrics_from_db_case_4(self):
+        """Test that the normalized names of a db without them are saved when
+        it is opened so that its songs are still resolved from normalized
+        titles and artist's names.
+        """
+        self.scraper.flush()
+        self.scraper.db_conn.close()
+        db_conn = sqlite3.connect(self.scraper.db_filepath)
+        db_conn.execute("DROP TABLE name_keys")
+        db_conn.commit()
+        db_conn.close()
+        scraper = AZLyricsScraper(db_filepath=self.scraper.db_filepath,
+                                  use_webcache=False, use_compute_cache=False)
+        lyrics = scraper._get_lyrics_from_db("song", "new life!",
+                                             "DEPECHE MODE")
+        self.assertIsNotNone(lyrics)
+        self.assertEqual(lyrics.song_title, "New Life")
+        self.assertEqual(scraper._select_names("speak and spell"),
+                         ["Speak & Spell"])
+        scraper.db_conn.close()
+
+    def test_get_songs_lyrics_case_1(self):
+        """Test that a batch of songs is deduplicated, resolved concurrently
+        and returned in the input order, with the errors of the failed songs
+        (e.g. an unhashable option).
+        """
+        songs = [("New Life", "Depeche Mode"),
+                 {'title': "Leave In Silence", 'artist': "Depeche Mode"},
+                 ("new life!", "DEPECHE MODE"),
+                 ("Unknown Song", "Unknown Band"),
+                 "Just Cant Get Enough",
+                 42,
+                 "just can't get enough!",
+                 ("Just Cant Get Enough",),
+                 {'title': "New Life", 'artist': "Depeche Mode",
+                  'tags': ["synth-pop"]}]
+        resolved = []
+        get_song_lyrics = self.scraper.get_song_lyrics
+
+        def spy_get_song_lyrics(song_title, artist_name=None):
+            resolved.append((song_title, artist_name))
+            return get_song_lyrics(song_title, artist_name)
+
+        self.scraper.get_song_lyrics = spy_get_song_lyrics
+        # Each song is resolved on its own
+        self.scraper.group_songs_by_artist = False
+        results = self.scraper.get_songs_lyrics(songs)
+        self.assertEqual([result.query for result in results], songs)
+        self.assertEqual(
+            [result.lyrics.song_title if result.lyrics else None
+             for result in results],
+            ["New Life", "Leave In Silence", "New Life", None,
+             "Just Can't Get Enough", None, "Just Can't Get Enough",
+             "Just Can't Get Enough", None])
+        self.assertEqual([result.error is None for result in results],
+                         [True, True, True, False, True, False, True, True,
+                          False])
+        self.assertIsInstance(results[-1].error, TypeError)
+        # The duplicated songs, with or without artist, were resolved only
+        # once
+        self.assertEqual(len(resolved), 4)
+
+    def test_flush_case_1(self):
+        """Test that the saved rows are inserted in the db at once and that
+        the rows already in the db are ignored.
+        """
+        self.scraper.flush()
+        self.assertEqual(self.scraper.metrics['db_flushes'], 1)
+        db_conn = sqlite3.connect(self.scraper.db_filepath)
+        self.assertEqual(
+            db_conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0],
+            len(SONGS))
+        # The songs are saved again along with a new one
+        self.scraper.insert_batch_size = 25
+        for song in SONGS:
+            self.scraper._save_lyrics(Lyrics(*song))
+        new_song = ("Boys Say Go!", "Depeche Mode", "Speak & Spell",
+                    "https://www.azlyrics.com/lyrics/depechemode/boyssaygo.html",
+                    "You say you want my love", "1981")
+        self.scraper._save_lyrics(Lyrics(*new_song))
+        # Not yet in the db
+        self.assertEqual(
+            db_conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0],
+            len(SONGS))
+        # 4 songs with their artist, album, URL and normalized names
+        self.assertEqual(self.scraper.flush(), 20)
+        self.assertEqual(self.scraper.flush(), 0)
+        self.assertEqual(self.scraper.metrics['db_flushes'], 2)
+        self.assertEqual(
+            db_conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0],
+            len(SONGS) + 1)
+        db_conn.close()
+
+    def test_flush_case_2(self):
+        """Test that a lookup in the db only flushes the pending rows if it
+        needs one of them, with and without a db writer thread.
+        """
+        self.scraper.flush()
+        new_song = ("Boys Say Go!", "Depeche Mode", "Speak & Spell",
+                    "https://www.azlyrics.com/lyrics/depechemode/"
+                    "boyssaygo.html", "You say you want my love", "1981")
+        for use_db_writer in [False, True]:
+            scraper = AZLyricsScraper(db_filepath=self.scraper.db_filepath,
+                                      overwrite_db=False,
+                                      use_db_writer=use_db_writer,
+                                      insert_flush_interval=60,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            scraper._save_lyrics(Lyrics(*new_song))
+            # The songs already in the db are found without a flush
+            self.assertEqual(
+                scraper._get_lyrics_from_db("song", "New Life",
+                                            "Depeche Mode"),
+                Lyrics(*SONGS[0]))
+            self.assertIsNone(
+                scraper._get_lyrics_from_db("song", "Unknown Song"))
+            self.assertEqual(
+                scraper._select_lyrics_from_urls([SONGS[1][3]]),
+                {SONGS[1][3]: Lyrics(*SONGS[1])})
+            self.assertEqual(scraper.metrics['db_flushes'], 0)
+            self.assertEqual(scraper.metrics['db_lookup_flushes'], 0)
+            self.assertEqual(
+                scraper._get_lyrics_from_db("song", "boys say go",
+                                            "depeche mode"),
+                Lyrics(*new_song))
+            self.assertEqual(scraper.metrics['db_flushes'], 1)
+            self.assertEqual(scraper.metrics['db_lookup_flushes'], 1)
+            if use_db_writer:
+                # The rows queued to the writer are waited on if needed
+                other_song = ("Sometimes", "Depeche Mode",
+                              "Black Celebration",
+                              "https://www.azlyrics.com/lyrics/depechemode/"
+                              "sometimes.html", "Sometimes", "1986")
+                scraper._save_lyrics(Lyrics(*other_song))
+                scraper.flush(wait=False)
+                self.assertEqual(
+                    scraper._get_lyrics_from_db("song", "Sometimes"),
+                    Lyrics(*other_song))
+            scraper.close()
+
+    def test_upsert_case_1(self):
+        """Test that the rows already in the db are left untouched unless
+        their content changed and the tables can be updated, for both
+        versions of the db schema.
+        """
+        self.scraper.flush()
+        changed_song = SONGS[2][:4] + ("Leave in silence, silence",) \
+            + SONGS[2][5:]
+        for db_schema_version in [1, 2]:
+            db_filepath = os.path.join(
+                self.sandbox_tmpdir, "{}_v{}.sqlite".format(
+                    self._testMethodName, db_schema_version))
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      db_schema_version=db_schema_version,
+                                      use_fts=True, use_webcache=False,
+                                      use_compute_cache=False)
+            for song in SONGS:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper.flush()
+            # The artist, the 2 albums, the 3 songs, their URLs and the 6
+            # normalized names
+            self.assertEqual(scraper.metrics['db_changed_rows'], 15)
+            # Saving the same songs again doesn't write anything
+            for song in SONGS:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper._save_lyrics(Lyrics(*changed_song))
+            scraper.flush()
+            self.assertEqual(scraper.metrics['db_changed_rows'], 15)
+            self.assertEqual(scraper._select_lyrics_from_urls([SONGS[2][3]]),
+                             {SONGS[2][3]: Lyrics(*SONGS[2])})
+            scraper.close()
+            # Only the changed song is updated
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      update_tables=True, use_fts=True,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            for song in SONGS[:2] + [changed_song]:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper.flush()
+            self.assertEqual(scraper.metrics['db_changed_rows'], 1)
+            self.assertEqual(scraper._select_lyrics_from_urls([SONGS[2][3]]),
+                             {SONGS[2][3]: Lyrics(*changed_song)})
+            # The full-text index is updated too
+            self.assertEqual(
+                [hit.snippet for hit in scraper.search_lyrics("silence")],
+                ["Leave in [silence], [silence]"])
+            self.assertEqual(scraper._execute_sql(
+                "SELECT COUNT(*) FROM songs", ())[0][0], len(SONGS))
+            scraper.close()
+
+    def test_upsert_case_2(self):
+        """Test that a song without album is saved with an empty album title
+        along with its URL and that a song without artist is skipped without
+        failing the other rows of its batch, for both versions of the db
+        schema.
+        """
+        no_album_song = ("Ghost Song", "Depeche Mode", None,
+                         "https://www.azlyrics.com/lyrics/depechemode/"
+                         "ghostsong.html", "No album", None)
+        no_artist_song = ("Orphan Song", None, "Speak & Spell",
+                          "https://www.azlyrics.com/lyrics/orphansong.html",
+                          "No artist", "1981")
+        for db_schema_version in [1, 2]:
+            db_filepath = os.path.join(
+                self.sandbox_tmpdir, "{}_v{}.sqlite".format(
+                    self._testMethodName, db_schema_version))
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      db_schema_version=db_schema_version,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            for song in [no_album_song, no_artist_song] + SONGS:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper.flush()
+            self.assertEqual(
+                scraper._select_lyrics_from_urls([no_album_song[3],
+                                                  no_artist_song[3]]),
+                {no_album_song[3]: Lyrics(*no_album_song[:2] + ("",) +
+                                          no_album_song[3:])})
+            self.assertEqual(scraper._execute_sql(
+                "SELECT COUNT(*) FROM songs", ())[0][0], len(SONGS) + 1)
+            self.assertEqual(scraper._execute_sql(
+                "SELECT COUNT(*) FROM songs_urls", ())[0][0], len(SONGS) + 1)
+            scraper.close()
+
+    def test_db_writer_case_1(self):
+        """Test that the rows are inserted by the db writer thread, that the
+        commit callbacks are called once the rows are committed and that a
+        failed batch is reported.
+        """
+        self.scraper.flush()
+        scraper = AZLyricsScraper(db_filepath=self.scraper.db_filepath,
+                                  overwrite_db=False, use_db_writer=True,
+                                  insert_batch_size=4, use_webcache=False,
+                                  use_compute_cache=False)
+        errors = []
+        songs = [("Song {}".format(i), "Band", "Album",
+                  "https://www.azlyrics.com/lyrics/band/song{}.html".format(i),
+                  "Lyrics {}".format(i), "2000") for i in range(10)]
+        for song in songs:
+            scraper._save_lyrics(Lyrics(*song))
+        scraper.add_commit_callback(errors.append)
+        scraper.flush()
+        self.assertEqual(errors, [None])
+        self.assertEqual(scraper.db_queue_depth, 0)
+        self.assertGreaterEqual(scraper.metrics['db_writer_max_queue_depth'],
+                                1)
+        # The song, artist, album, URL and normalized names of each song
+        self.assertEqual(scraper.metrics['db_flushed_rows'], 50)
+        db_conn = sqlite3.connect(scraper.db_filepath)
+        self.assertEqual(
+            db_conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0],
+            len(SONGS) + len(songs))
+        # The batch fails since the table doesn't exist anymore
+        db_conn.execute("DROP TABLE songs_urls")
+        db_conn.close()
+        scraper._save_lyrics(Lyrics("Song 10", *songs[0][1:]))
+        scraper.add_commit_callback(errors.append)
+        with self.assertRaises(sqlite3.OperationalError):
+            scraper.flush()
+        self.assertIsInstance(errors[1], sqlite3.OperationalError)
+        scraper.db_writer.close()
+        scraper.db_conn.close()
+
+    def test_close_case_1(self):
+        """Test that exiting the scraper inserts the pending rows and closes
+        the db even if an exception was raised, and that the scraper
+        reconnects if it is used again.
+        """
+        self.scraper.flush()
+        new_song = ("Boys Say Go!", "Depeche Mode", "Speak & Spell",
+                    "https://www.azlyrics.com/lyrics/depechemode/"
+                    "boyssaygo.html", "You say you want my love", "1981")
+        with AZLyricsScraper(db_filepath=self.scraper.db_filepath,
+                             overwrite_db=False, use_webcache=False,
+                             use_compute_cache=False) as scraper:
+            scraper._save_lyrics(Lyrics(*new_song))
+            raise KeyError("Unknown song")
+        with self.assertRaises(sqlite3.ProgrammingError):
+            scraper.db_conn.execute("SELECT 1")
+        self.assertEqual(
+            self.scraper._execute_sql("SELECT COUNT(*) FROM songs", ())[0][0],
+            len(SONGS) + 1)
+        # The closed connection is reopened
+        self.assertEqual(scraper._url_in_db(new_song[3]), 1)
+        self.assertEqual(scraper.metrics['db_reconnects'], 1)
+        scraper.close()
+
+    def test_db_profile_case_1(self):
+        """Test that the pragmas of a db profile are applied on connect and
+        that they can be overridden.
+        """
+        db_filepath = os.path.join(self.sandbox_tmpdir,
+                                   "{}.sqlite".format(self._testMethodName))
+        scraper = AZLyricsScraper(
+            db_filepath=db_filepath, db_profile="fast",
+            db_pragmas={'fast': {'cache_size': -1000}},
+            use_webcache=False, use_compute_cache=False)
+        db_conn = scraper.db_conn
+        self.assertEqual(
+            db_conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        # synchronous=NORMAL
+        self.assertEqual(
+            db_conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.assertEqual(
+            db_conn.execute("PRAGMA cache_size").fetchone()[0], -1000)
+        db_conn.close()
+        with self.assertRaises(ValueError):
+            AZLyricsScraper(db_filepath=db_filepath, db_profile="unknown",
+                            use_webcache=False, use_compute_cache=False)
+
+    def test_get_urls_to_process_case_1(self):
+        """Test that many URLs are checked against the db with one query per
+        chunk and that the lyrics of the processed ones are read back.
+        """
+        saved_urls = [song[3] for song in SONGS]
+        new_urls = ["https://www.azlyrics.com/lyrics/band/song{}.html"
+                    "".format(i) for i in range(1200)]
+        queries = []
+        self.scraper.db_conn.set_trace_callback(queries.append)
+        urls_to_process = self.scraper._get_urls_to_process(
+            saved_urls + new_urls + new_urls[:10])
+        self.assertEqual(urls_to_process, new_urls)
+        # 1203 URLs in chunks of 500 URLs
+        self.assertEqual(
+            len([sql for sql in queries if sql.startswith("SELECT")]), 3)
+        # Already processed during the session
+        self.assertEqual(self.scraper._get_urls_to_process(new_urls[:10]), [])
+        all_lyrics = self.scraper._select_lyrics_from_urls(
+            saved_urls + new_urls[:1], "depeche mode")
+        self.assertEqual(sorted(all_lyrics), sorted(saved_urls))
+        self.assertEqual(all_lyrics[SONGS[0][3]], Lyrics(*SONGS[0]))
+        self.assertEqual(
+            self.scraper._select_lyrics_from_urls(saved_urls, "Other Band"),
+            {})
+
+    def test_url_filter_case_1(self):
+        """Test that the filter of URLs is built from the db, spares the
+        lookups of the new URLs and is saved and loaded back on exit.
+        """
+        self.scraper.flush()
+        saved_urls = [song[3] for song in SONGS]
+        new_urls = ["https://www.azlyrics.com/lyrics/band/song{}.html"
+                    "".format(i) for i in range(100)]
+        kwargs = dict(db_filepath=self.scraper.db_filepath,
+                      overwrite_db=False, use_url_filter=True,
+                      use_webcache=False, use_compute_cache=False)
+        scraper = AZLyricsScraper(**kwargs)
+        self.assertEqual(len(scraper.url_filter), len(SONGS))
+        queries = []
+        scraper.db_conn.set_trace_callback(queries.append)
+        self.assertEqual(scraper._get_urls_to_process(new_urls), new_urls)
+        self.assertEqual(scraper._get_urls_to_process(saved_urls), [])
+        # Only the saved URLs (and the rare false positives) are looked up
+        self.assertEqual(
+            len([sql for sql in queries if sql.startswith("SELECT")]), 1)
+        self.assertGreater(scraper.metrics['url_filter_skips'], 90)
+        new_song = ("Boys Say Go!", "Depeche Mode", "Speak & Spell",
+                    new_urls[0], "You say you want my love", "1981")
+        scraper._save_lyrics(Lyrics(*new_song))
+        scraper.save_url_filter()
+        scraper.db_conn.close()
+        self.assertTrue(os.path.exists(scraper.url_filter_filepath))
+        scraper = AZLyricsScraper(**kwargs)
+        # Loaded from the file since it is up to date with the db
+        self.assertEqual(len(scraper.url_filter), len(SONGS) + 1)
+        self.assertIn(new_urls[0], scraper.url_filter)
+        scraper.db_conn.close()
+
+    def test_url_filter_case_2(self):
+        """Test that a saved filter of URLs is rebuilt when a URL of the db
+        is replaced by another one, e.g. from another connection, for both
+        versions of the db schema.
+        """
+        new_url = "https://www.azlyrics.com/lyrics/depechemode/newlife2.html"
+        sqls = {
+            1: ["DELETE FROM songs_urls WHERE song_url=?",
+                "INSERT INTO songs_urls (song_url, song_title) VALUES (?, "
+                "'New Life')"],
+            2: ["DELETE FROM song_url WHERE song_url=?",
+                "INSERT INTO song_url (song_url, song_id) VALUES (?, 1)"]}
+        for db_schema_version in [1, 2]:
+            db_filepath = os.path.join(
+                self.sandbox_tmpdir, "{}_v{}.sqlite".format(
+                    self._testMethodName, db_schema_version))
+            kwargs = dict(db_filepath=db_filepath, use_url_filter=True,
+                          use_webcache=False, use_compute_cache=False)
+            scraper = AZLyricsScraper(db_schema_version=db_schema_version,
+                                      **kwargs)
+            for song in SONGS:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper.save_url_filter()
+            scraper.close()
+            # The number of URLs doesn't change
+            db_conn = sqlite3.connect(db_filepath)
+            with db_conn:
+                db_conn.execute(sqls[db_schema_version][0], (SONGS[0][3],))
+                db_conn.execute(sqls[db_schema_version][1], (new_url,))
+            db_conn.close()
+            scraper = AZLyricsScraper(**kwargs)
+            self.assertEqual(len(scraper.url_filter), len(SONGS))
+            self.assertIn(new_url, scraper.url_filter)
+            scraper.close()
+
+    def test_main_cfg_case_1(self):
+        """Test that the main config doesn't opt in to the db options that
+        change the music db or how it is written, i.e. they have the default
+        values of the scraper.
+        """
+        main_cfg = load_cfg("main")
+        defaults = inspect.signature(LyricsScraper).parameters
+        for name in ['db_schema_version', 'db_profile', 'use_url_filter',
+                     'use_db_writer']:
+            self.assertEqual(main_cfg[name], defaults[name].default, name)
+
+    def test_search_lyrics_case_1(self):
+        """Test that the songs already in the db are indexed, that the new
+        ones are indexed by the triggers and that the hits are ranked.
+        """
+        self.scraper.flush()
+        with self.assertRaises(ValueError):
+            self.scraper.search_lyrics("silence")
+        scraper = AZLyricsScraper(db_filepath=self.scraper.db_filepath,
+                                  overwrite_db=False, use_fts=True,
+                                  use_webcache=False, use_compute_cache=False)
+        hits = scraper.search_lyrics("shady street")
+        self.assertEqual([hit.song_title for hit in hits], ["New Life"])
+        self.assertEqual(hits[0].lyrics_url, SONGS[0][3])
+        self.assertIn("[shady] [street]", hits[0].snippet)
+        new_song = ("Sometimes", "Depeche Mode", "Black Celebration",
+                    "https://www.azlyrics.com/lyrics/depechemode/"
+                    "sometimes.html", "Silence silence silence", "1986")
+        scraper._save_lyrics(Lyrics(*new_song))
+        hits = scraper.search_lyrics("silence")
+        # The song with the most occurrences comes first
+        self.assertEqual([hit.song_title for hit in hits],
+                         ["Sometimes", "Leave In Silence"])
+        self.assertEqual(
+            [hit.song_title for hit in scraper.search_lyrics(
+                "silence", limit=1, offset=1)], ["Leave In Silence"])
+        self.assertEqual(
+            len(scraper.search_lyrics("artist_name: depeche")), 4)
+        scraper.db_conn.close()
+
+    def test_search_lyrics_case_2(self):
+        """Test that the hits of a version 2 db have the URLs of their own
+        songs, even for the songs with the same title.
+        """
+        db_filepath = os.path.join(self.sandbox_tmpdir, "music_v2.sqlite")
+        scraper = AZLyricsScraper(db_filepath=db_filepath, use_fts=True,
+                                  db_schema_version=2, use_webcache=False,
+                                  use_compute_cache=False)
+        songs = [
+            ("Hello", "Adele", "25",
+             "https://www.azlyrics.com/lyrics/adele/hello.html",
+             "Hello, it's me", "2015"),
+            ("Hello", "Lionel Richie", "Can't Slow Down",
+             "https://www.azlyrics.com/lyrics/lionelrichie/hello.html",
+             "Hello, is it me you're looking for?", "1983")]
+        for song in songs:
+            scraper._save_lyrics(Lyrics(*song))
+        hits = scraper.search_lyrics("hello")
+        self.assertEqual(
+            sorted((hit.artist_name, hit.lyrics_url) for hit in hits),
+            [(song[1], song[3]) for song in songs])
+        scraper.db_conn.close()
+
+    def test_search_lyrics_case_3(self):
+        """Test that the songs with plain-text lyrics can be modified from a
+        connection without the SQL function lyrics_text() and that the index
+        is kept in sync, for both versions of the db schema.
+        """
+        songs_tables = {1: "songs", 2: "song"}
+        for db_schema_version in [1, 2]:
+            db_filepath = os.path.join(
+                self.sandbox_tmpdir, "{}_v{}.sqlite".format(
+                    self._testMethodName, db_schema_version))
+            scraper = AZLyricsScraper(db_filepath=db_filepath,
+                                      db_schema_version=db_schema_version,
+                                      use_fts=True, use_webcache=False,
+                                      use_compute_cache=False)
+            for song in SONGS:
+                scraper._save_lyrics(Lyrics(*song))
+            scraper.close()
+            # e.g. the sqlite3 shell
+            db_conn = sqlite3.connect(db_filepath)
+            with db_conn:
+                db_conn.execute(
+                    "UPDATE {} SET lyrics='Leave in quiet' WHERE "
+                    "song_title='Leave In Silence'".format(
+                        songs_tables[db_schema_version]))
+                db_conn.execute(
+                    "DELETE FROM {} WHERE song_title='New Life'".format(
+                        songs_tables[db_schema_version]))
+            if db_schema_version == 1:
+                # The triggers of the previous versions called lyrics_text()
+                db_conn.executescript(
+                    "DROP TRIGGER songs_fts_insert; "
+                    "CREATE TRIGGER songs_fts_insert AFTER INSERT ON songs "
+                    "BEGIN INSERT INTO lyrics_fts(rowid, lyrics) VALUES "
+                    "(new.rowid, lyrics_text(new.lyrics)); END;")
+            db_conn.close()
+            scraper = AZLyricsScraper(db_filepath=db_filepath, use_fts=True,
+                                      use_webcache=False,
+                                      use_compute_cache=False)
+            self.assertEqual(
+                [hit.song_title for hit in scraper.search_lyrics("quiet")],
+                ["Leave In Silence"])
+            self.assertEqual(scraper.search_lyrics("lyrics: silence"), [])
+            self.assertEqual(scraper.search_lyrics("shady"), [])
+            self.assertIsNone(scraper.db_conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='trigger' AND sql "
+                "LIKE '%lyrics_text(%'").fetchone())
+            scraper.close()
+
+    def test_scraped_records_case_1(self):
+        """Test that the scraped records are unique on their natural key and
+        keep their insertion order.
+        """
+        records = ScrapedRecords(3)
+        for song in SONGS:
+            self.assertTrue(records.add(song))
+        # Same song title, artist's name and album title but other lyrics
+        self.assertFalse(records.add(SONGS[0][:4] + ("Other lyrics", "1981")))
+        self.assertIn(SONGS[0][:3] + ("", "", ""), records)
+        self.assertNotIn(("New Life", "Depeche Mode", ""), records)
+        self.assertEqual(list(records), SONGS)
+        self.assertEqual(records[-1], SONGS[-1])
+        self.assertEqual(records.get(SONGS[1][:3]), SONGS[1])
+        self.assertIsNone(records.get(("Unknown", "", "")))
+
+    def test_scraped_records_case_2(self):
+        """Test that the oldest scraped records are spilled to the disk past
+        the memory bound and read back on demand.
+        """
+        songs = [("Song {}".format(i), "Artist", "Album", "url", "lyrics " * 50,
+                  "1981") for i in range(100)]
+        records = ScrapedRecords(3, max_memory=10000)
+        for song in songs:
+            records.add(song)
+        self.assertGreater(records.nb_spilled, 0)
+        self.assertLess(records.nb_spilled, len(songs))
+        self.assertEqual(len(records), len(songs))
+        self.assertEqual(list(records), songs)
+        self.assertEqual(records[0], songs[0])
+        self.assertEqual(records[-1], songs[-1])
+        self.assertEqual(records.get(songs[1][:3]), songs[1])
+        self.assertFalse(records.add(songs[0]))
+        records.close()
+
+    def test_scraped_data_case_1(self):
+        """Test that the scraped data is not shared between the scrapers.
+        """
+        other_scraper = AZLyricsScraper(use_webcache=False,
+                                        use_compute_cache=False)
+        self.assertEqual(len(self.scraper.scraped_data['songs']['data']),
+                         len(SONGS))
+        self.assertEqual(len(other_scraper.scraped_data['songs']['data']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
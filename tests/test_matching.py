@@ -0,0 +1,63 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.matching`
+"""
+
+import logging
+import unittest
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping import matching
+from lyrics_scraping.matching import FuzzyIndex, normalize
+from pyutils.genutils import get_qualname
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class TestMatching(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(matching)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    def test_normalize_case_1(self):
+        """Test that normalize() case-folds and removes the accents and the
+        punctuation.
+        """
+        self.assertEqual(normalize("Beyoncé - Déjà Vu (feat. Jay-Z)"),
+                         "beyonce deja vu feat jay z")
+        self.assertEqual(normalize("Just Can’t Get Enough"),
+                         "just cant get enough")
+        self.assertEqual(normalize("Speak & Spell"), "speak and spell")
+
+    def test_best_match_case_1(self):
+        """Test that the best search result is selected regardless of the case,
+        the punctuation and the order of the words.
+        """
+        possibilities = ["New Life by Depeche Mode", "New Life by Other Band",
+                         "Life by Depeche Mode"]
+        index = FuzzyIndex(possibilities)
+        for query in ["New Life by Depeche Mode", "new life, by DEPECHE MODE",
+                      "Depeche Mode by New Life", "New Life by Depech Mode"]:
+            result_index, score = index.best_match(query)
+            # NOTE: the best match is the first search result (index 0)
+            self.assertEqual(result_index, 0, query)
+            logger.info("'{}' matched with the score <color>{:.2f}</color>"
+                        "".format(query, score))
+        self.assertEqual(index.best_match("Hello by Adele"), (None, 0.0))
+
+    def test_search_case_1(self):
+        """Test that the matches are sorted from the best to the worst one and
+        that ties keep the order of the index.
+        """
+        index = FuzzyIndex(["Other Band", "Depeche Mode", "Depeche Mode",
+                            "Depeche"])
+        matches = index.search("depeche mode")
+        self.assertEqual([i for i, _ in matches], [1, 2, 3])
+        self.assertEqual(matches[0][1], 1.0)
+        self.assertEqual(len(index.search("depeche mode", limit=1)), 1)
+        self.assertEqual(index.search("..."), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.migration`
+
+A version 1 music database is filled directly (no HTTP request is sent),
+migrated to the version 2 and then used by a scraper.
+
+"""
+
+import logging
+import os
+import sqlite3
+import unittest
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping import migration
+from lyrics_scraping.migration import migrate_db
+from lyrics_scraping.scrapers import lyrics_scraper
+from lyrics_scraping.scrapers.azlyrics_scraper import AZLyricsScraper
+from lyrics_scraping.scrapers.lyrics_scraper import Lyrics
+from pyutils.genutils import get_qualname
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+SONGS = [
+    ("New Life", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/newlife.html",
+     "I stand still stepping on a shady street", "1981"),
+    ("Just Can't Get Enough", "Depeche Mode", "Speak & Spell",
+     "https://www.azlyrics.com/lyrics/depechemode/justcantgetenough.html",
+     "When I'm with you baby", "1981"),
+    ("Leave In Silence", "Depeche Mode", "A Broken Frame",
+     "https://www.azlyrics.com/lyrics/depechemode/leaveinsilence.html",
+     "Leave in silence", "1982"),
+]
+
+
+class TestMigration(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(migration)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    @classmethod
+    def setUpClass(cls):
+        """TODO
+        """
+        super().setUpClass()
+        # We will take charge of setting logging for lyrics_scraper
+        lyrics_scraper._SETUP_LOGGING = False
+
+    def setUp(self):
+        """Create a version 1 music database filled with a few songs.
+        """
+        self.db_filepath = os.path.join(
+            self.sandbox_tmpdir, "{}.sqlite".format(self._testMethodName))
+        self.v2_db_filepath = os.path.join(
+            self.sandbox_tmpdir, "{}_v2.sqlite".format(self._testMethodName))
+        scraper = AZLyricsScraper(db_filepath=self.db_filepath, use_fts=True,
+                                  use_webcache=False, use_compute_cache=False)
+        for song in SONGS:
+            scraper._save_lyrics(Lyrics(*song))
+        scraper.close()
+
+    def test_migrate_db_case_1(self):
+        """Test that all the rows are migrated and that the version 2 database
+        is read and filled by a scraper like the version 1.
+        """
+        counts = migrate_db(self.db_filepath, self.v2_db_filepath)
+        self.assertEqual(counts, {'artist': 1, 'album': 2, 'song': 3,
+                                  'song_url': 3, 'artist_url': 0,
+                                  'album_url': 0})
+        scraper = AZLyricsScraper(db_filepath=self.v2_db_filepath,
+                                  overwrite_db=False, use_url_filter=True,
+                                  use_webcache=False, use_compute_cache=False)
+        self.assertEqual(scraper.db_schema_version, 2)
+        album = scraper._get_lyrics_from_db("album", "Speak and Spell",
+                                            "Depeche Mode")
+        self.assertEqual(list(album), [Lyrics(*song) for song in SONGS[:2]])
+        self.assertEqual(scraper._get_urls_to_process(
+            [song[3] for song in SONGS]), [])
+        # The full-text index is also migrated
+        self.assertEqual(
+            [hit.song_title for hit in scraper.search_lyrics("silence")],
+            ["Leave In Silence"])
+        new_song = ("Sometimes", "Depeche Mode", "Black Celebration",
+                    "https://www.azlyrics.com/lyrics/depechemode/"
+                    "sometimes.html", "Silence silence silence", "1986")
+        scraper._save_lyrics(Lyrics(*new_song))
+        self.assertEqual(
+            [hit.song_title for hit in scraper.search_lyrics("silence")],
+            ["Sometimes", "Leave In Silence"])
+        self.assertEqual(
+            scraper._select_lyrics_from_urls([new_song[3]]),
+            {new_song[3]: Lyrics(*new_song)})
+        scraper.close()
+        db_conn = sqlite3.connect(self.v2_db_filepath)
+        self.assertEqual(
+            db_conn.execute("SELECT COUNT(*) FROM album").fetchone()[0], 3)
+        db_conn.close()
+
+    def test_migrate_db_case_2(self):
+        """Test that a database is only migrated from the version 1 to a new
+        file.
+        """
+        with self.assertRaises(FileExistsError):
+            migrate_db(self.db_filepath, self.db_filepath)
+        # A new version 2 database
+        scraper = AZLyricsScraper(db_filepath=self.v2_db_filepath,
+                                  db_schema_version=2, use_webcache=False,
+                                  use_compute_cache=False)
+        scraper._save_lyrics(Lyrics(*SONGS[0]))
+        scraper.flush()
+        self.assertEqual(scraper._url_in_db(SONGS[0][3]), 1)
+        scraper.close()
+        with self.assertRaises(ValueError):
+            migrate_db(self.v2_db_filepath,
+                       os.path.join(self.sandbox_tmpdir, "music_v3.sqlite"))
+
+
+if __name__ == '__main__':
+    unittest.main()
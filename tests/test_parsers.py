@@ -0,0 +1,215 @@
+"""Module that defines tests for :mod:`~lyrics_scraping.parsers`
+
+Every registered parser backend is checked against the same small azlyrics-like
+webpages.
+
+"""
+
+import logging
+import tracemalloc
+import unittest
+from collections.abc import Sequence
+from logging import NullHandler
+
+from .utils import TestLyricsScraping
+from lyrics_scraping import parsers
+from lyrics_scraping.exceptions import InvalidProfileError, UnknownParserError
+from lyrics_scraping.extraction import (
+    ExtractionProfile, Field, load_profiles)
+from lyrics_scraping.scrapers.azlyrics_scraper import (
+    AlbumSongList, ArtistWebpage)
+from lyrics_scraping.utils import get_data_filepath
+from pyutils.genutils import get_qualname
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+ARTIST_HTML = """<html><head><title>Depeche Mode Lyrics</title></head><body>
+<div id="listAlbum">
+<div class="album" id="7863">album: <b>"Speak &amp; Spell"</b> (1981)</div>
+<a href="../lyrics/depechemode/newlife.html" target="_blank">New Life</a><br/>
+<div class="album" id="7852">album: <b>"A Broken Frame"</b> (1982)</div>
+<a href="../lyrics/depechemode/leaveinsilence.html">Leave In Silence</a><br/>
+</div></body></html>"""
+
+SEARCH_HTML = """<html><head><title>AZLyrics - Search</title></head><body>
+<div class="panel"><b>Song results:</b><table>
+<tr><td class="text-left visitedlyr">1. <a href="https://www.azlyrics.com/lyrics/\
+depechemode/newlife.html"><b>New Life</b></a> by <b>Depeche Mode</b></td></tr>
+<tr><td class="text-left visitedlyr">2. <a href="https://www.azlyrics.com/lyrics/\
+x/newlife.html"><b>New Life</b></a> by <b>Other Band</b></td></tr>
+</table></div><div class="footer"><b>Footer</b></div></body></html>"""
+
+
+class FakeWebCache:
+    """Web cache returning generated artist webpages, i.e. no HTTP request is
+    sent."""
+
+    def __init__(self, nb_albums=5, nb_songs=10):
+        self.nb_albums = nb_albums
+        self.nb_songs = nb_songs
+
+    def get_webpage(self, url, params=None):
+        artist = url.rsplit("/", 1)[-1][:-len(".html")]
+        html = "<html><head><title>{} Lyrics</title></head><body>" \
+               "<div id=\"listAlbum\">".format(artist)
+        for i in range(self.nb_albums):
+            html += '<div class="album" id="{0}">album: <b>"Album {0}"</b> ' \
+                    '({1})</div>'.format(i, 1980 + i)
+            for j in range(self.nb_songs):
+                html += '<a href="../lyrics/{0}/song{1}{2}.html">Song {1} ' \
+                        '{2}</a><br/>'.format(artist, i, j)
+        return html + "</div></body></html>"
+
+
+class TreeStr(str):
+    """str subclass like the ones keeping a reference to a document tree."""
+
+
+def check_plain_str(value):
+    """Return True if all the str found in `value` are plain :obj:`str`, i.e.
+    not a subclass keeping a reference to a document tree.
+
+    The sequences (e.g. the namedtuples and :class:`AlbumSongList`), the dicts
+    and the attributes in the `__slots__` of the objects are searched."""
+    if isinstance(value, str):
+        return type(value) is str
+    if isinstance(value, dict):
+        return all(check_plain_str(k) and check_plain_str(v)
+                   for k, v in value.items())
+    values = list(value) if isinstance(value, Sequence) else []
+    for slot in getattr(type(value), '__slots__', ()):
+        values.append(getattr(value, slot, None))
+    return all(check_plain_str(v) for v in values)
+
+
+class TestParsers(TestLyricsScraping):
+    # TODO
+    TEST_MODULE_QUALNAME = get_qualname(parsers)
+    LOGGER_NAME = __name__
+    SHOW_FIRST_CHARS_IN_LOG = 0
+
+    def test_backends_case_1(self):
+        """Test that all the registered backends extract the same data from an
+        artist webpage.
+        """
+        expected = None
+        for name in parsers.available_parsers():
+            backend = parsers.get_parser(name)
+            doc = backend.parse(ARTIST_HTML)
+            divs = backend.select(doc, "div.album")
+            data = (
+                backend.get_text(backend.select_one(doc, "title")),
+                [backend.get_attr(div, 'id') for div in divs],
+                [backend.get_text(backend.select_one(div, "b")) for div in divs],
+                [backend.tail(backend.select_one(div, "b")).strip()
+                 for div in divs],
+                [backend.get_attr(sib, 'href')
+                 for sib in backend.next_siblings(divs[0])],
+                backend.get_classes(divs[0]))
+            for value in data[0:1] + tuple(data[1]):
+                self.assertIs(type(value), str, "{}: not a str".format(name))
+            if expected is None:
+                expected = data
+            self.assertEqual(data, expected,
+                             "{} extracted different data".format(name))
+            logger.info("The parser <color>{}</color> extracted the expected "
+                        "data".format(name))
+
+    def test_get_parser_case_1(self):
+        """Test that get_parser() raises an error for an unknown backend.
+        """
+        with self.assertRaises(UnknownParserError):
+            parsers.get_parser("unknown-parser")
+
+    def test_profiles_case_1(self):
+        """Test that all the registered backends extract the same data from an
+        artist webpage with the azlyrics extraction profiles.
+        """
+        profile = load_profiles(get_data_filepath('profiles'))['artist']
+        for name in parsers.available_parsers():
+            backend = parsers.get_parser(name)
+            data = profile.extract(backend, backend.parse(ARTIST_HTML))
+            self.assertEqual(data['artist_name'], "Depeche Mode")
+            self.assertEqual(
+                [(a['album_id'], a['album_title'], a['album_year'])
+                 for a in data['albums']],
+                [("7863", "Speak & Spell", ["1981"]),
+                 ("7852", "A Broken Frame", ["1982"])],
+                "{} extracted different albums".format(name))
+            self.assertEqual(
+                data['albums'][0]['songs'],
+                [{'song_title': "New Life",
+                  'song_href': "../lyrics/depechemode/newlife.html"}])
+
+    def test_profiles_case_2(self):
+        """Test that a badly defined field raises an error when the profile
+        is compiled.
+        """
+        with self.assertRaises(InvalidProfileError):
+            Field("title", {'select': "title", 'regexp': "(.*)"})
+        with self.assertRaises(InvalidProfileError):
+            Field("title", {'select': "title", 'regex': "(.*"})
+        with self.assertRaises(InvalidProfileError):
+            ExtractionProfile("search", {'parse_only': "td > a"})
+
+    def test_restricted_parse_case_1(self):
+        """Test that the restricted parse of a search webpage gives the same
+        search results as the full parse with all the registered backends.
+        """
+        profile = load_profiles(get_data_filepath('profiles'))['search']
+        self.assertEqual(profile.parse_only, "td.visitedlyr")
+        for name in parsers.available_parsers():
+            backend = parsers.get_parser(name)
+            full = profile.extract_from_html(backend, SEARCH_HTML, False)
+            restricted = profile.extract_from_html(backend, SEARCH_HTML)
+            self.assertEqual(restricted, full,
+                             "{}: restricted parse differs".format(name))
+            self.assertEqual([r['texts'] for r in restricted['results']],
+                             [["New Life", "Depeche Mode"],
+                              ["New Life", "Other Band"]])
+
+    def test_artist_webpage_memory_case_1(self):
+        """Test that the memory kept by each of 1000 scraped artist webpages
+        stays small, i.e. the document trees are released and only plain str
+        are kept.
+        """
+        # A str subclass is found within the songs of an album
+        songs = AlbumSongList("", [("newlife.html", TreeStr("New Life"))])
+        self.assertFalse(check_plain_str({'7863': (1981, songs)}))
+        webcache = FakeWebCache(nb_albums=2, nb_songs=5)
+        html_size = len(webcache.get_webpage(
+            "https://www.azlyrics.com/a/artist.html"))
+        for name in parsers.available_parsers():
+            backend = parsers.get_parser(name)
+            artist_webpages = []
+            tracemalloc.start()
+            try:
+                for i in range(1000):
+                    url = "https://www.azlyrics.com/a/artist{}.html".format(i)
+                    # NOTE: the webpages are kept alive, like the ones
+                    # scraped by a session
+                    artist_webpages.append(ArtistWebpage(url, webcache, True,
+                                                         False, backend))
+                    if i == 99:
+                        # Once the caches (e.g. of urlparse()) are warm
+                        first_size = tracemalloc.get_traced_memory()[0]
+                final_size = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            for artist_webpage in artist_webpages:
+                self.assertTrue(check_plain_str(artist_webpage.get_albums()),
+                                "{}: not only plain str".format(name))
+                self.assertFalse(hasattr(artist_webpage, 'html'))
+            page_size = (final_size - first_size) / 900
+            # NOTE: a document tree kept in memory takes about 40 times the
+            # size of its webpage (the trees of lxml are allocated in C, thus
+            # are not traced)
+            self.assertLess(page_size, 10 * html_size,
+                            "{}: document trees kept".format(name))
+            logger.info("The parser <color>{}</color>: {:.1f} KB kept by "
+                        "each artist webpage".format(name, page_size / 1024))
+
+if __name__ == '__main__':
+    unittest.main()